@@ -6,6 +6,14 @@ let activeStartTime = null;
 let windowFocused = true;
 
 const HEARTBEAT_INTERVAL = 30000;
+const BATCH_SIZE = 20;
+const FLUSH_INTERVAL = 5000;
+const MAX_BUFFER = 1000;
+// Must not exceed MAX_BATCH_EVENTS in app.py, which rejects larger batches whole.
+const MAX_BATCH_EVENTS = 500;
+
+let buffer = [];
+let flushing = false;
 
 function todayISO() {
   return new Date().toISOString().split("T")[0];
@@ -20,18 +28,48 @@ function normalizeUrl(url) {
 }
 
 function send(event, url) {
-  const payload = {
+  buffer.push({
     event,
     url,
     date: todayISO(),
     timestamp: new Date().toISOString()
-  };
-
-  return fetch("http://localhost:6001/log_url", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload)
   });
+
+  if (buffer.length > MAX_BUFFER) {
+    buffer = buffer.slice(buffer.length - MAX_BUFFER);
+  }
+
+  if (buffer.length >= BATCH_SIZE) {
+    flush();
+  }
+}
+
+async function flush() {
+  if (flushing || buffer.length === 0) return;
+  flushing = true;
+
+  try {
+    while (buffer.length > 0) {
+      const batch = buffer.slice(0, MAX_BATCH_EVENTS);
+      buffer = buffer.slice(batch.length);
+
+      try {
+        const res = await fetch("http://localhost:6001/log_url/batch", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ events: batch })
+        });
+        // Invalid events come back as "rejected" in a 200; any error status
+        // means the batch as a whole was not taken, so keep it for a retry.
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      } catch {
+        buffer = batch.concat(buffer).slice(-MAX_BUFFER);
+        return;
+      }
+    }
+  } finally {
+    flushing = false;
+  }
 }
 
 function startSession(tabId, url) {
@@ -106,12 +144,15 @@ setInterval(() => {
   }
 }, HEARTBEAT_INTERVAL);
 
+setInterval(flush, FLUSH_INTERVAL);
+
 chrome.runtime.onStartup.addListener(() => {
   endSession("session terminated");
 });
 
 chrome.runtime.onSuspend.addListener(() => {
   endSession("session terminated");
+  flush();
 });
 
 chrome.runtime.onMessage.addListener((msg, sender, sendResponse) => {
@@ -1,25 +1,70 @@
-import subprocess, sys, importlib.util, os
-pythonw = sys.executable.replace("python.exe", "pythonw.exe")
-NO_WINDOW = subprocess.CREATE_NO_WINDOW
-BUILT_IN = {"datetime", "time", "os", "csv", "random", "logging", "subprocess"}
-def install(pkgs):
-    for p in pkgs:
-        if p not in BUILT_IN and not importlib.util.find_spec(p):
-            subprocess.check_call([sys.executable, "-m", "pip", "install", p])
-processes = [
-    ("cam.py", ["opencv-python"]),
-    ("vite.py", []),
-    ("main.py", ["psutil", "win32gui", "win32process"]),
-    ("app.py", ["flask", "flask_cors", "threading", "requests", 'google-generativeai', 'pandas']),
-]
-for script, pkgs in processes:
-    install(pkgs)
-    subprocess.Popen([pythonw, script], creationflags=NO_WINDOW)
-print("All processes started successfully.")
-
-if not os.path.exists("api.txt"):
-    print("Please get your Gemini API key")
-    api_key = input("Enter your API key: ")
-    with open("api.txt", "w") as f:
-        f.write(api_key)
-    print("API key saved to api.txt")
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+from supervisor import DependencyManifest, Service, Supervisor, file_probe, http_probe, stub_service, tcp_probe
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("TRACKIT_DATA", BASE_DIR)
+MANIFEST = os.path.join(BASE_DIR, ".trackit_deps.json")
+
+WINDOWS = os.name == "nt"
+pythonw = sys.executable.replace("python.exe", "pythonw.exe") if WINDOWS else sys.executable
+NO_WINDOW = subprocess.CREATE_NO_WINDOW if WINDOWS else 0
+
+def service(name, script, modules, ready=None, restart="always"):
+    return Service(name, [pythonw, os.path.join(BASE_DIR, script)], modules, ready, restart,
+                   cwd=BASE_DIR, creationflags=NO_WINDOW)
+
+def trackit_services():
+    return [
+        service("cam", "cam.py", ["cv2"]),
+        service("dashboard", "vite.py", [], tcp_probe("127.0.0.1", 5173), restart="on-failure"),
+        service("tracker", "main.py", ["psutil", "win32gui", "win32process"],
+                file_probe(os.path.join(DATA_DIR, "usage", "tracker.prom"))),
+        service("backend", "serve.py", ["flask", "flask_cors", "requests", "google.generativeai", "waitress"],
+                http_probe("http://127.0.0.1:6001/metrics")),
+    ]
+
+def stub_services(crash_after):
+    directory = tempfile.mkdtemp(prefix="trackit-stub-")
+    return [
+        stub_service("cam", directory, startup=0.1),
+        stub_service("tracker", directory, startup=0.3, lifetime=crash_after),
+        stub_service("backend", directory, startup=0.6),
+    ]
+
+def ask_api_key():
+    path = os.path.join(BASE_DIR, "api.txt")
+    if not os.path.exists(path):
+        print("Please get your Gemini API key")
+        api_key = input("Enter your API key: ")
+        with open(path, "w") as f:
+            f.write(api_key)
+        print("API key saved to api.txt")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recheck", action="store_true", help="verify and install dependencies even on a warm start")
+    parser.add_argument("--stub", action="store_true", help="supervise stub services instead of TrackIT")
+    parser.add_argument("--crash-after", type=float, default=2.0, help="stub tracker lifetime before it crashes")
+    args = parser.parse_args()
+
+    if args.stub:
+        services = stub_services(args.crash_after)
+    else:
+        services = trackit_services()
+        modules = [m for s in services for m in s.modules]
+        installed = DependencyManifest(MANIFEST).ensure(modules, force=args.recheck)
+        if installed:
+            print(f"Installed: {', '.join(installed)}")
+        if sys.stdin and sys.stdin.isatty():
+            ask_api_key()
+
+    supervisor = Supervisor(services)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    supervisor.start()
+    print("All processes started successfully.")
+    supervisor.run()
@@ -1,111 +1,190 @@
-from datetime import datetime, timedelta
+import time
+STARTED = time.perf_counter()
+from datetime import date, datetime, timedelta
+import gzip
+import json
 import logging
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Blueprint, Flask, Response, abort, g, jsonify, request, send_file, send_from_directory, url_for
 from flask_cors import CORS
 import csv
 import os
 import threading
-import google.generativeai as genai
-import pandas as pd
+from csvcache import CsvCache
+from usagedb import GRANULARITY, KINDS, UsageDB, parse_time
+from retention import Retention
+from writer import BackgroundWriter, ProcessLock
+from journal import JournalTailer, atomic_write
+from events import EventBus
+from httpcache import ResponseCache, file_version
+from reportjobs import GeminiClient, ReportJobs
+from photoindex import PhotoIndex
+from sessionstore import EVENTS, SessionStore
+from metrics import REGISTRY, Counter, Gauge, Histogram, merge_exposition
+from fleet import FLEET_TOKEN, FLEET_URL, FleetStore, authorized, open_pusher, valid_host
+from export import FORMATS, encode, export_rows, gzip_stream, parse_cursor
+from timeline import BROWSER_CATEGORY, clip, rollup, segment_payload, subdivide
+from rankindex import ORDERS, SORTS, RankIndex
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-PHOTO_DIR = os.path.join(BASE_DIR, "CapturedPhotos")
-REPORT_DIR = os.path.join(BASE_DIR, "webreports")
-CSV_FILE = os.path.join(BASE_DIR, "app_log.csv")
-LOG_FILE = os.path.join(BASE_DIR, "web_log.txt")
-
-try:
-    with open(os.path.join(BASE_DIR, "api.txt"), "r") as f:
-        api = f.read().strip()
-except FileNotFoundError:
-    api = None
-
-model = None
-if api:
-    genai.configure(api_key=api)
-    model = genai.GenerativeModel("gemini-2.5-flash")
-
-app = Flask(__name__)
-CORS(app)
-
-def generate_weekly_report(usage_dir="usage", output_file="weekly.csv"):
-    summary = {}
-
+DATA_DIR = os.environ.get("TRACKIT_DATA", BASE_DIR)
+PHOTO_DIR = os.path.join(DATA_DIR, "CapturedPhotos")
+REPORT_DIR = os.path.join(DATA_DIR, "webreports")
+CSV_FILE = os.path.join(DATA_DIR, "app_log.csv")
+LOG_FILE = os.path.join(DATA_DIR, "web_log.txt")
+DB_FILE = os.path.join(DATA_DIR, "trackit.db")
+SESSION_DB = os.path.join(DATA_DIR, "sessions.db")
+USAGE_DIR = os.path.join(DATA_DIR, "usage")
+GLOBAL_CSV = os.path.join(USAGE_DIR, "global.csv")
+REPORT_CACHE = os.path.join(REPORT_DIR, "ai_cache.json")
+FLEET_DIR = os.path.join(DATA_DIR, "fleet")
+FLEET_OUTBOX = os.path.join(DATA_DIR, "fleet_backend.db")
+AGGREGATOR = os.environ.get("TRACKIT_MODE") == "aggregator"
+
+REPORT_WORKERS = 1
+REPORT_TIMEOUT = 60
+
+PHOTO_PAGE_SIZE = 60
+MAX_PHOTO_PAGE = 500
+PHOTO_MAX_AGE = 365 * 24 * 3600
+
+class Lazy:
+    """Proxy that builds its target on first attribute access.
+
+    Subsystems that open databases, start threads or import heavy
+    libraries are wrapped in one, so importing this module and creating
+    the app do no I/O; ``warm_up`` builds them in the background.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+bp = Blueprint("trackit", __name__)
+
+TRACKER_METRICS = os.path.join(DATA_DIR, "usage", "tracker.prom")
+
+REQUEST_LATENCY = Histogram("trackit_http_request_duration_seconds", "Request latency by route", ["method", "route", "status"])
+LOG_EVENTS = Counter("trackit_log_url_events_total", "Extension events received by type", ["event"])
+LOCK_WAIT = Histogram("trackit_session_lock_wait_seconds", "Time spent waiting for the session store write lock")
+WRITE_SECONDS = Histogram("trackit_write_duration_seconds", "CSV and report write durations", ["kind"])
+FIRST_RESPONSE = Gauge("trackit_first_response_seconds", "Seconds from importing app.py to the first response")
+WARM_UP = Gauge("trackit_warm_up_seconds", "Duration of each background warm-up step", ["step"])
+first_response = threading.Event()
+
+@bp.before_app_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@bp.after_app_request
+def record_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        now = time.perf_counter()
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(now - started)
+        if not first_response.is_set():
+            first_response.set()
+            FIRST_RESPONSE.set(round(now - STARTED, 4))
+    return response
+
+def open_report_jobs():
+    try:
+        with open(os.path.join(BASE_DIR, "api.txt"), "r") as f:
+            api = f.read().strip()
+    except FileNotFoundError:
+        api = None
+    return ReportJobs(GeminiClient(api) if api else None, REPORT_CACHE, REPORT_WORKERS, REPORT_TIMEOUT)
+
+def open_usage_db():
+    db = UsageDB(DB_FILE)
+    db.start_flusher()
+    Retention(DB_FILE).start()
+    migrate_alltime(db)
+    return db
+
+csv_cache = CsvCache(max_entries=64, max_rows=200000)
+response_cache = ResponseCache()
+event_bus = EventBus()
+photo_index = Lazy(lambda: PhotoIndex(PHOTO_DIR))
+report_jobs = Lazy(open_report_jobs)
+usage_db = Lazy(open_usage_db)
+
+def parse_usage_row(row):
+    return {
+        "app_name": row["app_name"],
+        "usage_seconds": int(row["usage_seconds"]),
+        "open_count": int(row["open_count"]),
+        "category": row.get("category") or "other"
+    }
+
+def sum_usage(acc, fieldnames, row):
+    acc["count"] += row["open_count"]
+    acc["time"] += row["usage_seconds"]
+    return acc
+
+def sum_categories(acc, fieldnames, row):
+    entry = acc.setdefault(row["category"], {"usage_seconds": 0, "open_count": 0})
+    entry["usage_seconds"] += row["usage_seconds"]
+    entry["open_count"] += row["open_count"]
+    return acc
+
+def category_totals(path):
+    return csv_cache.aggregate(path, parse_usage_row, sum_categories, dict)
+
+def generate_weekly_report(usage_dir=USAGE_DIR, output_file=os.path.join(REPORT_DIR, "weekly.csv")):
     if not os.path.exists(usage_dir):
         return
 
-    for filename in os.listdir(usage_dir):
-        if not filename.endswith(".csv") or filename.lower() == "global.csv":
-            continue
-
-        file_path = os.path.join(usage_dir, filename)
-
-        with open(file_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-
-            if not reader.fieldnames or len(reader.fieldnames) < 4:
-                continue
-
-            day = reader.fieldnames[3].lower()
-
-            if day not in summary:
-                summary[day] = {"count": 0, "time": 0}
-
-            for row in reader:
-                summary[day]["count"] += int(row.get("open_count", 0))
-                summary[day]["time"] += int(row.get("usage_seconds", 0))
+    with WRITE_SECONDS.labels("weekly_report").time():
+        summary = get_weekly_summary(usage_dir)
 
-    with open(output_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["day", "count", "time"])
-
-        for day, data in summary.items():
-            writer.writerow([day, data["count"], data["time"]])
+        with open(output_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["day", "count", "time"])
 
-generate_weekly_report()
+            for day, data in summary.items():
+                writer.writerow([day, data["count"], data["time"]])
 
 def get_weekly_summary(usage_dir):
     summary = {}
 
-    if not os.path.exists(usage_dir):
-        return summary
-
-    for filename in os.listdir(usage_dir):
+    for filename in csv_cache.listdir(usage_dir):
         if not filename.endswith(".csv") or filename.lower() == "global.csv":
             continue
 
         path = os.path.join(usage_dir, filename)
+        fieldnames, _ = csv_cache.rows(path, parse_usage_row)
 
-        with open(path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-
-            if not reader.fieldnames or len(reader.fieldnames) < 4:
-                continue
-
-            day = reader.fieldnames[3].lower()
+        if not fieldnames or len(fieldnames) < 4:
+            continue
 
-            summary.setdefault(day, {"count": 0, "time": 0})
+        day = fieldnames[3].lower()
+        totals = csv_cache.aggregate(path, parse_usage_row, sum_usage, lambda: {"count": 0, "time": 0})
 
-            for row in reader:
-                summary[day]["count"] += int(row.get("open_count", 0))
-                summary[day]["time"] += int(row.get("usage_seconds", 0))
+        summary.setdefault(day, {"count": 0, "time": 0})
+        summary[day]["count"] += totals["count"]
+        summary[day]["time"] += totals["time"]
 
     return summary
 
 def load_reports():
-    all_data = []
-
-    for file in os.listdir(REPORT_DIR):
-        if file.endswith("alltime.csv"):
-            path = os.path.join(REPORT_DIR, file)
-            df = pd.read_csv(path)
-            all_data.append(df)
-
-    if not all_data:
-        return pd.DataFrame()
-
-    return pd.concat(all_data, ignore_index=True)
-
+    usage_db.flush()
+    return usage_db.site_rollup()
 
 def load_csv():
     if not os.path.exists(CSV_FILE):
@@ -123,193 +202,670 @@ def load_csv():
             })
     return data
 
-def summarize_with_gemini(df):
-    if model is None:
-        return "AI summary unavailable"
-
-    if "site" not in df.columns or "total_seconds" not in df.columns:
-        return "Invalid report format"
-
-    grouped = (
-        df.groupby("site")["total_seconds"]
-        .sum()
-        .sort_values(ascending=False)
-    )
+def summarize_sites(rows):
+    totals = {}
+    for _, site, seconds in rows:
+        totals[site] = totals.get(site, 0) + seconds
 
     summary_text = "User activity summary:\n"
-    for site, seconds in grouped.items():
+    for site, seconds in sorted(totals.items(), key=lambda kv: kv[1], reverse=True):
         summary_text += f"- {site}: {seconds} seconds\n"
+    return summary_text
+
+def job_payload(job):
+    payload = {"job_id": job["id"], "status": job["status"], "poll": f"/report/jobs/{job['id']}"}
+    if job["summary"] is not None:
+        payload["ai_summary"] = job["summary"]
+    if job["error"]:
+        payload["error"] = job["error"]
+    return payload
+
+def weekly_version():
+    return tuple(
+        (name, file_version(os.path.join(USAGE_DIR, name)))
+        for name in csv_cache.listdir(USAGE_DIR)
+        if name.endswith(".csv")
+    )
 
-    prompt = f"""
-            You are a productivity analysis assistant.
-
-            Given this user activity data:
-            {summary_text}
-
-            Generate:
-            1. A concise daily summary
-            2. Productivity insights
-            3. Time-wasting patterns (if any)
-            4. Suggestions to improve focus
-            """
-    response = model.generate_content(prompt)
-    return response.text
-
-@app.route("/summary/weekly", methods=["GET"])
+@bp.route("/summary/weekly", methods=["GET"])
 def weekly_summary():
-    weekly_data = get_weekly_summary(USAGE_DIR)
-    return jsonify(weekly_data)
+    return response_cache.respond("weekly", weekly_version(), lambda: get_weekly_summary(USAGE_DIR))
 
-@app.route("/report", methods=["GET"])
+@bp.route("/report", methods=["GET"])
 def report_ui():
-    df = load_reports()
+    rows = load_reports()
 
-    if df.empty:
+    if not rows:
         return "<h2>No data found</h2>", 404
 
-    ai_summary = summarize_with_gemini(df)
+    if report_jobs.client is None:
+        return jsonify({"ai_summary": "AI summary unavailable"})
 
-    return jsonify({"ai_summary": ai_summary})
+    summary_text = summarize_sites(rows)
 
-@app.route("/photos/<path:filename>")
-def serve_photo(filename):
-    return send_from_directory(PHOTO_DIR, filename)
+    cached = report_jobs.cached(summary_text)
+    if cached is not None:
+        return jsonify({"ai_summary": cached, "cached": True})
 
-@app.route("/users", methods=["GET"])
-def get_users():
-    users = []
+    return jsonify(job_payload(report_jobs.submit(summary_text))), 202
 
-    if not os.path.exists(PHOTO_DIR):
-        return jsonify([])
+@bp.route("/report/jobs/<job_id>", methods=["GET"])
+def report_job(job_id):
+    job = report_jobs.status(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job_payload(job))
 
-    for file in os.listdir(PHOTO_DIR):
-        if file.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
-            users.append({
-                "name": os.path.splitext(file)[0],
-                "photo": f"http://localhost:6001/photos/{file}"
-            })
+@bp.route("/photos/<path:filename>")
+def serve_photo(filename):
+    if request.args.get("size") == "thumb":
+        photo_index.refresh()
+        if filename not in photo_index.entries:
+            abort(404)
+        thumb = photo_index.thumbnail(filename)
+        if thumb is not None:
+            response = send_file(thumb, mimetype="image/jpeg", max_age=PHOTO_MAX_AGE)
+            response.headers["Cache-Control"] = f"public, max-age={PHOTO_MAX_AGE}, immutable"
+            return response
+    return send_from_directory(PHOTO_DIR, filename, max_age=PHOTO_MAX_AGE)
+
+@bp.route("/users", methods=["GET"])
+def get_users():
+    try:
+        start = parse_time(request.args.get("from"))
+        end = parse_time(request.args.get("to"))
+        limit = int(request.args.get("limit", PHOTO_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "invalid from/to/limit"}), 400
+    if end is not None and len(request.args["to"]) == 10:
+        end += 86400
+    limit = max(1, min(limit, MAX_PHOTO_PAGE))
+    cursor = request.args.get("cursor") or None
+
+    version = (photo_index.refresh(), request.host_url)
+    key = ("users", start, end, limit, cursor)
+    return response_cache.respond(key, version, lambda: list_users(start, end, cursor, limit))
+
+def list_users(start=None, end=None, cursor=None, limit=PHOTO_PAGE_SIZE):
+    photos, next_cursor, total = photo_index.page(start, end, cursor, limit)
+    users = []
 
-    return jsonify(users)
+    for entry in photos:
+        users.append({
+            "name": entry["name"],
+            "taken": entry["taken"],
+            "bytes": entry["bytes"],
+            "width": entry["width"],
+            "height": entry["height"],
+            "photo": url_for(".serve_photo", filename=entry["file"], _external=True),
+            "thumb": url_for(".serve_photo", filename=entry["file"], size="thumb", _external=True)
+        })
 
-USAGE_DIR = os.path.join(BASE_DIR, "usage")
+    return {"photos": users, "next_cursor": next_cursor, "total": total}
 
-GLOBAL_CSV = os.path.join(USAGE_DIR, "global.csv")
 def read_csv_safe(path):
-    data = []
-    if not os.path.exists(path):
-        return data
-
-    with open(path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            data.append({
-                "app_name": row["app_name"],
-                "usage_seconds": int(row["usage_seconds"]),
-                "open_count": int(row["open_count"])
-            })
-    return data
-
-@app.route("/summary", methods=["GET"])
+    _, rows = csv_cache.rows(path, parse_usage_row)
+    return rows
+
+SUMMARY_PAGE_SIZE = 50
+MAX_SUMMARY_PAGE = 500
+SUMMARY_SEARCH_ARGS = ("q", "sort", "order", "limit", "cursor")
+
+rank_indexes = {}
+rank_lock = threading.Lock()
+summary_cache = ResponseCache(max_entries=1024)
+
+def usage_index(path, version=None):
+    """RankIndex over a usage CSV, re-synced only when the file changed.
+
+    Pass the ``version`` a response will be cached under, read before the
+    index is synced, so a concurrent rewrite can only make the index newer
+    than its version, never older.
+    """
+    version = file_version(path) if version is None else version
+    with rank_lock:
+        entry = rank_indexes.setdefault(path, {"version": None, "index": RankIndex()})
+    if entry["version"] != version:
+        entry["index"].sync(read_csv_safe(path))
+        entry["version"] = version
+    return entry["index"]
+
+def search_summary(path):
+    sort = request.args.get("sort", "usage")
+    order = request.args.get("order", "asc" if sort == "name" else "desc")
+    try:
+        limit = int(request.args.get("limit", SUMMARY_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "invalid limit"}), 400
+    if sort not in SORTS or order not in ORDERS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORTS)} and order asc or desc"}), 400
+    limit = max(1, min(limit, MAX_SUMMARY_PAGE))
+
+    q = request.args.get("q", "").strip()
+    cursor = request.args.get("cursor") or None
+    version = file_version(path)
+    index = usage_index(path, version)
+    try:
+        if cursor is not None:
+            index.parse_cursor(sort, cursor)
+    except ValueError:
+        return jsonify({"error": "invalid cursor for this sort"}), 400
+
+    def build():
+        rows, next_cursor, total = index.page(sort, order, q, cursor, limit)
+        return {"apps": rows, "next_cursor": next_cursor, "total": total, "totals": index.totals()}
+
+    key = ("summary", path, q.lower(), sort, order, limit, cursor)
+    return summary_cache.respond(key, version, build)
+
+@bp.route("/summary", methods=["GET"])
 def summary():
     today_name = datetime.now().strftime("%A").lower()
     today_csv = os.path.join(USAGE_DIR, f"{today_name}.csv")
 
-    today_data = read_csv_safe(today_csv)
-    all_time_data = read_csv_safe(GLOBAL_CSV)
+    if any(arg in request.args for arg in SUMMARY_SEARCH_ARGS):
+        view = request.args.get("view", "all_time")
+        if view not in ("all_time", "today"):
+            return jsonify({"error": "view must be all_time or today"}), 400
+        return search_summary(GLOBAL_CSV if view == "all_time" else today_csv)
+
+    def build():
+        return {
+            "all_time": read_csv_safe(GLOBAL_CSV),
+            "today": read_csv_safe(today_csv),
+            "categories": {
+                "all_time": category_totals(GLOBAL_CSV),
+                "today": category_totals(today_csv)
+            }
+        }
+
+    version = (today_name, file_version(today_csv), file_version(GLOBAL_CSV))
+    return response_cache.respond("summary", version, build)
+
+def publish_journal_record(record):
+    ts, date, app_name, seconds, opens, *rest = record
+    event_bus.publish("app", {
+        "app_name": app_name,
+        "usage_seconds": seconds,
+        "open_count": opens,
+        "category": rest[0] if rest else "other",
+        "date": date,
+        "ts": ts
+    })
+
+def start_tailer():
+    tailer = JournalTailer(USAGE_DIR, publish_journal_record)
+    tailer.start()
+    return tailer
+
+journal_tailer = Lazy(start_tailer)
+
+@bp.route("/stream", methods=["GET"])
+def stream():
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    journal_tailer.get()
+
+    return Response(
+        event_bus.stream(last_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@bp.route("/usage", methods=["GET"])
+def usage_range():
+    granularity = request.args.get("granularity", "hour")
+    kind = request.args.get("kind", "apps")
+    if granularity not in GRANULARITY or kind not in KINDS:
+        return jsonify({"error": "granularity must be minute|hour|day|week and kind apps|sites"}), 400
+
+    try:
+        end = parse_time(request.args.get("to"), datetime.now().timestamp())
+        start = parse_time(request.args.get("from"), end - 86400)
+    except ValueError:
+        return jsonify({"error": "from/to must be ISO timestamps or epoch seconds"}), 400
+
+    name = request.args.get("app") if kind == "apps" else request.args.get("site")
+    by = request.args.get("by")
+    rows = usage_db.query(start, end, granularity, kind, name, by, request.args.get("category"))
 
     return jsonify({
-        "all_time": all_time_data,
-        "today": today_data
+        "from": datetime.fromtimestamp(start).isoformat(),
+        "to": datetime.fromtimestamp(end).isoformat(),
+        "granularity": granularity,
+        "kind": kind,
+        "buckets": rows
     })
 
+@bp.route("/export", methods=["GET"])
+def export_usage():
+    kind = request.args.get("kind", "apps")
+    fmt = request.args.get("format", "ndjson")
+    granularity = request.args.get("granularity", "raw")
+    if kind not in KINDS or fmt not in FORMATS or (granularity != "raw" and granularity not in GRANULARITY):
+        return jsonify({"error": "kind must be apps|sites, format ndjson|csv and granularity raw|minute|hour|day|week"}), 400
+
+    try:
+        end = parse_time(request.args.get("to"), datetime.now().timestamp())
+        start = parse_time(request.args.get("from"), 0)
+        cursor = parse_cursor(request.args.get("cursor"))
+        limit = max(0, int(request.args.get("limit", 0)))
+    except ValueError:
+        return jsonify({"error": "from/to must be ISO timestamps or epoch seconds, cursor <ts>:<name>, limit an integer"}), 400
+
+    body = encode(export_rows(usage_db, kind, start, end, granularity, cursor, limit), kind, fmt)
+    headers = {
+        "Content-Disposition": f'attachment; filename="trackit-{kind}.{fmt}"',
+        "Cache-Control": "no-store",
+        "X-Accel-Buffering": "no",
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, mimetype=FORMATS[fmt], headers=headers)
+
+MAX_TIMELINE_SECONDS = 31 * 86400
+
+def timeline_range():
+    end = parse_time(request.args.get("to"), datetime.now().timestamp())
+    start = parse_time(request.args.get("from"), end - 86400)
+    if end <= start or end - start > MAX_TIMELINE_SECONDS:
+        raise ValueError("range")
+    return start, end
+
+def timeline_segments(start, end):
+    apps = [(*clip(s, e, start, end), app) for s, e, app in usage_db.intervals("apps", start, end)]
+    sites = usage_db.intervals("sites", start, end)
+    categories = usage_db.app_categories()
+    browsers = {app for app, category in categories.items() if category == BROWSER_CATEGORY}
+    segments = list(subdivide(apps, sites, browsers))
+    return segments, [(*clip(s, e, start, end), site) for s, e, site in sites]
+
+@bp.route("/timeline", methods=["GET"])
+def timeline():
+    try:
+        start, end = timeline_range()
+    except ValueError:
+        return jsonify({"error": f"from/to must be ISO timestamps or epoch seconds, at most {MAX_TIMELINE_SECONDS // 86400} days apart"}), 400
+
+    segments, _ = timeline_segments(start, end)
+    return jsonify({
+        "from": datetime.fromtimestamp(start).isoformat(),
+        "to": datetime.fromtimestamp(end).isoformat(),
+        "segments": [segment_payload(s) for s in segments]
+    })
 
-log = logging.getLogger("werkzeug")
-log.setLevel(logging.ERROR)
+@bp.route("/timeline/rollup", methods=["GET"])
+def timeline_rollup():
+    by = request.args.get("by", "app")
+    try:
+        start, end = timeline_range()
+    except ValueError:
+        return jsonify({"error": f"from/to must be ISO timestamps or epoch seconds, at most {MAX_TIMELINE_SECONDS // 86400} days apart"}), 400
+    if by not in ("app", "site"):
+        return jsonify({"error": "by must be app or site"}), 400
+
+    segments, sites = timeline_segments(start, end)
+    return jsonify({
+        "from": datetime.fromtimestamp(start).isoformat(),
+        "to": datetime.fromtimestamp(end).isoformat(),
+        "by": by,
+        "rows": rollup(segments, sites, by)
+    })
 
-active_sessions = {}
-daily_totals = {}
 
-lock = threading.Lock()
+log = logging.getLogger("werkzeug")
+log.setLevel(logging.ERROR)
 
-os.makedirs(REPORT_DIR, exist_ok=True)
+session_store = Lazy(lambda: SessionStore(SESSION_DB, lock_wait=LOCK_WAIT))
+
+# The extension sends a heartbeat every 30s while a tab is focused.
+SESSION_GRACE = 120
+SWEEP_INTERVAL = 15
+DAILY_TOTAL_DAYS = 2
+SESSIONS_SWEPT = Counter("trackit_sessions_swept_total", "Browser sessions closed by the sweeper after their heartbeats stopped")
+
+def sweep_sessions(now=None):
+    now = now or time.time()
+    keep_from = date.fromtimestamp(now) - timedelta(days=DAILY_TOTAL_DAYS)
+    ended = session_store.sweep(now - SESSION_GRACE, keep_from)
+    if ended:
+        SESSIONS_SWEPT.inc(len(ended))
+        persist([], ended)
+    return ended
+
+def start_sweeper():
+    def run():
+        while True:
+            time.sleep(SWEEP_INTERVAL)
+            try:
+                sweep_sessions()
+            except Exception as e:
+                logging.getLogger(__name__).warning("session sweep failed: %s", e)
+
+    thread = threading.Thread(target=run, name="session-sweeper", daemon=True)
+    thread.start()
+    return thread
+
+session_sweeper = Lazy(start_sweeper)
+
+@bp.route("/sessions", methods=["GET"])
+def browser_sessions():
+    """Open browser sessions and closed-session seconds per site for one recent day."""
+    try:
+        day = date.fromisoformat(request.args["date"]) if request.args.get("date") else date.today()
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    if day < date.today() - timedelta(days=DAILY_TOTAL_DAYS):
+        return jsonify({"error": f"per-day totals are kept for {DAILY_TOTAL_DAYS} days; use /usage?kind=sites"}), 400
+
+    active = [
+        {"site": site, "start": session["start"].isoformat(), "date": session["date"].isoformat(),
+         "last_seen": session["last_seen"].isoformat()}
+        for site, session in sorted(session_store.active().items())
+    ]
+    totals = session_store.totals(day)
+    sites = [{"site": site, "seconds": round(seconds, 3)} for site, seconds in sorted(totals.items(), key=lambda kv: -kv[1])]
+    return jsonify({"date": day.isoformat(), "active": active, "sites": sites})
+
+WRITE_QUEUE_SIZE = 10000
+COMPACT_INTERVAL = 3600
+ALLTIME_CSV = os.path.join(REPORT_DIR, "alltime.csv")
+ALLTIME_LOCK = os.path.join(REPORT_DIR, "alltime_lock.db")
+REPORT_HEADER = ["date", "site", "total_seconds", "minutes", "hours"]
+MAX_BATCH_EVENTS = 500
+
+background_writer = Lazy(lambda: BackgroundWriter(LOG_FILE, maxsize=WRITE_QUEUE_SIZE))
+fleet_pusher = Lazy(lambda: open_pusher("backend", FLEET_OUTBOX))
+last_compaction = 0
+# Every worker appends to alltime.csv and any of them may compact it.
+alltime_lock = ProcessLock(ALLTIME_LOCK)
+
+Gauge("trackit_active_sessions", "Open browser sessions", function=lambda: session_store.count())
+Gauge("trackit_write_queue_depth", "Pending background writes",
+      function=lambda: background_writer.depth() if background_writer.loaded else 0)
 
 def log_to_file(message):
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(message + "\n")
+    background_writer.log(message)
 
-def export_day_to_csv(day, site_data):
-    filename = f"usage_{day}.csv"
-    path = os.path.join(REPORT_DIR, filename)
+def append_report_row(path, day, site, total_seconds):
     file_exists = os.path.exists(path)
 
     with open(path, "a", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
 
         if not file_exists:
-            writer.writerow(["date", "site", "total_seconds", "minutes", "hours"])
-
-        for site, duration in site_data.items():
-            total_seconds = int(duration.total_seconds())
-            hours = total_seconds // 3600
-            minutes = (total_seconds % 3600) // 60
-            writer.writerow([day.isoformat(), site, total_seconds, minutes, hours])
-
-    alltime = f"alltime.csv"
-    path = os.path.join(REPORT_DIR, alltime)
-    fglobal = os.path.exists(path)
-
-    with open(path, "a", newline="", encoding="utf-8") as f:
+            writer.writerow(REPORT_HEADER)
+
+        hours = total_seconds // 3600
+        minutes = (total_seconds % 3600) // 60
+        writer.writerow([day.isoformat(), site, total_seconds, minutes, hours])
+
+def export_day_to_csv(day, site, duration):
+    total_seconds = int(duration.total_seconds())
+    with WRITE_SECONDS.labels("report_row").time():
+        append_report_row(os.path.join(REPORT_DIR, f"usage_{day}.csv"), day, site, total_seconds)
+        # The session reaches the rollup before the CSV, so a compaction by
+        # any worker rewrites the file with it rather than dropping it.
+        with alltime_lock:
+            usage_db.flush()
+            append_report_row(ALLTIME_CSV, day, site, total_seconds)
+
+    if time.time() - last_compaction >= COMPACT_INTERVAL:
+        compact_alltime()
+
+def compact_alltime(db=usage_db):
+    """Rewrite alltime.csv from the site rollup, at most once per COMPACT_INTERVAL across workers.
+
+    Appends and compactions all hold ``alltime_lock``, whose meta table
+    records when any worker last compacted.
+    """
+    global last_compaction
+    with alltime_lock as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'last_compaction'").fetchone()
+        if row and time.time() - float(row[0]) < COMPACT_INTERVAL:
+            last_compaction = float(row[0])
+            return False
+        _compact_alltime(db, conn)
+    return True
+
+def _compact_alltime(db, conn):
+    global last_compaction
+    db.flush()
+
+    def write(f):
         writer = csv.writer(f)
+        writer.writerow(REPORT_HEADER)
+        for day, site, seconds in db.site_rollup():
+            total_seconds = int(seconds)
+            writer.writerow([day, site, total_seconds, (total_seconds % 3600) // 60, total_seconds // 3600])
+
+    with WRITE_SECONDS.labels("alltime_compaction").time():
+        atomic_write(ALLTIME_CSV, write)
+    last_compaction = time.time()
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_compaction', ?)", (str(last_compaction),))
+
+def migrate_alltime(db=usage_db):
+    if db.get_meta("site_rollup") is not None:
+        return
 
-        if not fglobal:
-            writer.writerow(["date", "site", "total_seconds", "minutes", "hours"])
-
-        for site, duration in site_data.items():
-            total_seconds = int(duration.total_seconds())
-            hours = total_seconds // 3600
-            minutes = (total_seconds % 3600) // 60
-            writer.writerow([day.isoformat(), site, total_seconds, minutes, hours])
-
-@app.route("/log_url", methods=["POST"])
-def log_url():
-    data = request.get_json(force=True)
-
+    with alltime_lock as conn:
+        # Another worker may have migrated while this one waited for the lock.
+        if db.get_meta("site_rollup") is not None:
+            return
+
+        totals = {}
+        if os.path.exists(ALLTIME_CSV):
+            with open(ALLTIME_CSV, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        key = (row["date"], row["site"])
+                        totals[key] = max(totals.get(key, 0), int(row["total_seconds"]))
+                    except (KeyError, ValueError):
+                        continue
+
+        db.import_site_totals(totals)
+        db.set_meta("site_rollup", "1")
+        _compact_alltime(db, conn)
+
+def parse_event(data):
     event = data.get("event")
     url = data.get("url")
     timestamp = datetime.fromisoformat(data["timestamp"].replace("Z", "+00:00"))
     event_date = datetime.fromisoformat(data["date"]).date()
+    if not event or not url:
+        raise ValueError("event and url are required")
+    return event, url, timestamp, event_date
+
+def persist(events, ended):
+    for site, session, end in ended:
+        usage_db.add_site(session["start"].timestamp(), end.timestamp(), site, session["date"].isoformat())
+        usage_db.add_interval("sites", session["start"].timestamp(), end.timestamp(), site)
+        background_writer.call(export_day_to_csv, session["date"], site, end - session["start"])
+        if FLEET_URL:
+            background_writer.call(fleet_pusher.add_site, session["date"].isoformat(), site,
+                                   (end - session["start"]).total_seconds())
+        event_bus.publish("site", {
+            "site": site,
+            "usage_seconds": round((end - session["start"]).total_seconds(), 3),
+            "date": session["date"].isoformat(),
+            "ts": end.timestamp()
+        })
+
+    for event, url, timestamp, _ in events:
+        log_to_file(f"{event.upper()} | {url} | {timestamp.isoformat()}")
 
-    with lock:
-        for site, session in list(active_sessions.items()):
-            if session["date"] != event_date:
-                duration = timestamp - session["start"]
-                daily_totals.setdefault(session["date"], {})
-                daily_totals[session["date"]].setdefault(site, timedelta())
-                daily_totals[session["date"]][site] += duration
-                export_day_to_csv(session["date"], daily_totals[session["date"]])
-                active_sessions.pop(site)
-
-        if event == "started":
-            active_sessions[url] = {
-                "start": timestamp,
-                "date": event_date
-            }
+def ingest(events):
+    for event in events:
+        # Event names come from the client; only known ones get their own series.
+        LOG_EVENTS.labels(event[0] if event[0] in EVENTS else "other").inc()
+    ended = session_store.apply(events)
+    persist(events, ended)
 
-        elif event in ("session terminated", "paused"):
-            session = active_sessions.pop(url, None)
-            if session:
-                duration = timestamp - session["start"]
-                daily_totals.setdefault(session["date"], {})
-                daily_totals[session["date"]].setdefault(url, timedelta())
-                daily_totals[session["date"]][url] += duration
-                export_day_to_csv(session["date"], daily_totals[session["date"]])
+def backpressure():
+    response = jsonify({"status": "backpressure", "queue": background_writer.status()})
+    response.headers["Retry-After"] = "1"
+    return response, 503
 
-        elif event == "heartbeat":
-            pass
+@bp.route("/log_url", methods=["POST"])
+def log_url():
+    if background_writer.saturated(1):
+        return backpressure()
 
-        log_to_file(f"{event.upper()} | {url} | {timestamp.isoformat()}")
+    try:
+        parsed = parse_event(request.get_json(force=True))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        LOG_EVENTS.labels("invalid").inc()
+        return jsonify({"status": "invalid event"}), 400
 
+    ingest([parsed])
     return jsonify({"status": "ok"})
 
+@bp.route("/log_url/batch", methods=["POST"])
+def log_url_batch():
+    data = request.get_json(force=True)
+    if isinstance(data, dict):
+        data = data.get("events")
+    if not isinstance(data, list) or len(data) > MAX_BATCH_EVENTS:
+        return jsonify({"status": f"expected a list of at most {MAX_BATCH_EVENTS} events"}), 400
+
+    if background_writer.saturated(len(data)):
+        return backpressure()
+
+    events = []
+    rejected = 0
+    for item in data:
+        try:
+            events.append(parse_event(item))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            rejected += 1
+    if rejected:
+        LOG_EVENTS.labels("invalid").inc(rejected)
+
+    ingest(events)
+    return jsonify({
+        "status": "ok",
+        "accepted": len(events),
+        "rejected": rejected,
+        "queue": background_writer.status()
+    })
+
+def tracker_metrics():
+    try:
+        with open(TRACKER_METRICS, "r", encoding="utf-8") as f:
+            text = f.read()
+        age = time.time() - os.path.getmtime(TRACKER_METRICS)
+    except OSError:
+        return ""
+    return (
+        text
+        + "# HELP trackit_tracker_metrics_age_seconds Seconds since main.py last exported its metrics\n"
+        + "# TYPE trackit_tracker_metrics_age_seconds gauge\n"
+        + f"trackit_tracker_metrics_age_seconds {age:.3f}\n"
+    )
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(merge_exposition(REGISTRY.render(), tracker_metrics()), mimetype="text/plain; version=0.0.4")
+
+fleet_bp = Blueprint("fleet", __name__)
+fleet_store = Lazy(lambda: FleetStore(FLEET_DIR))
+MAX_FLEET_BATCH = 5000
+
+@fleet_bp.route("/fleet/ingest", methods=["POST"])
+def fleet_ingest():
+    if not authorized(request.headers.get("Authorization")):
+        return jsonify({"status": "a valid fleet token is required (TRACKIT_FLEET_TOKEN)"}), 401
+
+    try:
+        body = request.get_data()
+        if request.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        data = json.loads(body)
+        host, stream, records = data["host"], data.get("stream", "default"), data["records"]
+    except (OSError, EOFError, ValueError, KeyError, TypeError):
+        return jsonify({"status": "expected JSON with host, stream and records"}), 400
+
+    if not valid_host(host) or not valid_host(stream) or not isinstance(records, list) or len(records) > MAX_FLEET_BATCH:
+        return jsonify({"status": f"host/stream must match [A-Za-z0-9._-]{{1,64}}, at most {MAX_FLEET_BATCH} records"}), 400
+
+    acked, applied, duplicates, rejected = fleet_store.ingest(host, stream, records)
+    return jsonify({"status": "ok", "acked": acked, "applied": applied, "duplicates": duplicates, "rejected": rejected})
+
+@fleet_bp.route("/fleet/summary", methods=["GET"])
+def fleet_summary():
+    kind = request.args.get("kind", "apps")
+    start = request.args.get("from", "")
+    end = request.args.get("to", "")
+    if kind not in KINDS:
+        return jsonify({"error": "kind must be apps or sites"}), 400
+    try:
+        for value in (start, end):
+            if value:
+                date.fromisoformat(value)
+    except ValueError:
+        return jsonify({"error": "from/to must be YYYY-MM-DD"}), 400
+
+    hosts = [h for h in request.args.get("host", "").split(",") if h]
+    queried, rows = fleet_store.query(kind, start, end or "9999-12-31", hosts)
+    return jsonify({"kind": kind, "from": start or None, "to": end or None, "hosts": queried, "rows": rows})
+
+@fleet_bp.route("/fleet/hosts", methods=["GET"])
+def fleet_hosts():
+    return jsonify({"hosts": fleet_store.status()})
+
+def warm_up():
+    """Build the lazy subsystems and prime the caches behind the first requests."""
+    steps = [
+        ("usage_db", usage_db.get),
+        ("session_store", session_store.get),
+        ("session_sweeper", session_sweeper.get),
+        ("background_writer", background_writer.get),
+        ("journal_tailer", journal_tailer.get),
+        ("summary", lambda: (category_totals(GLOBAL_CSV), read_csv_safe(GLOBAL_CSV))),
+        ("summary_index", lambda: usage_index(GLOBAL_CSV)),
+        ("weekly", lambda: response_cache.entry("weekly", weekly_version(), lambda: get_weekly_summary(USAGE_DIR))),
+        ("photo_index", photo_index.refresh),
+        ("report_jobs", report_jobs.get),
+    ]
+    if FLEET_URL:
+        steps.append(("fleet_pusher", fleet_pusher.get))
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logging.getLogger(__name__).warning("warm-up step %s failed: %s", name, e)
+        WARM_UP.labels(name).set(round(time.perf_counter() - started, 4))
+
+def create_app(warm=True, aggregator=AGGREGATOR):
+    """Build the Flask app; subsystems load lazily or in a background warm-up.
+
+    With ``aggregator`` the app also accepts pushes from other TrackIT hosts
+    under /fleet and answers fleet-wide queries.
+    """
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(bp)
+    if aggregator:
+        app.register_blueprint(fleet_bp)
+        if not FLEET_TOKEN:
+            logging.getLogger(__name__).error(
+                "TRACKIT_FLEET_TOKEN is not set; /fleet/ingest will reject every push with 401")
+    if warm:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    return app
+
 if __name__ == "__main__":
-    app.run(port=6001, debug=True)
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true", help="Flask dev server with the reloader")
+    parser.add_argument("--aggregator", action="store_true", help="also accept fleet pushes under /fleet")
+    parser.add_argument("--port", type=int, default=6001)
+    args = parser.parse_args()
+
+    # Single process; serve.py runs several workers behind one socket.
+    create_app(aggregator=args.aggregator or AGGREGATOR).run(port=args.port, debug=args.debug, threaded=True)
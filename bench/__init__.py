@@ -0,0 +1,4 @@
+"""Synthetic workloads and a timing harness for TrackIT's hot paths.
+
+Run ``python -m bench --help`` from the repository root.
+"""
@@ -0,0 +1,333 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from bench import workload
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get("/summary").status_code
+print(json.dumps({"create": created - started, "first_response": time.perf_counter() - started, "ok": status == 200}))
+"""
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name, params, latencies, errors, wall, peak):
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "name": name,
+        "params": params,
+        "iterations": len(latencies),
+        "errors": errors,
+        "throughput_per_s": round(len(latencies) / wall, 2) if wall else None,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 4) if ms else None,
+            "p99": round(percentile(ms, 99), 4) if ms else None,
+            "mean": round(sum(ms) / len(ms), 4) if ms else None,
+            "max": round(ms[-1], 4) if ms else None,
+        },
+        "peak_memory_bytes": peak,
+    }
+
+
+def measure(name, params, fn, iterations, setup=None, memory=True):
+    """Time ``fn()`` ``iterations`` times on one thread.
+
+    ``setup`` runs before every call and is not timed. ``fn`` returns a
+    falsy value to count an iteration as an error.
+    """
+    latencies = []
+    errors = 0
+    if memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    timed = 0.0
+    for _ in range(iterations):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        ok = fn()
+        elapsed = time.perf_counter() - t0
+        timed += elapsed
+        latencies.append(elapsed)
+        if ok is False:
+            errors += 1
+
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    wall = timed if setup else time.perf_counter() - started
+    return summarize(name, params, latencies, errors, wall, peak)
+
+
+def measure_concurrent(name, params, send, items, concurrency, rate=0, memory=True):
+    """Spread ``items`` over ``concurrency`` threads, each calling ``send(client_state, item)``.
+
+    ``rate`` caps the combined send rate in items per second.
+    """
+    shards = [items[i::concurrency] for i in range(concurrency)]
+    per_thread = rate / concurrency if rate else 0
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(shard):
+        local = []
+        failed = 0
+        state = {}
+        for item in workload.paced(shard, per_thread):
+            t0 = time.perf_counter()
+            ok = send(state, item)
+            local.append(time.perf_counter() - t0)
+            if not ok:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    if memory:
+        tracemalloc.start()
+    threads = [threading.Thread(target=worker, args=(shard,)) for shard in shards]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return summarize(name, params, latencies, errors[0], wall, peak)
+
+
+def tracker_cases(tracker, data_dir, params, iterations, memory):
+    from journal import UsageJournal, write_usage_csv
+
+    global_csv = os.path.join(tracker.USAGE_DIR, "global.csv")
+    totals = tracker.load_existing(global_csv, "app_name")
+    out = os.path.join(data_dir, "bench_save.csv")
+
+    journal_dir = os.path.join(data_dir, "bench_journal")
+    journal = UsageJournal(journal_dir, snapshot_interval=3600, materialize_interval=0)
+    apps = list(totals)[:10] or ["App 0000"]
+    day_csv = os.path.join(journal_dir, "day.csv")
+    day_label = "bench"
+
+    legacy_csv = os.path.join(data_dir, "bench_legacy.csv")
+    write_usage_csv(legacy_csv, "app_name", totals, "global")
+
+    def legacy_save_csv():
+        # The per-tick save the journal replaced: re-read the whole CSV, add
+        # the deltas and rewrite it.
+        existing = tracker.load_existing(legacy_csv, "app_name")
+        for app in apps:
+            row = existing.setdefault(app, {"usage_seconds": 0, "open_count": 0})
+            row["usage_seconds"] += 5
+        existing[apps[0]]["open_count"] += 1
+        write_usage_csv(legacy_csv, "app_name", existing, "global")
+
+    def journal_save_tick():
+        journal.record("2026-01-01", {app: 5.0 for app in apps}, {apps[0]: 1})
+        journal.materialize(day_csv, day_label, os.path.join(journal_dir, "global.csv"))
+
+    results = [
+        measure("legacy_save_csv", params, legacy_save_csv, iterations, memory=memory),
+        measure("journal_save_tick", params, journal_save_tick, iterations, memory=memory),
+        measure("write_usage_csv", params, lambda: write_usage_csv(out, "app_name", totals, "global"), iterations, memory=memory),
+        measure("load_existing", params, lambda: tracker.load_existing(global_csv, "app_name"), iterations, memory=memory),
+    ]
+    journal._file.close()
+    return results
+
+
+def backend_cases(backend, data_dir, params, iterations, memory):
+    client = backend.create_app(warm=False).test_client()
+    weekly_out = os.path.join(data_dir, "weekly.csv")
+
+    def cold():
+        backend.csv_cache.invalidate()
+        backend.response_cache.invalidate()
+
+    def get(path):
+        return lambda: client.get(path).status_code == 200
+
+    return [
+        measure("generate_weekly_report.cold", params, lambda: backend.generate_weekly_report(backend.USAGE_DIR, weekly_out),
+                iterations, setup=cold, memory=memory),
+        measure("generate_weekly_report.warm", params, lambda: backend.generate_weekly_report(backend.USAGE_DIR, weekly_out),
+                iterations, memory=memory),
+        measure("GET /summary.cold", params, get("/summary"), iterations, setup=cold, memory=memory),
+        measure("GET /summary.warm", params, get("/summary"), iterations, memory=memory),
+        measure("GET /summary/weekly.cold", params, get("/summary/weekly"), iterations, setup=cold, memory=memory),
+        measure("GET /summary/weekly.warm", params, get("/summary/weekly"), iterations, memory=memory),
+    ]
+
+
+def export_cases(backend, params, iterations, memory):
+    """Full /export pulls; ``rows_per_s`` divides the rows streamed by the mean pull time."""
+    client = backend.create_app(warm=False).test_client()
+    results = []
+    for fmt in ("ndjson", "csv"):
+        rows = [0]
+
+        def pull():
+            response = client.get(f"/export?kind=apps&format={fmt}", buffered=False)
+            rows[0] = sum(chunk.count(b"\n") for chunk in response.response) - (fmt == "csv")
+            return response.status_code == 200
+
+        case = measure(f"GET /export.{fmt}", params, pull, iterations, memory=memory)
+        mean = case["latency_ms"]["mean"]
+        case["rows"] = rows[0]
+        case["rows_per_s"] = round(rows[0] / (mean / 1000), 1) if mean else None
+        results.append(case)
+    return results
+
+
+def ingest_cases(backend, params, events, concurrency, rate, batch, memory):
+    app = backend.create_app(warm=False)
+
+    def client(state):
+        if "client" not in state:
+            state["client"] = app.test_client()
+        return state["client"]
+
+    def send_one(state, event):
+        return client(state).post("/log_url", json=event).status_code == 200
+
+    def send_batch(state, chunk):
+        return client(state).post("/log_url/batch", json={"events": chunk}).status_code == 200
+
+    chunks = [events[i:i + batch] for i in range(0, len(events), batch)]
+    params = dict(params, concurrency=concurrency, rate=rate)
+    results = [
+        measure_concurrent("POST /log_url", params, send_one, events, concurrency, rate, memory),
+        measure_concurrent("POST /log_url/batch", dict(params, batch=batch), send_batch, chunks, concurrency,
+                           rate / batch if rate else 0, memory),
+    ]
+    backend.background_writer.flush(timeout=30)
+    return results
+
+
+def cold_start_case(data_dir, iterations):
+    """Time-to-first-response of a fresh interpreter: import, create_app, GET /summary."""
+    latencies = []
+    creates = []
+    errors = 0
+    env = dict(os.environ, TRACKIT_DATA=data_dir)
+    for _ in range(iterations):
+        out = subprocess.run([sys.executable, "-c", COLD_START], cwd=REPO_DIR, env=env,
+                             capture_output=True, text=True, check=False)
+        try:
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            errors += 1
+            continue
+        latencies.append(result["first_response"])
+        creates.append(result["create"])
+        errors += not result["ok"]
+
+    case = summarize("cold_start.first_response", {}, latencies, errors, sum(latencies), None)
+    case["create_app_ms_p50"] = round(percentile(sorted(creates), 50) * 1000, 4) if creates else None
+    return case
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark TrackIT tracker and backend hot paths")
+    parser.add_argument("--apps", type=int_list, default=[50, 500], help="comma-separated app counts")
+    parser.add_argument("--days", type=int_list, default=[7, 90], help="comma-separated days of history")
+    parser.add_argument("--sites", type=int, default=200)
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4], help="comma-separated ingest thread counts")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--events", type=int, default=2000, help="extension events per ingest case")
+    parser.add_argument("--events-file", help="replay these JSON-lines events instead of generating them")
+    parser.add_argument("--rate", type=float, default=0, help="events/sec across all threads, 0 for unpaced")
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cold-starts", type=int, default=5, help="fresh-interpreter startups to time")
+    parser.add_argument("--exports", type=int, default=3, help="full /export pulls per format and workload")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peak tracking")
+    parser.add_argument("--data", help="data directory (default: a fresh temp dir)")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    data_dir = args.data or tempfile.mkdtemp(prefix="trackit-bench-")
+    os.environ["TRACKIT_DATA"] = data_dir
+    memory = not args.no_memory
+
+    import app as backend
+    import main as tracker
+
+    results = {
+        "meta": {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "data_dir": data_dir,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "data")},
+        },
+        "workloads": [],
+        "cases": [],
+    }
+
+    if args.events_file:
+        events = workload.read_events(args.events_file)
+    else:
+        events = list(workload.event_stream(args.sites, args.events, args.seed))
+
+    for apps in args.apps:
+        for days in args.days:
+            stats = workload.generate(data_dir, apps, days, args.sites, args.seed)
+            results["workloads"].append(stats)
+            backend.csv_cache.invalidate()
+            backend.response_cache.invalidate()
+            params = {"apps": apps, "days": days}
+
+            results["cases"] += tracker_cases(tracker, data_dir, params, args.iterations, memory)
+            results["cases"] += backend_cases(backend, data_dir, params, args.iterations, memory)
+            if args.exports:
+                stats["usage_rows"] = workload.seed_usage_db(backend.DB_FILE, apps, days, args.seed)
+                results["cases"] += export_cases(backend, params, args.exports, memory)
+
+    if args.cold_starts:
+        results["cases"].append(cold_start_case(data_dir, args.cold_starts))
+
+    for concurrency in args.concurrency:
+        params = {"events": len(events)}
+        results["cases"] += ingest_cases(backend, params, events, concurrency, args.rate, args.batch, memory)
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return results
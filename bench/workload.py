@@ -0,0 +1,169 @@
+import csv
+import json
+import os
+import random
+import shutil
+import time
+from datetime import date, datetime, timedelta
+
+from journal import write_usage_csv
+
+CATEGORIES = ["dev", "browser", "communication", "media", "office", "other"]
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+REPORT_HEADER = ["date", "site", "total_seconds", "minutes", "hours"]
+
+
+def app_names(n):
+    return [f"App {i:04d}" for i in range(n)]
+
+
+def site_names(n):
+    return [f"site{i:04d}.example.com" for i in range(n)]
+
+
+def day_totals(rng, apps, active=0.3):
+    """One day of usage: a heavy-tailed share of a working day over a subset of apps."""
+    totals = {}
+    for i, app in enumerate(apps):
+        if rng.random() > active and i:
+            continue
+        totals[app] = {
+            "usage_seconds": int(rng.paretovariate(1.2) * 120),
+            "open_count": rng.randint(1, 40),
+            "category": CATEGORIES[i % len(CATEGORIES)],
+        }
+    return totals
+
+
+def generate(data_dir, apps=50, days=7, sites=100, seed=0, end=None):
+    """Write ``days`` days of tracker and extension history under ``data_dir``.
+
+    Creates usage/<weekday>.csv for the last seven of those days,
+    usage/global.csv with the all-time totals, and one webreports/usage_<date>.csv
+    per day plus webreports/alltime.csv. Any previous workload is removed.
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    usage_dir = os.path.join(data_dir, "usage")
+    report_dir = os.path.join(data_dir, "webreports")
+    for directory in (usage_dir, report_dir):
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+    names = app_names(apps)
+    hosts = site_names(sites)
+    all_time = {}
+    report_rows = 0
+
+    with open(os.path.join(report_dir, "alltime.csv"), "w", newline="", encoding="utf-8") as alltime:
+        alltime_writer = csv.writer(alltime)
+        alltime_writer.writerow(REPORT_HEADER)
+
+        for offset in range(days - 1, -1, -1):
+            day = end - timedelta(days=offset)
+            totals = day_totals(rng, names)
+            for app, v in totals.items():
+                entry = all_time.setdefault(app, {"usage_seconds": 0, "open_count": 0, "category": v["category"]})
+                entry["usage_seconds"] += v["usage_seconds"]
+                entry["open_count"] += v["open_count"]
+
+            if offset < 7:
+                weekday = WEEKDAYS[day.weekday()]
+                write_usage_csv(os.path.join(usage_dir, f"{weekday}.csv"), "app_name", totals, weekday)
+
+            with open(os.path.join(report_dir, f"usage_{day}.csv"), "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(REPORT_HEADER)
+                for site in rng.sample(hosts, max(1, len(hosts) // 3)):
+                    seconds = int(rng.paretovariate(1.3) * 60)
+                    row = [day.isoformat(), site, seconds, (seconds % 3600) // 60, seconds // 3600]
+                    writer.writerow(row)
+                    alltime_writer.writerow(row)
+                    report_rows += 1
+
+    write_usage_csv(os.path.join(usage_dir, "global.csv"), "app_name", all_time, "global")
+    return {"apps": len(all_time), "days": days, "sites": sites, "report_rows": report_rows}
+
+
+def seed_usage_db(path, apps=50, days=7, seed=0, end=None):
+    """Replace the app time series in the usage database with ``days`` of minute buckets.
+
+    One app is in the foreground at a time, switching after a heavy-tailed
+    dwell, so each minute holds one or two rows as it would from the tracker.
+    Rollup watermarks are reset, so every row is read from the raw table.
+    """
+    from retention import tier_table
+    from usagedb import UsageDB
+
+    rng = random.Random(seed)
+    names = app_names(apps)
+    db = UsageDB(path)
+    with db.conn:
+        for tier in ("raw", "hourly", "daily", "weekly"):
+            db.conn.execute(f"DELETE FROM {tier_table('apps', tier)}")
+        db.conn.execute("DELETE FROM meta WHERE key LIKE 'watermark_%'")
+
+    clock = (end or time.time()) - days * 86400
+    stop = clock + days * 86400
+    while clock < stop:
+        dwell = min(stop - clock, rng.paretovariate(1.5) * 60)
+        db.add_app(clock, clock + dwell, rng.choice(names), opens=1)
+        clock += dwell
+        if db.pending() >= db.max_pending:
+            db.flush()
+    db.flush()
+    rows = db.conn.execute("SELECT COUNT(*) FROM app_usage").fetchone()[0]
+    db.close()
+    return rows
+
+
+def event_stream(sites=100, count=1000, seed=0, start=None, heartbeat=0.5):
+    """Extension events as the /log_url endpoint receives them.
+
+    Sessions open and close over ``sites`` hosts in timestamp order; each
+    tick is one event, and roughly ``heartbeat`` of the ticks are heartbeats
+    for a site that is already open.
+    """
+    rng = random.Random(seed)
+    hosts = site_names(sites)
+    clock = start or datetime.now().replace(microsecond=0) - timedelta(seconds=count * 5)
+    open_sites = []
+
+    for _ in range(count):
+        clock += timedelta(seconds=rng.randint(1, 10))
+        if open_sites and rng.random() < heartbeat:
+            event, url = "heartbeat", rng.choice(open_sites)
+        elif open_sites and (len(open_sites) > 5 or rng.random() < 0.5):
+            url = open_sites.pop(rng.randrange(len(open_sites)))
+            event = rng.choice(["paused", "session terminated"])
+        else:
+            url = rng.choice(hosts)
+            event = "started"
+            if url not in open_sites:
+                open_sites.append(url)
+        yield {"event": event, "url": url, "timestamp": clock.isoformat(), "date": clock.date().isoformat()}
+
+
+def write_events(path, events):
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def read_events(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def paced(events, rate):
+    """Yield events no faster than ``rate`` per second (0 means unpaced)."""
+    if not rate:
+        yield from events
+        return
+
+    start = time.perf_counter()
+    for i, event in enumerate(events):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield event
@@ -1,37 +1,255 @@
 import cv2
+import argparse
 import os
-from datetime import datetime
-import time
+import queue
 import random
+import threading
+from datetime import datetime
+
+from journal import atomic_write
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("TRACKIT_DATA", BASE_DIR)
+PHOTO_DIR = os.path.join(DATA_DIR, "CapturedPhotos")
+
+CAPTURE_INTERVAL = (30, 120)
+WARMUP_FRAMES = 15
+WARM_REOPEN_FRAMES = 3
+STALE_FRAMES = 4
+IDLE_RELEASE = 300
+DIFF_THRESHOLD = 4.0
+SIGNATURE_SIZE = (32, 24)
+JPEG_QUALITY = 90
+
+WARM_PROPS = [cv2.CAP_PROP_EXPOSURE, cv2.CAP_PROP_GAIN, cv2.CAP_PROP_WB_TEMPERATURE]
+
+
+class CameraSource:
+    """Webcam opened lazily and kept open between shots.
+
+    The first open discards WARMUP_FRAMES frames while exposure settles and
+    remembers the settled exposure/gain/white balance. A later reopen
+    applies those values and only needs WARM_REOPEN_FRAMES frames.
+
+    Drivers keep buffering frames while nobody reads them, so after the
+    wait between shots the oldest buffered frame can be minutes old. The
+    buffer is shrunk to one frame where the backend allows it, and each
+    read grabs past STALE_FRAMES frames before decoding the newest.
+    """
+
+    stale_frames = STALE_FRAMES
+
+    def __init__(self, index=0):
+        self.index = index
+        self.cam = None
+        self.warm_state = None
 
-def auto_capture():
-    folder = "CapturedPhotos"
-    os.makedirs(folder, exist_ok=True)
+    def open(self):
+        self.cam = cv2.VideoCapture(self.index, cv2.CAP_DSHOW)
+        if not self.cam.isOpened():
+            self.cam = None
+            return False
+        self.cam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
-    cam = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-    if not cam.isOpened():
-        return
+        warmup = WARMUP_FRAMES
+        if self.warm_state:
+            for prop, value in self.warm_state.items():
+                self.cam.set(prop, value)
+            warmup = WARM_REOPEN_FRAMES
 
-    for _ in range(15):
-        ret, frame = cam.read()
+        for _ in range(warmup):
+            if not self.cam.grab():
+                self.release()
+                return False
+
+        self.warm_state = {prop: self.cam.get(prop) for prop in WARM_PROPS}
+        return True
+
+    def read(self):
+        if self.cam is None and not self.open():
+            return None
+        for _ in range(self.stale_frames):
+            if not self.cam.grab():
+                self.release()
+                return None
+        ret, frame = self.cam.read()
         if not ret:
-            cam.release()
-            return
-        cv2.waitKey(30)
-
-    ret, frame = cam.read()
-    if not ret:
-        cam.release()
-        return
-
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filepath = os.path.join(folder, f"{timestamp}.jpg")
-    cv2.imwrite(filepath, frame)
-    print(f"Image saved as: {filepath}")
-
-    cam.release()
-    cv2.destroyAllWindows()
-
-auto_capture()
-time.sleep(random.randint(30, 120))
-auto_capture()
+            self.release()
+            return None
+        return frame
+
+    def release(self):
+        if self.cam is not None:
+            self.cam.release()
+            self.cam = None
+
+
+class VideoFileSource(CameraSource):
+    stale_frames = 0
+
+    def __init__(self, path, loop=True):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+
+    def open(self):
+        self.cam = cv2.VideoCapture(self.path)
+        if not self.cam.isOpened():
+            self.cam = None
+            return False
+        return True
+
+    def read(self):
+        frame = super().read()
+        if frame is None and self.loop and self.open():
+            frame = super().read()
+        return frame
+
+
+class SyntheticSource:
+    """Generated frames that only change every ``change_every`` reads."""
+
+    def __init__(self, width=640, height=480, change_every=3, seed=0):
+        import numpy as np
+
+        self.np = np
+        self.rng = np.random.default_rng(seed)
+        self.shape = (height, width, 3)
+        self.change_every = change_every
+        self.reads = 0
+        self.frame = None
+
+    def read(self):
+        if self.frame is None or self.reads % self.change_every == 0:
+            self.frame = self.rng.integers(0, 256, self.shape, dtype=self.np.uint8)
+        self.reads += 1
+        noise = self.rng.integers(0, 3, self.shape, dtype=self.np.uint8)
+        return cv2.add(self.frame, noise)
+
+    def release(self):
+        pass
+
+
+def signature(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+
+
+class CaptureService:
+    """Takes a frame on a schedule and writes the ones that changed.
+
+    A frame is skipped when its downscaled grayscale signature differs from
+    the last saved one by less than ``threshold`` on average. JPEG encoding
+    and disk writes happen on a writer thread, so the capture loop only
+    reads frames.
+    """
+
+    def __init__(self, source, out_dir=PHOTO_DIR, interval=CAPTURE_INTERVAL, threshold=DIFF_THRESHOLD):
+        self.source = source
+        self.out_dir = out_dir
+        self.interval = interval
+        self.threshold = threshold
+        self.last_signature = None
+        self.saved = 0
+        self.skipped = 0
+        self.failed = 0
+        self.writes = queue.Queue(maxsize=8)
+        self.stop_event = threading.Event()
+
+        os.makedirs(out_dir, exist_ok=True)
+        self.writer = threading.Thread(target=self._write_loop, name="cam-writer", daemon=True)
+        self.writer.start()
+
+    def next_delay(self):
+        low, high = self.interval
+        return random.uniform(low, high)
+
+    def capture_once(self):
+        frame = self.source.read()
+        if frame is None:
+            self.failed += 1
+            return None
+
+        sig = signature(frame)
+        if self.last_signature is not None and cv2.absdiff(sig, self.last_signature).mean() < self.threshold:
+            self.skipped += 1
+            return None
+
+        self.last_signature = sig
+        path = self._path()
+        self.writes.put((path, frame))
+        return path
+
+    def _path(self):
+        stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        path = os.path.join(self.out_dir, f"{stamp}.jpg")
+        n = 1
+        while os.path.exists(path):
+            path = os.path.join(self.out_dir, f"{stamp}_{n}.jpg")
+            n += 1
+        return path
+
+    def _write_loop(self):
+        while True:
+            item = self.writes.get()
+            if item is None:
+                return
+            path, frame = item
+            # Encode in memory and rename into place, so the photo index
+            # never catalogues a half-written JPEG.
+            ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            try:
+                if not ok:
+                    raise OSError("JPEG encoding failed")
+                atomic_write(path, lambda f: f.write(data.tobytes()), binary=True)
+                self.saved += 1
+            except OSError:
+                self.failed += 1
+
+    def run(self, count=None):
+        shots = 0
+        try:
+            while not self.stop_event.is_set() and (count is None or shots < count):
+                self.capture_once()
+                shots += 1
+                delay = self.next_delay()
+                if delay > IDLE_RELEASE:
+                    self.source.release()
+                self.stop_event.wait(delay)
+        finally:
+            self.close()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def close(self):
+        self.source.release()
+        self.writes.put(None)
+        self.writer.join()
+
+
+def make_source(spec):
+    if spec == "camera":
+        return CameraSource()
+    if spec == "synthetic":
+        return SyntheticSource()
+    if spec.startswith("video:"):
+        return VideoFileSource(spec[len("video:"):])
+    raise ValueError(f"unknown frame source {spec!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default="camera", help="camera, synthetic or video:<path>")
+    parser.add_argument("--interval", type=float, nargs=2, default=CAPTURE_INTERVAL, metavar=("MIN", "MAX"))
+    parser.add_argument("--count", type=int, help="stop after this many capture attempts")
+    parser.add_argument("--threshold", type=float, default=DIFF_THRESHOLD)
+    parser.add_argument("--out", default=PHOTO_DIR)
+    args = parser.parse_args()
+
+    service = CaptureService(make_source(args.source), args.out, tuple(args.interval), args.threshold)
+    try:
+        service.run(args.count)
+    except KeyboardInterrupt:
+        service.stop()
+    print(f"saved={service.saved} skipped={service.skipped} failed={service.failed}")
@@ -0,0 +1,138 @@
+import fnmatch
+import json
+import os
+import re
+from collections import OrderedDict, namedtuple
+
+Classification = namedtuple("Classification", "app category")
+
+DEFAULT_CATEGORY = "other"
+
+
+class LRU:
+    def __init__(self, size=512):
+        self.size = size
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        try:
+            self.items.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self.items[key]
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+
+def compile_rules(rules):
+    """Fold glob and regex rules into one alternation; the first rule that matches wins."""
+    parts = []
+    for i, rule in enumerate(rules):
+        if rule["match"] == "glob":
+            parts.append(f"(?P<r{i}>{fnmatch.translate(rule['pattern'])})")
+        else:
+            parts.append(f"(?P<r{i}>.*?(?:{rule['pattern']}))")
+    if not parts:
+        return None
+    return re.compile("|".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+class Classifier:
+    """Maps a process (and optionally its window title) to an app name and category.
+
+    Exact process names are a dict lookup; glob and regex rules are
+    precompiled into one matcher per field. Results are memoized per
+    (pid, create_time) so a long-lived process is classified once; without
+    both there is nothing that identifies the process, so nothing is cached.
+    """
+
+    def __init__(self, config=None, cache_size=512):
+        config = config or {}
+        self.default_category = config.get("default_category", DEFAULT_CATEGORY)
+        self.names = {k.lower(): v for k, v in config.get("names", {}).items()}
+        self.ignore = {name.lower() for name in config.get("ignore", [])}
+
+        self.categories = {}
+        for category, apps in config.get("categories", {}).items():
+            for app in apps:
+                self.categories[app.lower()] = category
+
+        self.exact = {}
+        self.pattern_rules = {"process": [], "title": []}
+        for rule in config.get("rules", []):
+            field = rule.get("field", "process")
+            if rule["match"] == "exact":
+                self.exact[(field, rule["pattern"].lower())] = rule
+            else:
+                self.pattern_rules[field].append(rule)
+
+        self.matchers = {field: compile_rules(rules) for field, rules in self.pattern_rules.items()}
+        self.uses_title = bool(self.pattern_rules["title"]) or any(f == "title" for f, _ in self.exact)
+        self.cache = LRU(cache_size)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def normalize(self, process):
+        return self.names.get(process.lower(), process)
+
+    def category_of(self, app):
+        return self.categories.get(app.lower(), self.default_category)
+
+    def _match(self, field, value):
+        if not value:
+            return None
+        rule = self.exact.get((field, value.lower()))
+        if rule:
+            return rule
+        matcher = self.matchers[field]
+        if matcher is None:
+            return None
+        m = matcher.match(value)
+        if m is None:
+            return None
+        return self.pattern_rules[field][int(m.lastgroup[1:])]
+
+    def _classify(self, process, title):
+        rule = None
+        if self.uses_title:
+            rule = self._match("title", title)
+        if rule is None and process.lower() not in self.names:
+            rule = self._match("process", process)
+
+        app = self.normalize(process)
+        if rule is not None:
+            app = rule.get("app", app)
+            category = rule.get("category") or self.category_of(app)
+        else:
+            category = self.category_of(app)
+
+        if app.lower() in self.ignore or category == "ignore":
+            return None
+        return Classification(app, category)
+
+    def classify(self, process, title="", pid=None, create_time=None):
+        if pid is None or create_time is None:
+            return self._classify(process, title)
+
+        key = (pid, create_time, title) if self.uses_title else (pid, create_time)
+        result = self.cache.get(key, self.cache)
+        if result is self.cache:
+            result = self._classify(process, title)
+            self.cache.put(key, result)
+        return result
@@ -0,0 +1,153 @@
+import csv
+import io
+import os
+import threading
+from collections import OrderedDict
+
+
+class CsvCache:
+    """Parsed CSV rows keyed on file identity, mtime and size.
+
+    Unchanged files are served from memory; any change re-reads the file.
+    With ``append_only`` set, a file that kept its identity and only grew
+    has just the appended lines parsed and folded into the cached rows and
+    aggregates, provided the last few KiB before the old end are unchanged.
+    Files rewritten through tmp + rename must not use it: the filesystem
+    reuses inodes, so identity alone cannot tell a rewrite from an append.
+    Entries are evicted least recently used once either bound is exceeded.
+    """
+
+    TAIL_CHECK_BYTES = 4096
+
+    def __init__(self, max_entries=64, max_rows=200000, append_only=False):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.append_only = append_only
+        self.entries = OrderedDict()
+        self.listings = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, path=None):
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+                self.listings.clear()
+                return
+            path = os.path.abspath(path)
+            for key in [k for k in self.entries if k[0] == path]:
+                del self.entries[key]
+            self.listings.pop(os.path.dirname(path), None)
+
+    def listdir(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        with self.lock:
+            cached = self.listings.get(directory)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            names = sorted(os.listdir(directory))
+            self.listings[directory] = (mtime, names)
+            return names
+
+    def rows(self, path, parse):
+        entry = self._entry(path, parse)
+        if entry is None:
+            return None, []
+        return entry["fieldnames"], entry["rows"]
+
+    def aggregate(self, path, parse, reduce, initial):
+        with self.lock:
+            entry = self._refresh(path, parse)
+            if entry is None:
+                return initial()
+
+            acc = entry["aggregates"].get(reduce)
+            if acc is None:
+                acc = [0, initial()]
+                entry["aggregates"][reduce] = acc
+
+            rows = entry["rows"]
+            for row in rows[acc[0]:]:
+                acc[1] = reduce(acc[1], entry["fieldnames"], row)
+            acc[0] = len(rows)
+            return acc[1]
+
+    def _entry(self, path, parse):
+        with self.lock:
+            return self._refresh(path, parse)
+
+    def _refresh(self, path, parse):
+        path = os.path.abspath(path)
+        key = (path, parse)
+
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.entries.pop(key, None)
+            return None
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            if (entry["ino"], entry["mtime"], entry["size"]) == (st.st_ino, st.st_mtime_ns, st.st_size):
+                self.hits += 1
+                return entry
+            if self.append_only and self._grown(path, entry, st):
+                self.misses += 1
+                self._read(path, entry, st)
+                self._evict()
+                return entry
+
+        self.misses += 1
+        entry = {"fieldnames": None, "rows": [], "offset": 0, "aggregates": {}, "parse": parse}
+        self._read(path, entry, st)
+        self.entries[key] = entry
+        self._evict()
+        return entry
+
+    def _grown(self, path, entry, st):
+        if entry["ino"] != st.st_ino or st.st_size <= entry["size"] or not entry["fieldnames"]:
+            return False
+        start = max(0, entry["offset"] - self.TAIL_CHECK_BYTES)
+        with open(path, "rb") as f:
+            f.seek(start)
+            return f.read(entry["offset"] - start) == entry["tail"]
+
+    def _read(self, path, entry, st):
+        with open(path, "rb") as f:
+            f.seek(entry["offset"])
+            data = f.read()
+
+        end = data.rfind(b"\n") + 1
+        text = data[:end].decode("utf-8")
+        reader = csv.reader(io.StringIO(text, newline=""))
+
+        if entry["fieldnames"] is None:
+            entry["fieldnames"] = next(reader, None)
+
+        fieldnames = entry["fieldnames"]
+        parse = entry["parse"]
+        for values in reader:
+            if not values:
+                continue
+            try:
+                entry["rows"].append(parse(dict(zip(fieldnames, values))))
+            except (KeyError, ValueError, TypeError):
+                continue
+
+        entry["offset"] += end
+        entry["tail"] = (entry.get("tail", b"") + data[:end])[-self.TAIL_CHECK_BYTES:]
+        entry["ino"] = st.st_ino
+        entry["mtime"] = st.st_mtime_ns
+        entry["size"] = entry["offset"] if end < len(data) else st.st_size
+
+    def _evict(self):
+        total = sum(len(e["rows"]) for e in self.entries.values())
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or total > self.max_rows):
+            _, entry = self.entries.popitem(last=False)
+            total -= len(entry["rows"])
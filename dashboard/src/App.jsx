@@ -1,9 +1,22 @@
-import React, { useState, useEffect, useMemo, useCallback } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import {
   BarChart, Bar, XAxis, YAxis, Tooltip, Legend, ResponsiveContainer,
   PieChart, Pie, Cell, LineChart, Line
 } from 'recharts';
 import './App.css';
+
+const API = 'http://127.0.0.1:6001';
+const PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 500;
+const SERVER_SORT = { name: 'name', usageCount: 'opens', totalDuration: 'usage' };
+
+const toAppRow = (item, idx) => ({
+  id: idx + 1,
+  name: item.app_name,
+  usageCount: Number(item.open_count) || 0,
+  totalDuration: Number(item.usage_seconds) * 1000 || 0
+});
+
 const App = () => {
   const initialAppData = useMemo(() => [
     { id: 1, name: 'Email Client', usageCount: 120, totalDuration: 7200000 },
@@ -29,7 +42,15 @@ const App = () => {
   };
 
   const [appData, setAppData] = useState(initialAppData);
+  const [totals, setTotals] = useState(null);
+  const [topByCount, setTopByCount] = useState(null);
+  const [topByDuration, setTopByDuration] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [refreshTick, setRefreshTick] = useState(0);
+  const loadedCount = useRef(PAGE_SIZE);
+  const handledTick = useRef(0);
   const [searchTerm, setSearchTerm] = useState('');
+  const [query, setQuery] = useState('');
   const [sortBy, setSortBy] = useState('name');
   const [sortOrder, setSortOrder] = useState('asc');
   const [showSimulateMessage, setShowSimulateMessage] = useState(false);
@@ -40,29 +61,100 @@ const App = () => {
 
 
   useEffect(() => {
-    const fetchSummary = async () => {
-      try {
-        const res = await fetch('http://127.0.0.1:6001/summary');
-        if (!res.ok) throw new Error(`HTTP ${res.status}`);
-
-        const data = await res.json();
-        const source = data[viewMode] || [];
-
-        const formatted = source.map((item, idx) => ({
-          id: idx + 1,
-          name: item.app_name,
-          usageCount: Number(item.open_count) || 0,
-          totalDuration: Number(item.usage_seconds) * 1000 || 0
-        }));
-
-
-        setAppData(formatted);
-      } catch (err) {
-        console.error('Failed to fetch /summary:', err);
-      }
-    };
+    const timer = setTimeout(() => setQuery(searchTerm.trim()), 200);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  const summaryUrl = useCallback((params) => {
+    const search = new URLSearchParams({ view: viewMode, ...params });
+    return `${API}/summary?${search}`;
+  }, [viewMode]);
+
+  const fetchPage = useCallback(async (cursor, limit = PAGE_SIZE) => {
+    const params = { q: query, sort: SERVER_SORT[sortBy], order: sortOrder, limit };
+    if (cursor) params.cursor = cursor;
+    const res = await fetch(summaryUrl(params));
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return res.json();
+  }, [query, sortBy, sortOrder, summaryUrl]);
+
+  useEffect(() => {
+    let cancelled = false;
+    loadedCount.current = PAGE_SIZE;
+    fetchPage(null)
+      .then(data => {
+        if (cancelled) return;
+        setAppData(data.apps.map(toAppRow));
+        setNextCursor(data.next_cursor);
+        setTotals(data.totals);
+      })
+      .catch(err => console.error('Failed to fetch /summary:', err));
+    return () => { cancelled = true; };
+  }, [fetchPage]);
+
+  // Live updates re-read only the rows already on screen; the top-5 cards
+  // are refreshed when the view changes.
+  useEffect(() => {
+    // fetchPage also changes with the filters; the effect above reloads then.
+    if (refreshTick === handledTick.current) return;
+    handledTick.current = refreshTick;
+    let cancelled = false;
+    fetchPage(null, Math.min(loadedCount.current, MAX_PAGE_SIZE))
+      .then(data => {
+        if (cancelled) return;
+        setAppData(data.apps.map(toAppRow));
+        setNextCursor(data.next_cursor);
+        setTotals(data.totals);
+      })
+      .catch(err => console.error('Failed to fetch /summary:', err));
+    return () => { cancelled = true; };
+  }, [refreshTick, fetchPage]);
+
+  useEffect(() => {
+    const top = (sort) => fetch(summaryUrl({ sort, order: 'desc', limit: 5 }))
+      .then(res => res.json())
+      .then(data => data.apps.map(toAppRow));
+
+    Promise.all([top('opens'), top('usage')])
+      .then(([byCount, byDuration]) => {
+        setTopByCount(byCount);
+        setTopByDuration(byDuration);
+      })
+      .catch(err => console.error('Failed to fetch top apps:', err));
+  }, [summaryUrl]);
+
+  const loadMore = useCallback(() => {
+    if (!nextCursor) return;
+    fetchPage(nextCursor)
+      .then(data => {
+        loadedCount.current += data.apps.length;
+        setAppData(prevData => [...prevData, ...data.apps.map((item, idx) => toAppRow(item, prevData.length + idx))]);
+        setNextCursor(data.next_cursor);
+      })
+      .catch(err => console.error('Failed to fetch /summary:', err));
+  }, [fetchPage, nextCursor]);
+
+  useEffect(() => {
+    const source = new EventSource(`${API}/stream`);
+    const today = new Date().toLocaleDateString('en-CA');
+    let pending = null;
+
+    // Deltas only say that something changed; the server re-ranks, so
+    // refetch the visible page at most every few seconds.
+    source.addEventListener('app', (e) => {
+      const delta = JSON.parse(e.data);
+      if (viewMode === 'today' && delta.date !== today) return;
+      if (pending) return;
+      pending = setTimeout(() => {
+        pending = null;
+        setRefreshTick(tick => tick + 1);
+      }, 3000);
+    });
 
-    fetchSummary();
+    return () => {
+      clearTimeout(pending);
+      source.close();
+    };
   }, [viewMode]);
 
   useEffect(() => {
@@ -89,29 +181,6 @@ const App = () => {
     return parts.join(' ');
   }, []);
 
-  const filteredAndSortedAppData = useMemo(() => {
-    let filtered = appData.filter(app =>
-      app.name.toLowerCase().includes(searchTerm.toLowerCase())
-    );
-
-    filtered.sort((a, b) => {
-      let valA, valB;
-      if (sortBy === 'name') {
-        valA = a.name.toLowerCase();
-        valB = b.name.toLowerCase();
-      } else {
-        valA = a[sortBy];
-        valB = b[sortBy];
-      }
-
-      if (valA < valB) return sortOrder === 'asc' ? -1 : 1;
-      if (valA > valB) return sortOrder === 'asc' ? 1 : -1;
-      return 0;
-    });
-
-    return filtered;
-  }, [appData, searchTerm, sortBy, sortOrder]);
-
   const handleSort = useCallback((column) => {
     if (sortBy === column) {
       setSortOrder(sortOrder === 'asc' ? 'desc' : 'asc');
@@ -147,12 +216,14 @@ const App = () => {
   }, [showSimulateMessage]);
 
   const totalUsageDuration = useMemo(() => {
+    if (totals) return totals.usage_seconds * 1000;
     return appData.reduce((sum, app) => sum + app.totalDuration, 0);
-  }, [appData]);
+  }, [appData, totals]);
 
   const totalUsageCount = useMemo(() => {
+    if (totals) return totals.open_count;
     return appData.reduce((sum, app) => sum + (app.usageCount || 0), 0);
-  }, [appData]);
+  }, [appData, totals]);
 
   const PIE_COLORS = ['#0088FE', '#00C49F', '#FFBB28', '#FF8042', '#A28DFF', '#FF6B6B', '#6A0572', '#FB8B24', '#8A2BE2', '#DC143C'];
 
@@ -164,17 +235,19 @@ const App = () => {
   }, [appData]);
 
   const mostUsedApp = useMemo(() => {
+    if (topByCount) return topByCount[0] || { name: '-', usageCount: 0 };
     if (!appData.length) return { name: '-', usageCount: 0 };
 
     return appData.reduce((prev, curr) =>
       (curr.usageCount || 0) > (prev.usageCount || 0) ? curr : prev
     );
-  }, [appData]);
+  }, [appData, topByCount]);
 
   const longestUsedApp = useMemo(() => {
+    if (topByDuration) return topByDuration[0] || { name: '-', totalDuration: 0 };
     if (!appData || appData.length === 0) return { name: '-', totalDuration: 0 };
     return appData.reduce((prev, current) => (prev.totalDuration > current.totalDuration ? prev : current), appData[0]);
-  }, [appData]);
+  }, [appData, topByDuration]);
 
   const dailyUsageData = useMemo(() => {
     const map = {
@@ -193,12 +266,12 @@ const App = () => {
   }, [weeklyData]);
 
   const topAppsByUsageCount = useMemo(() => {
-    return [...appData].sort((a, b) => b.usageCount - a.usageCount).slice(0, 5);
-  }, [appData]);
+    return topByCount || [...appData].sort((a, b) => b.usageCount - a.usageCount).slice(0, 5);
+  }, [appData, topByCount]);
 
   const topAppsByDuration = useMemo(() => {
-    return [...appData].sort((a, b) => b.totalDuration - a.totalDuration).slice(0, 5);
-  }, [appData]);
+    return topByDuration || [...appData].sort((a, b) => b.totalDuration - a.totalDuration).slice(0, 5);
+  }, [appData, topByDuration]);
 
   const toggleTheme = useCallback(() => {
     setTheme(prevTheme => (prevTheme === 'light' ? 'dark' : 'light'));
@@ -241,7 +314,7 @@ const App = () => {
       <section className="stats-grid">
         <div className="stat-card">
           <h3>Total Apps Tracked</h3>
-          <p>{appData.length}</p>
+          <p>{totals ? totals.apps : appData.length}</p>
         </div>
         <div className="stat-card">
           <h3>Total Usage Count</h3>
@@ -294,7 +367,7 @@ const App = () => {
           <h3>App Usage Count</h3>
           <ResponsiveContainer width="100%" height="100%">
             <BarChart
-              data={filteredAndSortedAppData}
+              data={appData}
               margin={{ top: 20, right: 30, left: 20, bottom: 5 }}
             >
               <XAxis dataKey="name" angle={-45} textAnchor="end" height={160} interval={0} />
@@ -314,7 +387,7 @@ const App = () => {
           <ResponsiveContainer width="100%" height="100%">
             <PieChart>
               <Pie
-                data={filteredAndSortedAppData}
+                data={appData}
                 dataKey="totalDuration"
                 nameKey="name"
                 cx="50%"
@@ -324,7 +397,7 @@ const App = () => {
                 labelLine={false}
               >
                 {
-                  filteredAndSortedAppData.map((entry, index) => (
+                  appData.map((entry, index) => (
                     <Cell key={`cell-${index}`} fill={PIE_COLORS[index % PIE_COLORS.length]} />
                   ))
                 }
@@ -423,8 +496,8 @@ const App = () => {
             </tr>
           </thead>
           <tbody>
-            {filteredAndSortedAppData.length > 0 ? (
-              filteredAndSortedAppData.map(app => (
+            {appData.length > 0 ? (
+              appData.map(app => (
                 <tr key={app.id}>
                   <td className="app-name">
                     {app.name}
@@ -453,6 +526,11 @@ const App = () => {
             )}
           </tbody>
         </table>
+        {nextCursor && (
+          <button className="theme-toggle-button" onClick={loadMore}>
+            Load more
+          </button>
+        )}
       </section>
 
       {showSimulateMessage && selectedAppForSim && (
@@ -0,0 +1,69 @@
+import itertools
+import json
+import queue
+import threading
+from collections import deque
+
+
+class EventBus:
+    """Fan-out of small JSON deltas to Server-Sent Events subscribers.
+
+    ``publish`` never blocks: a subscriber whose queue is full is sent a
+    ``resync`` marker and dropped, and the client refetches the full
+    payload when it reconnects. Recent events are kept so a reconnecting
+    client can resume from its Last-Event-ID.
+    """
+
+    def __init__(self, queue_size=1000, history=1000):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.history = deque(maxlen=history)
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def publish(self, event, data):
+        with self.lock:
+            message = (next(self.ids), event, json.dumps(data, separators=(",", ":")))
+            self.history.append(message)
+            for q in list(self.subscribers):
+                try:
+                    q.put_nowait(message)
+                except queue.Full:
+                    self.subscribers.discard(q)
+                    with q.mutex:
+                        q.queue.clear()
+                    q.put_nowait((message[0], "resync", "{}"))
+                    q.put_nowait(None)
+
+    def subscribe(self, last_id=None):
+        q = queue.Queue(self.queue_size)
+        with self.lock:
+            if last_id is not None:
+                missed = [m for m in self.history if m[0] > last_id]
+                if self.history and self.history[0][0] > last_id + 1:
+                    missed = [(self.history[-1][0], "resync", "{}")]
+                for message in missed[-self.queue_size:]:
+                    q.put_nowait(message)
+            self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def stream(self, last_id=None, keepalive=15):
+        q = self.subscribe(last_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = q.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                event_id, event, data = message
+                yield f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+        finally:
+            self.unsubscribe(q)
@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+import time
+import zlib
+from datetime import datetime
+
+from metrics import Counter, Gauge, Histogram
+from usagedb import GRANULARITY, KINDS
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CHUNK_ROWS = 1000
+
+EXPORT_ROWS = Counter("trackit_export_rows_total", "Rows streamed by /export", ["kind", "format"])
+EXPORT_SECONDS = Histogram("trackit_export_duration_seconds", "Wall time of finished /export streams",
+                           buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+EXPORT_RATE = Gauge("trackit_export_rows_per_second", "Throughput of the last finished /export stream")
+
+
+def parse_cursor(value):
+    """``<ts>:<name>`` of the last row received, as (ts, name); None when empty."""
+    if not value:
+        return None
+    ts, sep, name = value.partition(":")
+    if not sep or not name:
+        raise ValueError("cursor must be <ts>:<name>")
+    return int(ts), name
+
+
+def export_rows(db, kind, start, end, granularity="raw", cursor=None, limit=0):
+    """Yield export rows as dicts, oldest first, resuming after ``cursor``.
+
+    Raw rows come out at the resolution they are stored at (minute buckets,
+    or the retention tier that replaced them). Other granularities sum
+    consecutive rows per bucket, so only one bucket's names are held at a
+    time.
+    """
+    column = KINDS[kind][1]
+    if granularity == "raw":
+        rows = ((ts, name, seconds, opens) for ts, name, seconds, opens, _ in db.scan(kind, start, end, cursor))
+    else:
+        if cursor is not None:
+            start = max(start, cursor[0])
+        rows = buckets(db.scan(kind, start, end, bucket=GRANULARITY[granularity][1]))
+        if cursor is not None:
+            rows = (row for row in rows if row[:2] > cursor)
+
+    for count, (ts, name, seconds, opens) in enumerate(rows, 1):
+        row = {
+            "ts": ts,
+            "time": datetime.fromtimestamp(ts).isoformat(),
+            column: name,
+            "seconds": round(seconds, 3),
+        }
+        if kind == "apps":
+            row["opens"] = opens
+        yield row
+        if count == limit:
+            return
+
+
+def buckets(rows):
+    current, totals = None, {}
+    for _, name, seconds, opens, bucket in rows:
+        if bucket != current:
+            for key in sorted(totals):
+                yield (current, key, *totals[key])
+            current, totals = bucket, {}
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += opens
+    for key in sorted(totals):
+        yield (current, key, *totals[key])
+
+
+def chunks(rows, size=CHUNK_ROWS):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def encode(rows, kind, fmt):
+    """Serialize rows a chunk at a time and record rows/sec once the stream ends."""
+    started = time.perf_counter()
+    total = 0
+    counter = EXPORT_ROWS.labels(kind, fmt)
+
+    if fmt == "csv":
+        fields = ["ts", "time", KINDS[kind][1], "seconds"] + (["opens"] if kind == "apps" else [])
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fields)
+        writer.writeheader()
+        yield buffer.getvalue().encode("utf-8")
+
+    for chunk in chunks(rows):
+        if fmt == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(chunk)
+            data = buffer.getvalue()
+        else:
+            data = "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in chunk)
+        total += len(chunk)
+        counter.inc(len(chunk))
+        yield data.encode("utf-8")
+
+    elapsed = time.perf_counter() - started
+    EXPORT_SECONDS.observe(elapsed)
+    if elapsed > 0:
+        EXPORT_RATE.set(round(total / elapsed, 1))
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,428 @@
+import gzip
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from metrics import Counter, Histogram
+
+FLEET_URL = os.environ.get("TRACKIT_FLEET_URL")
+HOST_ID = os.environ.get("TRACKIT_HOST_ID") or socket.gethostname()
+FLEET_TOKEN = os.environ.get("TRACKIT_FLEET_TOKEN")
+
+HOST_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+RECORD_KINDS = ("app", "site")
+
+PUSHED = Counter("trackit_fleet_pushed_records_total", "Usage deltas acknowledged by the fleet aggregator", ["stream"])
+PUSH_FAILURES = Counter("trackit_fleet_push_failures_total", "Pushes to the fleet aggregator that failed", ["stream"])
+INGESTED = Counter("trackit_fleet_ingested_records_total", "Usage deltas received by the aggregator", ["result"])
+MERGE_SECONDS = Histogram("trackit_fleet_merge_seconds", "Time to query every shard and merge the partial aggregates")
+
+OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    record TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+SHARD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS app_daily (
+    date TEXT NOT NULL,
+    app TEXT NOT NULL,
+    seconds REAL NOT NULL DEFAULT 0,
+    opens INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, app)
+);
+
+CREATE TABLE IF NOT EXISTS app_category (
+    app TEXT PRIMARY KEY,
+    category TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS site_daily (
+    date TEXT NOT NULL,
+    site TEXT NOT NULL,
+    seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, site)
+);
+
+CREATE TABLE IF NOT EXISTS stream (
+    stream TEXT PRIMARY KEY,
+    watermark INTEGER NOT NULL DEFAULT 0,
+    last_seen REAL
+);
+
+CREATE TABLE IF NOT EXISTS applied (
+    stream TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (stream, seq)
+) WITHOUT ROWID;
+"""
+
+
+def valid_host(host):
+    return isinstance(host, str) and bool(HOST_PATTERN.match(host))
+
+
+def authorized(header, token=None):
+    """Whether an Authorization header carries the shared fleet token.
+
+    Without a configured token the aggregator accepts no pushes at all.
+    """
+    token = token or FLEET_TOKEN
+    if not token or not header or not header.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(header[len("Bearer "):].encode("utf-8"), token.encode("utf-8"))
+
+
+def parse_record(record):
+    """Validate one pushed delta; raises ValueError."""
+    kind = record.get("kind")
+    if kind not in RECORD_KINDS:
+        raise ValueError("kind must be app or site")
+    name = record.get("name")
+    if not isinstance(name, str) or not name:
+        raise ValueError("name is required")
+    date.fromisoformat(record["date"])
+    seconds = float(record.get("seconds", 0))
+    opens = int(record.get("opens", 0))
+    if seconds < 0 or opens < 0:
+        raise ValueError("seconds and opens must not be negative")
+    category = record.get("category")
+    return int(record["seq"]), kind, record["date"], name, seconds, opens, category if isinstance(category, str) else None
+
+
+class FleetPusher:
+    """Durable outbox of usage deltas pushed to a fleet aggregator.
+
+    Each delta is numbered by the outbox's AUTOINCREMENT key and deleted
+    only once the aggregator acknowledges it, so a push cut off by a
+    disconnect is retried as-is and the aggregator skips what it already
+    applied. Sequence numbers restart when the outbox file is recreated,
+    so the stream is pushed under a name suffixed with an epoch stored in
+    the outbox; a fresh outbox starts a fresh watermark instead of having
+    its deltas taken for duplicates. Batches are gzip-compressed JSON.
+    """
+
+    def __init__(self, url, host, stream, path, batch_size=500, interval=10.0, max_interval=300.0, timeout=10,
+                 token=None):
+        if not valid_host(host):
+            raise ValueError(f"invalid host id {host!r}")
+        self.url = url.rstrip("/") + "/fleet/ingest"
+        self.host = host
+        self.stream = stream
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.token = token or FLEET_TOKEN
+        self.unauthorized = False
+        self.delay = interval
+        self.local = threading.local()
+        self.push_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self._thread = None
+
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(OUTBOX_SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (secrets.token_hex(4),))
+        epoch = conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+        self.stream_key = f"{stream}.{epoch}"
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def add(self, records):
+        if records:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO outbox (record) VALUES (?)",
+                             [(json.dumps(r, separators=(",", ":")),) for r in records])
+            conn.execute("COMMIT")
+
+    def add_apps(self, day, usage, opens, categories=None):
+        categories = categories or {}
+        self.add([
+            {"kind": "app", "date": day, "name": app, "seconds": round(usage.get(app, 0), 3),
+             "opens": opens.get(app, 0), "category": categories.get(app)}
+            for app in set(usage) | set(opens)
+        ])
+
+    def add_site(self, day, site, seconds):
+        self.add([{"kind": "site", "date": day, "name": site, "seconds": round(seconds, 3)}])
+
+    def backlog(self):
+        return self.connection().execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _send(self, rows):
+        records = [dict(json.loads(record), seq=seq) for seq, record in rows]
+        body = json.dumps({"host": self.host, "stream": self.stream_key, "records": records}, separators=(",", ":"))
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = urllib.request.Request(
+            self.url, data=gzip.compress(body.encode("utf-8")), method="POST", headers=headers,
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)["acked"]
+
+    def push(self):
+        """Send the outbox in batches until it is empty; returns the number acknowledged."""
+        conn = self.connection()
+        sent = 0
+        with self.push_lock:
+            while True:
+                rows = conn.execute("SELECT seq, record FROM outbox ORDER BY seq LIMIT ?", (self.batch_size,)).fetchall()
+                if not rows:
+                    return sent
+                try:
+                    acked = self._send(rows)
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    PUSH_FAILURES.labels(self.stream).inc()
+                    if getattr(e, "code", None) == 401 and not self.unauthorized:
+                        logging.getLogger(__name__).error(
+                            "fleet aggregator %s rejected the %s push (401): set TRACKIT_FLEET_TOKEN to the "
+                            "aggregator's token; %d deltas stay queued", self.url, self.stream, self.backlog())
+                    self.unauthorized = getattr(e, "code", None) == 401
+                    raise
+                self.unauthorized = False
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("DELETE FROM outbox WHERE seq = ?", [(int(seq),) for seq in acked])
+                conn.execute("COMMIT")
+                PUSHED.labels(self.stream).inc(len(acked))
+                sent += len(acked)
+                if len(rows) < self.batch_size or not acked:
+                    return sent
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"fleet-push-{self.stream}", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.delay):
+            try:
+                self.push()
+                self.delay = self.interval
+            except Exception:
+                self.delay = min(self.delay * 2, self.max_interval)
+
+    def close(self):
+        self.stop_event.set()
+        try:
+            self.push()
+        except Exception:
+            pass
+
+
+def open_pusher(stream, path, url=None, host=None):
+    """A started FleetPusher when a fleet URL is configured, else None."""
+    url = url or FLEET_URL
+    if not url:
+        return None
+    if not FLEET_TOKEN:
+        logging.getLogger(__name__).error(
+            "TRACKIT_FLEET_TOKEN is not set; %s will reject every push until it matches the aggregator's", url)
+    return FleetPusher(url, host or HOST_ID, stream, path).start()
+
+
+class Shard:
+    """One host's usage on the aggregator, with per-stream applied sequence numbers.
+
+    ``watermark`` is the highest sequence number below which every delta of a
+    stream has been applied; the ``applied`` table only keeps the ones that
+    arrived ahead of it, so a batch that was already applied is acknowledged
+    again without counting twice, in any order.
+    """
+
+    def __init__(self, path, timeout=10):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SHARD_SCHEMA)
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def ingest(self, stream, records, skipped=(), now=None):
+        """Apply parsed records; returns (applied, duplicates).
+
+        ``skipped`` sequence numbers were rejected upstream and only count as
+        consumed, so they don't hold the watermark back.
+        """
+        conn = self.connection()
+        applied = duplicates = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT watermark FROM stream WHERE stream = ?", (stream,)).fetchone()
+            watermark = row[0] if row else 0
+
+            for seq, kind, day, name, seconds, opens, category in records:
+                if seq <= watermark or conn.execute(
+                    "INSERT OR IGNORE INTO applied (stream, seq) VALUES (?, ?)", (stream, seq)
+                ).rowcount == 0:
+                    duplicates += 1
+                    continue
+                self._apply(conn, kind, day, name, seconds, opens, category)
+                applied += 1
+            conn.executemany("INSERT OR IGNORE INTO applied (stream, seq) VALUES (?, ?)",
+                             [(stream, seq) for seq in skipped if seq > watermark])
+
+            for (seq,) in conn.execute(
+                "SELECT seq FROM applied WHERE stream = ? AND seq > ? ORDER BY seq", (stream, watermark)
+            ).fetchall():
+                if seq != watermark + 1:
+                    break
+                watermark = seq
+            conn.execute("DELETE FROM applied WHERE stream = ? AND seq <= ?", (stream, watermark))
+            conn.execute(
+                "INSERT INTO stream (stream, watermark, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(stream) DO UPDATE SET watermark = excluded.watermark, last_seen = excluded.last_seen",
+                (stream, watermark, now or time.time()),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return applied, duplicates
+
+    def _apply(self, conn, kind, day, name, seconds, opens, category):
+        if kind == "site":
+            conn.execute(
+                "INSERT INTO site_daily (date, site, seconds) VALUES (?, ?, ?) "
+                "ON CONFLICT(date, site) DO UPDATE SET seconds = seconds + excluded.seconds",
+                (day, name, seconds),
+            )
+            return
+
+        conn.execute(
+            "INSERT INTO app_daily (date, app, seconds, opens) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(date, app) DO UPDATE SET seconds = seconds + excluded.seconds, opens = opens + excluded.opens",
+            (day, name, seconds, opens),
+        )
+        if category:
+            conn.execute("INSERT OR REPLACE INTO app_category (app, category) VALUES (?, ?)", (name, category))
+
+    def partial(self, kind, start_date, end_date):
+        """{name: [seconds, opens, category]} for the shard's days in range."""
+        if kind == "apps":
+            sql = (
+                "SELECT a.app, SUM(a.seconds), SUM(a.opens), c.category FROM app_daily a "
+                "LEFT JOIN app_category c ON c.app = a.app WHERE a.date >= ? AND a.date <= ? GROUP BY a.app"
+            )
+        else:
+            sql = "SELECT site, SUM(seconds), 0, NULL FROM site_daily WHERE date >= ? AND date <= ? GROUP BY site"
+        rows = self.connection().execute(sql, (start_date, end_date))
+        return {name: [seconds, opens, category] for name, seconds, opens, category in rows}
+
+    def streams(self):
+        rows = self.connection().execute("SELECT stream, watermark, last_seen FROM stream ORDER BY stream")
+        return [{"stream": s, "watermark": w, "last_seen": seen} for s, w, seen in rows]
+
+
+class FleetStore:
+    """Aggregator storage: one SQLite shard per host under ``directory``.
+
+    Hosts never contend for the same write lock, and a query runs on every
+    shard in parallel before merging the per-shard partial aggregates.
+    """
+
+    def __init__(self, directory, workers=8):
+        self.directory = directory
+        self.shards = {}
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fleet-shard")
+        os.makedirs(directory, exist_ok=True)
+
+    def shard(self, host):
+        if not valid_host(host):
+            raise ValueError(f"invalid host id {host!r}")
+        shard = self.shards.get(host)
+        if shard is None:
+            with self.lock:
+                shard = self.shards.get(host)
+                if shard is None:
+                    shard = self.shards[host] = Shard(os.path.join(self.directory, f"{host}.db"))
+        return shard
+
+    def hosts(self):
+        # Shards created by other workers show up on disk, not in self.shards.
+        return sorted(name[:-3] for name in os.listdir(self.directory) if name.endswith(".db"))
+
+    def ingest(self, host, stream, records):
+        """Apply a pushed batch; returns (acked seqs, applied, duplicates, rejected)."""
+        parsed, skipped, rejected = [], [], 0
+        for record in records:
+            try:
+                parsed.append(parse_record(record))
+            except (AttributeError, KeyError, TypeError, ValueError):
+                rejected += 1
+                seq = record.get("seq") if isinstance(record, dict) else None
+                if isinstance(seq, int):
+                    skipped.append(seq)
+        applied, duplicates = self.shard(host).ingest(stream, parsed, skipped)
+        acked = skipped + [r[0] for r in parsed]
+
+        INGESTED.labels("applied").inc(applied)
+        INGESTED.labels("duplicate").inc(duplicates)
+        INGESTED.labels("rejected").inc(rejected)
+        return acked, applied, duplicates, rejected
+
+    def query(self, kind="apps", start_date="", end_date="9999-12-31", hosts=None):
+        """Merge every shard's partial aggregate, largest usage first."""
+        available = self.hosts()
+        hosts = [h for h in hosts if h in available] if hosts else available
+        with MERGE_SECONDS.time():
+            partials = self.pool.map(lambda h: self.shard(h).partial(kind, start_date, end_date), hosts)
+            merged = {}
+            for partial in partials:
+                for name, (seconds, opens, category) in partial.items():
+                    entry = merged.setdefault(name, [0.0, 0, category, 0])
+                    entry[0] += seconds
+                    entry[1] += opens
+                    entry[2] = entry[2] or category
+                    entry[3] += 1
+
+        key = "app_name" if kind == "apps" else "site"
+        rows = []
+        for name, (seconds, opens, category, host_count) in merged.items():
+            row = {key: name, "usage_seconds": round(seconds, 3), "hosts": host_count}
+            if kind == "apps":
+                row["open_count"] = opens
+                row["category"] = category or "other"
+            rows.append(row)
+        rows.sort(key=lambda r: (-r["usage_seconds"], r[key]))
+        return hosts, rows
+
+    def status(self):
+        return [{"host": host, "streams": self.shard(host).streams()} for host in self.hosts()]
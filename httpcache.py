@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from flask import Response, request
+
+MIN_GZIP_BYTES = 512
+
+
+def file_version(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCache:
+    """Serialized JSON bodies keyed on a cheap version of their inputs.
+
+    The payload is rebuilt and re-hashed only when ``version`` changes, so
+    unchanged data costs a few stat calls. Responses carry a strong ETag,
+    answer If-None-Match with 304, and reuse one gzip encoding per body.
+    The gzip encoding is a different representation and gets its own ETag
+    (the identity one with a ``-gz`` suffix).
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def invalidate(self, key=None):
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def entry(self, key, version, build):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry["version"] == version:
+                return entry
+
+        body = json.dumps(build(), separators=(",", ":")).encode("utf-8")
+        entry = {
+            "version": version,
+            "body": body,
+            "etag": '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+            "gzip": None,
+        }
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+        return entry
+
+    def respond(self, key, version, build):
+        entry = self.entry(key, version, build)
+        body = entry["body"]
+        compress = len(body) >= MIN_GZIP_BYTES and "gzip" in request.headers.get("Accept-Encoding", "")
+        etag = entry["etag"][:-1] + '-gz"' if compress else entry["etag"]
+        headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status=304, headers=headers)
+
+        if compress:
+            if entry["gzip"] is None:
+                entry["gzip"] = gzip.compress(body, compresslevel=6)
+            body = entry["gzip"]
+            headers["Content-Encoding"] = "gzip"
+
+        return Response(body, mimetype="application/json", headers=headers)
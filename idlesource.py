@@ -0,0 +1,138 @@
+import json
+import shlex
+import shutil
+import subprocess
+import sys
+from collections import namedtuple
+
+IdleState = namedtuple("IdleState", "idle_seconds locked")
+
+ACTIVE = IdleState(0.0, False)
+
+
+class IdleSource:
+    """Reports how long the user has been away.
+
+    ``state(now)`` returns an IdleState with the seconds since the last
+    keyboard or mouse input and whether the session is locked. ``now`` is
+    the window source's clock, so replayed idle periods line up with
+    replayed foreground changes.
+    """
+
+    def state(self, now):
+        return ACTIVE
+
+    def close(self):
+        pass
+
+
+class WinIdleSource(IdleSource):
+    """GetLastInputInfo for input, OpenInputDesktop for the lock screen."""
+
+    DESKTOP_SWITCHDESKTOP = 0x0100
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class LASTINPUTINFO(ctypes.Structure):
+            _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+        self.ctypes = ctypes
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.info = LASTINPUTINFO()
+        self.info.cbSize = ctypes.sizeof(LASTINPUTINFO)
+
+    def state(self, now):
+        if not self.user32.GetLastInputInfo(self.ctypes.byref(self.info)):
+            return ACTIVE
+        idle = ((self.kernel32.GetTickCount() - self.info.dwTime) & 0xFFFFFFFF) / 1000.0
+        return IdleState(idle, self.locked())
+
+    def locked(self):
+        # The input desktop is Winlogon's secure desktop while locked, which
+        # a user process can neither open nor switch to.
+        desktop = self.user32.OpenInputDesktop(0, False, self.DESKTOP_SWITCHDESKTOP)
+        if not desktop:
+            return True
+        try:
+            return not self.user32.SwitchDesktop(desktop)
+        finally:
+            self.user32.CloseDesktop(desktop)
+
+
+class CommandIdleSource(IdleSource):
+    """Runs a command that prints idle milliseconds, such as ``xprintidle``."""
+
+    def __init__(self, command="xprintidle", timeout=2.0):
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        self.timeout = timeout
+
+    def state(self, now):
+        try:
+            out = subprocess.run(self.command, capture_output=True, text=True, timeout=self.timeout, check=True)
+            return IdleState(int(out.stdout.split()[0]) / 1000.0, False)
+        except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+            return ACTIVE
+
+
+class ScriptedIdleSource(IdleSource):
+    """Replays (offset_seconds, duration, locked) periods without input.
+
+    Offsets are relative to ``start`` on the window source's clock. Each
+    period ends with an input: the first query after it ended reports the
+    time since that input, so the caller closes the idle period where the
+    script does rather than at its next wakeup. After that the user counts
+    as active.
+    """
+
+    def __init__(self, periods, start):
+        self.periods = sorted(periods, key=lambda p: p[0])
+        self.start = start
+        self.resumed = None
+
+    @classmethod
+    def from_file(cls, path, start):
+        periods = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                p = json.loads(line)
+                periods.append((float(p["t"]), float(p["idle"]), bool(p.get("locked", False))))
+        return cls(periods, start)
+
+    def state(self, now):
+        offset = now - self.start
+        last_end = None
+        for begin, duration, locked in self.periods:
+            if begin > offset:
+                break
+            if offset < begin + duration:
+                return IdleState(offset - begin, locked)
+            last_end = begin + duration
+        if last_end is None or last_end == self.resumed:
+            return ACTIVE
+        self.resumed = last_end
+        return IdleState(offset - last_end, False)
+
+
+def make_idle_source(kind="auto", script=None, command=None, start=None):
+    if script:
+        return ScriptedIdleSource.from_file(script, start)
+    if kind == "none":
+        return IdleSource()
+    if command:
+        return CommandIdleSource(command)
+
+    if sys.platform == "win32":
+        try:
+            return WinIdleSource()
+        except (OSError, AttributeError):
+            pass
+    elif shutil.which("xprintidle"):
+        return CommandIdleSource("xprintidle")
+
+    return IdleSource()
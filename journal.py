@@ -0,0 +1,293 @@
+import csv
+import json
+import os
+import threading
+import time
+
+SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_PREFIX = "journal."
+JOURNAL_SUFFIX = ".log"
+REPLACE_ATTEMPTS = 3
+REPLACE_BACKOFF = 0.05
+
+
+def replace(src, dst):
+    """``os.replace`` retried briefly; Windows refuses it while a reader has ``dst`` open."""
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                raise
+            time.sleep(REPLACE_BACKOFF * (2 ** attempt))
+
+
+def atomic_write(path, write, binary=False):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with (open(tmp, "wb") if binary else open(tmp, "w", newline="", encoding="utf-8")) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def write_usage_csv(path, key_name, totals, label):
+    def write(f):
+        writer = csv.writer(f)
+        writer.writerow([key_name, "usage_seconds", "open_count", label, "category"])
+        for app, v in totals.items():
+            writer.writerow([app, int(v["usage_seconds"]), v["open_count"], label, v.get("category", "")])
+
+    atomic_write(path, write)
+
+
+def journal_generations(directory):
+    found = []
+    for file in os.listdir(directory):
+        if file.startswith(JOURNAL_PREFIX) and file.endswith(JOURNAL_SUFFIX):
+            gen = file[len(JOURNAL_PREFIX):-len(JOURNAL_SUFFIX)]
+            if gen.isdigit():
+                found.append(int(gen))
+    return sorted(found)
+
+
+class UsageJournal:
+    """Append-only log of usage deltas with periodic atomic snapshots.
+
+    State is rebuilt on startup from the last snapshot plus every journal
+    generation at or after the one it names. The per-day and global CSVs
+    are only a materialized view of the in-memory totals.
+    """
+
+    def __init__(self, directory, snapshot_interval=300, materialize_interval=5):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.snapshot_interval = snapshot_interval
+        self.materialize_interval = materialize_interval
+
+        self.date = None
+        self.today = {}
+        self.all_time = {}
+        self.generation = 0
+        self.is_new = True
+        self.dirty = False
+
+        self.last_snapshot = time.time()
+        self.last_materialize = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self._file = open(self._journal_path(self.generation), "a", encoding="utf-8")
+
+    def _journal_path(self, generation):
+        return os.path.join(self.directory, f"{JOURNAL_PREFIX}{generation}{JOURNAL_SUFFIX}")
+
+    def _generations(self):
+        return journal_generations(self.directory)
+
+    def _load(self):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            self.generation = snap["generation"]
+            self.date = snap["date"]
+            self.today = snap["today"]
+            self.all_time = snap["all_time"]
+            self.is_new = False
+
+        generations = self._generations()
+        for gen in generations:
+            if gen < self.generation:
+                os.remove(self._journal_path(gen))
+                continue
+            self.is_new = False
+            self.generation = gen
+            with open(self._journal_path(gen), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ts, date, app, seconds, opens, *rest = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._apply(date, app, seconds, opens, rest[0] if rest else None)
+
+    def _apply(self, date, app, seconds, opens, category=None):
+        if date != self.date:
+            self.date = date
+            self.today = {}
+
+        for totals in (self.today, self.all_time):
+            entry = totals.setdefault(app, {"usage_seconds": 0, "open_count": 0})
+            entry["usage_seconds"] += seconds
+            entry["open_count"] += opens
+            if category:
+                entry["category"] = category
+
+        self.dirty = True
+
+    def seed(self, date, today, all_time):
+        self.date = date
+        self.today = today
+        self.all_time = all_time
+        self.is_new = False
+        self.dirty = True
+        self.snapshot()
+
+    def start_day(self, date):
+        """Start ``date`` with empty per-day totals if the restored state is from another day.
+
+        Otherwise a tick before the first record would materialize the old
+        day's totals into the new day's CSV.
+        """
+        if date != self.date:
+            self.date = date
+            self.today = {}
+            self.dirty = True
+
+    def _write(self, date, app, seconds, opens, category=None):
+        record = [round(time.time(), 3), date, app, round(seconds, 3), opens]
+        if category:
+            record.append(category)
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._apply(date, app, seconds, opens, category)
+
+    def record(self, date, usage, opens, categories=None):
+        categories = categories or {}
+        for app in set(usage) | set(opens):
+            self._write(date, app, usage.get(app, 0), opens.get(app, 0), categories.get(app))
+        self._file.flush()
+
+    def snapshot(self):
+        self._file.flush()
+        self._file.close()
+        old = self.generation
+        self.generation += 1
+        self._file = open(self._journal_path(self.generation), "a", encoding="utf-8")
+
+        state = {
+            "generation": self.generation,
+            "date": self.date,
+            "today": self.today,
+            "all_time": self.all_time,
+        }
+        atomic_write(self.snapshot_path, lambda f: json.dump(state, f))
+
+        for gen in self._generations():
+            if gen <= old:
+                os.remove(self._journal_path(gen))
+        self.last_snapshot = time.time()
+
+    def materialize(self, day_csv, day_label, global_csv):
+        """Rewrite both CSVs; returns False and stays dirty if either is locked.
+
+        On Windows ``os.replace`` fails while another process (the dashboard
+        backend) has the CSV open, so the write is retried on a later tick.
+        The journal already holds the deltas, so nothing is lost meanwhile.
+        """
+        self.last_materialize = time.time()
+        try:
+            write_usage_csv(day_csv, "app_name", self.today, day_label)
+            write_usage_csv(global_csv, "app_name", self.all_time, "global")
+        except OSError:
+            return False
+        self.dirty = False
+        return True
+
+    def tick(self, day_csv, day_label, global_csv):
+        now = time.time()
+        if self.dirty and now - self.last_materialize >= self.materialize_interval:
+            self.materialize(day_csv, day_label, global_csv)
+        if now - self.last_snapshot >= self.snapshot_interval:
+            self.snapshot()
+
+    def close(self, day_csv, day_label, global_csv):
+        self.materialize(day_csv, day_label, global_csv)
+        self.snapshot()
+        self._file.close()
+
+
+class JournalTailer:
+    """Follows the newest journal generation from another process.
+
+    Each appended record is passed to ``callback(record)``; only the file
+    size is checked while nothing changes. Reading starts at the current
+    end, so history is never replayed.
+    """
+
+    def __init__(self, directory, callback, interval=0.5):
+        self.directory = directory
+        self.callback = callback
+        self.interval = interval
+        self.generation = None
+        self.offset = 0
+        self._thread = None
+
+    def _path(self, generation):
+        return os.path.join(self.directory, f"{JOURNAL_PREFIX}{generation}{JOURNAL_SUFFIX}")
+
+    def _latest(self):
+        try:
+            generations = journal_generations(self.directory)
+        except FileNotFoundError:
+            return None
+        return generations[-1] if generations else None
+
+    def _read(self):
+        try:
+            with open(self._path(self.generation), "rb") as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self.callback(record)
+
+    def poll(self):
+        if self.generation is None:
+            self.generation = self._latest()
+            if self.generation is not None:
+                self.offset = os.path.getsize(self._path(self.generation))
+            return
+
+        try:
+            size = os.path.getsize(self._path(self.generation))
+        except FileNotFoundError:
+            size = -1
+        if size > self.offset:
+            self._read()
+            return
+
+        latest = self._latest()
+        if latest is not None and latest != self.generation:
+            self.generation = latest
+            self.offset = 0
+            self._read()
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.poll()
+                except OSError:
+                    pass
+                time.sleep(self.interval)
+
+        self._thread = threading.Thread(target=loop, name="journal-tailer", daemon=True)
+        self._thread.start()
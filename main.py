@@ -1,82 +1,72 @@
-from datetime import datetime,timedelta
+from datetime import date, datetime, timedelta
+import argparse
 import time
-import psutil
-import win32gui
-import win32process
 import csv
 import os
+from journal import UsageJournal, atomic_write
+from usagedb import UsageDB
+from windowsource import FOREGROUND_LOOKUP, make_window_source
+from idlesource import make_idle_source
+from fleet import FLEET_URL, HOST_ID, open_pusher
+from metrics import REGISTRY, Counter, Gauge, Histogram
+from classifier import Classifier
+from retention import RETENTION_DAYS, Retention
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-USAGE_DIR = os.path.join(BASE_DIR, "usage")
+DATA_DIR = os.environ.get("TRACKIT_DATA", BASE_DIR)
+USAGE_DIR = os.path.join(DATA_DIR, "usage")
 os.makedirs(USAGE_DIR, exist_ok=True)
 
 GLOBAL_CSV = os.path.join(USAGE_DIR, "global.csv")
+DB_FILE = os.path.join(DATA_DIR, "trackit.db")
+FLEET_OUTBOX = os.path.join(DATA_DIR, "fleet_tracker.db")
 
-SAVE_INTERVAL = 1
-APP_NAME_MAP = {
-    "code.exe": "VS Code", "devenv.exe": "Visual Studio", "pycharm64.exe": "PyCharm", "clion64.exe": "CLion", "idea64.exe": "IntelliJ IDEA", 
-    "webstorm64.exe": "WebStorm", "chrome.exe": "Google Chrome", "msedge.exe": "Microsoft Edge", "firefox.exe": "Mozilla Firefox", 
-    "brave.exe": "Brave Browser", "opera.exe": "Opera Browser", "whatsapp.exe": "WhatsApp Desktop", "whatsapp.root.exe": "WhatsApp Desktop", 
-    "telegram.exe": "Telegram", "discord.exe": "Discord", "slack.exe": "Slack", "teams.exe": "Microsoft Teams", "skype.exe": "Skype", 
-    "spotify.exe": "Spotify", "vlc.exe": "VLC Media Player", "itunes.exe": "iTunes", "obs64.exe": "OBS Studio", "sharex.exe": "ShareX", 
-    "lockapp.exe": "Lock Screen", "searchapp.exe": "Windows Search", "taskmgr.exe": "Task Manager", "explorer.exe": "File Explorer", 
-    "winword.exe": "Microsoft Word", "powerpnt.exe": "Microsoft PowerPoint", "excel.exe": "Microsoft Excel", "onenote.exe": "Microsoft OneNote", 
-    "outlook.exe": "Microsoft Outlook", "startmenuexperiencehost.exe": "Start Menu", "shellexperiencehost.exe": "Windows Shell Experience", 
-    "ciscocollabhost.exe": "Cisco Collaboration Host", "applicationframehost.exe": "Application Frame Host", "pickerhost.exe": "Picker Host", 
-    "credentialuibroker.exe": "Credential UI Broker", "dwm.exe": "Desktop Window Manager", "conhost.exe": "Console Window Host", 
-    "rundll32.exe": "Windows DLL Host", "werfault.exe": "Windows Error Reporting", "cmd.exe": "Command Prompt", "powershell.exe": "PowerShell", 
-    "wsl.exe": "Windows Subsystem for Linux", "wslsettings.exe": "WSL Settings", "ubuntu.exe": "Ubuntu (WSL)", "bash.exe": "Bash Shell", 
-    "cleanmgr.exe": "Disk Cleanup", "dfrgui.exe": "Disk Defragmenter", "snippingtool.exe": "Snipping Tool", "mspaint.exe": "Paint", 
-    "notepad.exe": "Notepad", "notepad++.exe": "Notepad++", "photos.exe": "Photos", "paintdotnet.exe": "Paint.NET", 
-    "githubdesktop.exe": "GitHub Desktop", "git-credential-manager.exe": "Git Credential Manager", "gitkraken.exe": "GitKraken", 
-    "sourcetree.exe": "SourceTree", "docker desktop.exe": "Docker Desktop", "docker desktop installer.exe": "Docker Installer", 
-    "postman.exe": "Postman", "insomnia.exe": "Insomnia", "winrar.exe": "WinRAR", "7zfm.exe": "7-Zip", "7z.exe": "7-Zip CLI", 
-    "openwith.exe": "Open With", "msrdc.exe": "Remote Desktop", "anydesk.exe": "AnyDesk", "teamviewer.exe": "TeamViewer", 
-    "zoom.exe": "Zoom", "chrome_proxy.exe": "Chrome Proxy", "adb.exe": "Android Debug Bridge", "androidstudio64.exe": "Android Studio", 
-    "eclipse.exe": "Eclipse IDE", "netbeans64.exe": "NetBeans", "xampp-control.exe": "XAMPP Control Panel", "mysqlworkbench.exe": "MySQL Workbench", 
-    "pgadmin4.exe": "pgAdmin 4", "redis-desktop-manager.exe": "Redis Desktop Manager", "mongodbcompass.exe": "MongoDB Compass"
-}
-
-IGNORE_APPS = {
-    "lock screen",
-    "windows search",
-    "task manager",
-    "file explorer",
-    "open with",
-    "windows shell",
-    "cortana"
-}
+SAVE_INTERVAL = 5
+WINDOW_SOURCE = "auto"
+IDLE_SOURCE = "auto"
+IDLE_THRESHOLD = 300
+IDLE_POLL_INITIAL = 5
+IDLE_POLL_MAX = 60
+LOCKED_POLL_MAX = 300
+SNAPSHOT_INTERVAL = 300
+MATERIALIZE_INTERVAL = 5
+COMPACTION_PERIOD = 3600
+RULES_FILE = os.path.join(BASE_DIR, "apprules.json")
+TRACKER_METRICS = os.path.join(USAGE_DIR, "tracker.prom")
+
+TICK_LAG = Histogram("trackit_tracker_tick_lag_seconds", "How late each save tick ran past its SAVE_INTERVAL schedule")
+SAVE_SECONDS = Histogram("trackit_tracker_save_seconds", "Time spent persisting a save tick (journal, CSV view, usage DB)")
+SWITCHES = Counter("trackit_tracker_switches_total", "Foreground app switches")
+CLASSIFY_LOOKUP = FOREGROUND_LOOKUP.labels("classify")
+IDLE_SECONDS = Counter("trackit_tracker_idle_seconds_total", "Seconds not charged to any app because the user was idle")
+IDLE_PERIODS = Counter("trackit_tracker_idle_periods_total", "Idle periods recorded", ["locked"])
+POLL_INTERVAL = Gauge("trackit_tracker_poll_interval_seconds", "Current wait between tracker wakeups")
+
+classifier = Classifier.load(RULES_FILE)
 
 def normalize_app_name(process_name):
-    return APP_NAME_MAP.get(process_name.lower(), process_name)
-
-def get_weekday_csv():
-    day = datetime.now().strftime("%A").lower()
-    if day == "sunday":
-        for file in os.listdir(USAGE_DIR):
-            if file.endswith(".csv") and not file.startswith("global"):
-                os.remove(os.path.join(USAGE_DIR, file))
-    return os.path.join(USAGE_DIR, f"{day}.csv"), day
+    return classifier.normalize(process_name)
 
-def init_csv(path, header):
-    if not os.path.exists(path):
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(header)
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
 
-def get_active_window_process():
-    try:
-        hwnd = win32gui.GetForegroundWindow()
-        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-        process = psutil.Process(pid)
+def get_weekday_csv(ts=None):
+    day = (datetime.now() if ts is None else datetime.fromtimestamp(ts)).strftime("%A").lower()
+    return os.path.join(USAGE_DIR, f"{day}.csv"), day
 
-        app = normalize_app_name(process.name())
-        if app.lower() in IGNORE_APPS:
-            return None
+def prune_weekday_csvs():
+    now = datetime.now()
+    week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    for day in WEEKDAYS:
+        path = os.path.join(USAGE_DIR, f"{day}.csv")
+        if os.path.exists(path) and os.path.getmtime(path) < week_start.timestamp():
+            os.remove(path)
 
-        return app
-    except Exception:
+def resolve_app(change):
+    if change is None:
         return None
 
+    return classifier.classify(change.process, change.title, change.pid, change.create_time)
+
 def load_existing(path, key_field):
     data = {}
     if not os.path.exists(path):
@@ -91,72 +81,200 @@ def load_existing(path, key_field):
             }
     return data
 
-def save_csv(path, key_name, usage, opens, label):
-    existing = load_existing(path, key_name)
+def export_metrics():
+    atomic_write(TRACKER_METRICS, lambda f: f.write(REGISTRY.render()))
 
-    for app, seconds in usage.items():
-        if app not in existing:
-            existing[app] = {"usage_seconds": 0, "open_count": 0}
+def today_iso(ts=None):
+    return (datetime.now() if ts is None else datetime.fromtimestamp(ts)).date().isoformat()
 
-        existing[app]["usage_seconds"] += int(seconds)
-        existing[app]["open_count"] += opens.get(app, 0)
+def next_midnight(day):
+    """Epoch seconds of the local midnight that ends the ISO date ``day``."""
+    return datetime.combine(date.fromisoformat(day) + timedelta(days=1), datetime.min.time()).timestamp()
 
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([key_name, "usage_seconds", "open_count", label])
-        for app, v in existing.items():
-            writer.writerow([app, v["usage_seconds"], v["open_count"], label])
+def open_journal(day_csv, day=None):
+    day = day or today_iso()
+    journal = UsageJournal(USAGE_DIR, SNAPSHOT_INTERVAL, MATERIALIZE_INTERVAL)
+    if journal.is_new:
+        today = {}
+        if os.path.exists(day_csv) and today_iso(os.path.getmtime(day_csv)) == day:
+            today = load_existing(day_csv, "app_name")
+        journal.seed(day, today, load_existing(GLOBAL_CSV, "app_name"))
+    else:
+        journal.start_day(day)
+    return journal
 
-if __name__ == "__main__":
-    day_csv, current_day = get_weekday_csv()
+def run(source, stop=None, idle=None, idle_threshold=IDLE_THRESHOLD, pusher=None):
+    """Charge foreground time to apps until ``stop()`` returns true.
+
+    Once ``idle`` reports ``idle_threshold`` seconds without input, charging
+    stops at the threshold crossing and the loop stops saving, waking every
+    IDLE_POLL_INITIAL seconds and doubling up to IDLE_POLL_MAX (LOCKED_POLL_MAX
+    while the screen is locked). A foreground change wakes the loop at once;
+    input without one is noticed at the next wakeup, and charging resumes
+    from the last input the idle source reports.
 
-    init_csv(day_csv, ["app_name", "usage_seconds", "open_count", "day"])
-    init_csv(GLOBAL_CSV, ["app_name", "usage_seconds", "open_count", "scope"])
+    Time is charged to the local date it was spent on: a stretch running
+    past midnight is split there, and the old day's part is recorded and its
+    CSV materialized before the new day starts.
+
+    With a ``pusher`` every save tick's deltas are also queued for the fleet
+    aggregator.
+    """
+    started = source.now()
+    day_csv, current_day = get_weekday_csv(started)
+    current_date = today_iso(started)
+    day_end = next_midnight(current_date)
+    journal = open_journal(day_csv, current_date)
+    usage_db = UsageDB(DB_FILE)
+    Retention(DB_FILE, RETENTION_DAYS, COMPACTION_PERIOD).start()
+    prune_weekday_csvs()
 
     usage_time = {}
     open_count = {}
+    categories = {}
 
     active_app = None
-    last_switch = time.time()
-    last_save = time.time()
+    last_switch = source.now()
+    last_save = source.now()
+
+    idle_since = None
+    idle_locked = False
+    poll = SAVE_INTERVAL
+
+    def charge(until):
+        while day_end <= until:
+            charge_span(day_end)
+            roll_day()
+        charge_span(until)
+
+    def charge_span(until):
+        nonlocal last_switch
+        if active_app and idle_since is None:
+            usage_time[active_app] = usage_time.get(active_app, 0) + max(0.0, until - last_switch)
+            usage_db.add_interval("apps", last_switch, until, active_app)
+        last_switch = max(last_switch, until)
+
+    def record(ts):
+        journal.record(current_date, usage_time, open_count, categories)
+        usage_db.record_apps(ts, usage_time, open_count, categories)
+        if pusher is not None:
+            pusher.add_apps(current_date, usage_time, open_count, categories)
+        usage_time.clear()
+        open_count.clear()
+
+    def roll_day():
+        # Everything pending was spent before day_end: file it under the day
+        # that just ended, then start the next day's CSV.
+        nonlocal day_csv, current_day, current_date, day_end
+        record(day_end)
+        journal.materialize(day_csv, current_day, GLOBAL_CSV)
+        day_csv, current_day = get_weekday_csv(day_end)
+        current_date = today_iso(day_end)
+        journal.start_day(current_date)
+        day_end = next_midnight(current_date)
+        prune_weekday_csvs()
+
+    def end_idle(until):
+        nonlocal idle_since, idle_locked
+        until = max(idle_since, until)
+        usage_db.record_idle(idle_since, until, idle_locked)
+        IDLE_SECONDS.inc(until - idle_since)
+        IDLE_PERIODS.labels("true" if idle_locked else "false").inc()
+        idle_since = None
+        idle_locked = False
+
+    def save(now):
+        nonlocal last_save
+        save_started = time.perf_counter()
+        charge(now)
+
+        record(now)
+        journal.tick(day_csv, current_day, GLOBAL_CSV)
+        usage_db.maybe_flush()
+        last_save = now
+
+        SAVE_SECONDS.observe(time.perf_counter() - save_started)
+        export_metrics()
 
     try:
-        while True:
-            now = time.time()
-            new_csv, new_day = get_weekday_csv()
+        while stop is None or not stop():
+            if idle_since is None:
+                timeout = max(0.0, last_save + SAVE_INTERVAL - source.now())
+            else:
+                timeout = poll
+            POLL_INTERVAL.set(timeout)
+            change = source.wait(timeout)
+            now = source.now()
 
-            if new_day != current_day:
-                day_csv = new_csv
-                current_day = new_day
-                init_csv(day_csv, ["app_name", "usage_seconds", "open_count", "day"])
+            if idle is not None:
+                state = idle.state(now)
+                if idle_since is None and state.idle_seconds >= idle_threshold:
+                    charge(now - state.idle_seconds + idle_threshold)
+                    save(last_switch)
+                    idle_since = last_switch
+                    idle_locked = state.locked
+                    poll = IDLE_POLL_INITIAL
+                elif idle_since is not None and (state.idle_seconds < idle_threshold
+                                                 or now - state.idle_seconds > idle_since - idle_threshold + 1):
+                    # Input arrived since idle began, even if the source only
+                    # reports it a long wakeup later.
+                    end_idle(now - state.idle_seconds)
+                    last_switch = last_save = max(last_switch, now - state.idle_seconds)
+                    export_metrics()
+                elif idle_since is not None:
+                    idle_locked = idle_locked or state.locked
+                    poll = min(poll * 2, LOCKED_POLL_MAX if state.locked else IDLE_POLL_MAX)
 
-            current_app = get_active_window_process()
+            if change is not None:
+                with CLASSIFY_LOOKUP.time():
+                    result = resolve_app(change)
+            else:
+                result = None
+            current_app = result.app if result else None
 
             if current_app and current_app != active_app:
-                if active_app:
-                    usage_time[active_app] = usage_time.get(active_app, 0) + (now - last_switch)
-
+                charge(change.timestamp)
                 open_count[current_app] = open_count.get(current_app, 0) + 1
+                SWITCHES.inc()
+                categories[current_app] = result.category
                 active_app = current_app
-                last_switch = now
 
-            if now - last_save >= SAVE_INTERVAL:
-                if active_app:
-                    usage_time[active_app] = usage_time.get(active_app, 0) + (now - last_switch)
-                    last_switch = now
+            if idle_since is None and now - last_save >= SAVE_INTERVAL:
+                TICK_LAG.observe(now - last_save - SAVE_INTERVAL)
+                save(now)
 
-                save_csv(day_csv, "app_name", usage_time, open_count, current_day)
-                save_csv(GLOBAL_CSV, "app_name", usage_time, open_count, "global")
+    except KeyboardInterrupt:
+        pass
 
-                usage_time.clear()
-                open_count.clear()
-                last_save = now
+    finally:
+        charge(source.now())
+        if idle_since is not None:
+            end_idle(source.now())
 
-            time.sleep(1)
+        record(source.now())
+        journal.close(day_csv, current_day, GLOBAL_CSV)
+        usage_db.close()
+        if pusher is not None:
+            pusher.close()
+        source.close()
+        if idle is not None:
+            idle.close()
 
-    except KeyboardInterrupt:
-        if active_app:
-            usage_time[active_app] = usage_time.get(active_app, 0) + (time.time() - last_switch)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", choices=["auto", "event", "poll"], default=WINDOW_SOURCE)
+    parser.add_argument("--replay", help="JSON-lines file of foreground changes to replay")
+    parser.add_argument("--realtime", action="store_true", help="pace --replay on the wall clock")
+    parser.add_argument("--idle", choices=["auto", "none"], default=IDLE_SOURCE)
+    parser.add_argument("--idle-command", help="command printing idle milliseconds (default: xprintidle if installed)")
+    parser.add_argument("--idle-replay", help="JSON-lines file of idle periods to replay alongside --replay")
+    parser.add_argument("--idle-threshold", type=float, default=IDLE_THRESHOLD, help="seconds without input before time stops counting")
+    parser.add_argument("--fleet", default=FLEET_URL, help="aggregator URL to push usage deltas to (TRACKIT_FLEET_URL)")
+    parser.add_argument("--host-id", default=HOST_ID, help="host id for --fleet (TRACKIT_HOST_ID, default hostname)")
+    args = parser.parse_args()
 
-        save_csv(day_csv, "app_name", usage_time, open_count, current_day)
-        save_csv(GLOBAL_CSV, "app_name", usage_time, open_count, "global")
+    source = make_window_source(args.source, args.replay, args.realtime)
+    idle = make_idle_source(args.idle, args.idle_replay, args.idle_command, source.now())
+    stop = source.exhausted if args.replay and not args.realtime else None
+    pusher = open_pusher("tracker", FLEET_OUTBOX, args.fleet, args.host_id)
+    run(source, stop, idle, args.idle_threshold, pusher)
@@ -0,0 +1,223 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def merge_exposition(*texts):
+    """Concatenate Prometheus text outputs, one HELP/TYPE block per family.
+
+    Processes that import the same modules register the same families;
+    their samples are folded into the first block with that name, and a
+    series (name plus labels) already present is kept only once.
+    """
+    families = {}
+    current = None
+    for text in texts:
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) < 3:
+                    continue
+                current = families.setdefault(parts[2], {"meta": {}, "samples": {}})
+                current["meta"].setdefault(parts[1], line)
+                continue
+            if current is None:
+                continue
+            series = line.rsplit(" ", 1)[0]
+            current["samples"].setdefault(series, line)
+
+    lines = []
+    for family in families.values():
+        lines.extend(family["meta"][kind] for kind in ("HELP", "TYPE") if kind in family["meta"])
+        lines.extend(family["samples"].values())
+    return "\n".join(lines) + "\n"
+
+
+class Metric:
+    """One metric family; ``labels(...)`` returns the child for a label set.
+
+    Unlabelled metrics forward ``inc``/``set``/``observe``/``time`` to their
+    single child. Updates only take the child's lock, so recording on a hot
+    path costs a dict lookup and a few arithmetic operations.
+    """
+
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self._child())
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def items(self):
+        return [(tuple(zip(self.labelnames, values)), child) for values, child in list(self.children.items())]
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(Metric):
+    """A counter; its family name carries the ``_total`` suffix its samples use."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        if not name.endswith("_total"):
+            name += "_total"
+        super().__init__(name, help, labelnames, registry)
+
+    def _child(self):
+        return _Value()
+
+    def samples(self):
+        return [f"{self.name}{format_labels(labels)} {format_value(c.value)}" for labels, c in self.items()]
+
+
+class Gauge(Metric):
+    """A gauge, or a callback sampled at render time when ``function`` is given."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY, function=None):
+        self.function = function
+        super().__init__(name, help, labelnames, registry)
+
+    def _child(self):
+        return _Value()
+
+    def samples(self):
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                return []
+            return [] if value is None else [f"{self.name} {format_value(float(value))}"]
+        return [f"{self.name}{format_labels(labels)} {format_value(c.value)}" for labels, c in self.items()]
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _child(self):
+        return _Histogram(self.buckets)
+
+    def samples(self):
+        lines = []
+        for labels, h in self.items():
+            with h.lock:
+                counts = list(h.counts)
+                total = h.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(labels + (('le', format_value(float(bound))),))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+        return lines
@@ -0,0 +1,203 @@
+import bisect
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+from journal import atomic_write
+
+PHOTO_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+NAME_FORMAT = "%Y-%m-%d_%H-%M-%S"
+THUMB_WIDTH = 320
+THUMB_QUALITY = 80
+SETTLE_SECONDS = 2
+
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_size(path):
+    """Read (width, height) from a JPEG or PNG header without decoding it."""
+    with open(path, "rb") as f:
+        head = f.read(26)
+        if head[:8] == b"\x89PNG\r\n\x1a\n":
+            return struct.unpack(">II", head[16:24])
+        if head[:2] != b"\xff\xd8":
+            return None
+
+        f.seek(2)
+        while True:
+            byte = f.read(1)
+            while byte and byte != b"\xff":
+                byte = f.read(1)
+            while byte == b"\xff":
+                byte = f.read(1)
+            if not byte:
+                return None
+            marker = byte[0]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                continue
+            length = struct.unpack(">H", f.read(2))[0]
+            if marker in JPEG_SOF:
+                height, width = struct.unpack(">xHH", f.read(5))
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def capture_time(name, mtime):
+    try:
+        return datetime.strptime(name[:19], NAME_FORMAT).timestamp()
+    except ValueError:
+        return mtime
+
+
+class PhotoIndex:
+    """Catalog of captured photos, kept sorted by capture time.
+
+    ``refresh`` only lists the directory when its mtime changed and only
+    stats/parses files it has not seen before. Files modified in the last
+    SETTLE_SECONDS may still be being written and are left for a later
+    refresh. The catalog is persisted next
+    to the photos so a restart does not re-read every header.
+    """
+
+    def __init__(self, photo_dir, index_file=None, thumb_dir=None):
+        self.photo_dir = photo_dir
+        self.index_file = index_file or os.path.join(photo_dir, ".index.json")
+        self.thumb_dir = thumb_dir or os.path.join(photo_dir, ".thumbs")
+        self.lock = threading.Lock()
+        self.thumb_lock = threading.Lock()
+        self.dir_mtime = None
+        self.entries = {}
+        self.order = []
+        self.version = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.entries = {e["file"]: e for e in entries}
+        self._sort()
+
+    def _save(self):
+        entries = [self.entries[key[1]] for key in self.order]
+        atomic_write(self.index_file, lambda f: json.dump(entries, f, separators=(",", ":")))
+
+    def _sort(self):
+        self.order = sorted((e["taken"], e["file"]) for e in self.entries.values())
+
+    def _entry(self, file, st):
+        path = os.path.join(self.photo_dir, file)
+        try:
+            size = image_size(path)
+        except (OSError, struct.error):
+            size = None
+        width, height = size or (None, None)
+        return {
+            "file": file,
+            "name": os.path.splitext(file)[0],
+            "taken": capture_time(file, st.st_mtime),
+            "bytes": st.st_size,
+            "width": width,
+            "height": height,
+        }
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.photo_dir).st_mtime_ns
+        except FileNotFoundError:
+            return self.version
+        if mtime == self.dir_mtime:
+            return self.version
+
+        with self.lock:
+            if mtime == self.dir_mtime:
+                return self.version
+            present = {f for f in os.listdir(self.photo_dir) if f.lower().endswith(PHOTO_EXTENSIONS)}
+            removed = self.entries.keys() - present
+            added = present - self.entries.keys()
+
+            for file in removed:
+                del self.entries[file]
+            settling = False
+            for file in list(added):
+                try:
+                    st = os.stat(os.path.join(self.photo_dir, file))
+                except FileNotFoundError:
+                    added.discard(file)
+                    continue
+                if time.time() - st.st_mtime < SETTLE_SECONDS:
+                    added.discard(file)
+                    settling = True
+                    continue
+                entry = self._entry(file, st)
+                self.entries[file] = entry
+                if not removed:
+                    bisect.insort(self.order, (entry["taken"], file))
+            if removed:
+                self._sort()
+
+            self.dir_mtime = None if settling else mtime
+            if added or removed:
+                self.version += 1
+                self._save()
+            return self.version
+
+    def page(self, start=None, end=None, cursor=None, limit=60):
+        """Newest-first slice with ``start <= taken < end``, resuming after ``cursor``.
+
+        Returns (photos, next_cursor, total) where ``total`` counts the whole
+        date range and ``next_cursor`` is None on the last page.
+        """
+        with self.lock:
+            order = self.order
+            hi = len(order) if end is None else bisect.bisect_left(order, (end,))
+            lo = 0 if start is None else bisect.bisect_left(order, (start,))
+            total = max(0, hi - lo)
+            if cursor is not None:
+                entry = self.entries.get(cursor)
+                taken = entry["taken"] if entry else capture_time(cursor, 0)
+                hi = min(hi, bisect.bisect_left(order, (taken, cursor)))
+            keys = order[max(lo, hi - limit):hi][::-1]
+            photos = [self.entries[file] for _, file in keys]
+
+        next_cursor = photos[-1]["file"] if photos and hi - limit > lo else None
+        return photos, next_cursor, total
+
+    def thumbnail(self, file):
+        """Path of a cached thumbnail, generating it on first use.
+
+        Thumbnails are named after the photo's full relative path, extension
+        included, so ``a.png`` and ``a.jpg`` (or the same name in different
+        folders) never share one. Returns None when OpenCV is not available
+        or the image cannot be read.
+        """
+        thumb = os.path.join(self.thumb_dir, file + ".jpg")
+        if os.path.exists(thumb):
+            return thumb
+
+        try:
+            import cv2
+        except ImportError:
+            return None
+
+        with self.thumb_lock:
+            if os.path.exists(thumb):
+                return thumb
+            image = cv2.imread(os.path.join(self.photo_dir, file))
+            if image is None:
+                return None
+            height, width = image.shape[:2]
+            if width > THUMB_WIDTH:
+                size = (THUMB_WIDTH, max(1, round(height * THUMB_WIDTH / width)))
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, THUMB_QUALITY])
+            if not ok:
+                return None
+            os.makedirs(os.path.dirname(thumb), exist_ok=True)
+            atomic_write(thumb, lambda f: f.write(data.tobytes()), binary=True)
+        return thumb
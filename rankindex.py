@@ -0,0 +1,162 @@
+import bisect
+import heapq
+import re
+import threading
+
+SORTS = ("usage", "opens", "name")
+ORDERS = ("asc", "desc")
+
+WORD_START = re.compile(r"(?<![^\W_])\w")
+
+
+def tokens(name):
+    """Lowercased suffixes of ``name`` starting at each word, so "chr" finds "Google Chrome"."""
+    lowered = name.lower()
+    return {lowered[m.start():] for m in WORD_START.finditer(lowered)} | {lowered}
+
+
+class RankIndex:
+    """Per-app usage totals kept sorted by usage, opens and name.
+
+    ``sync`` diffs a fresh set of usage rows against the index and moves
+    only the apps whose totals changed, so no order is ever re-sorted. The
+    diff itself is a dict comparison over every row: the tracker rewrites
+    the whole CSV on each materialize, so the rows have just been parsed in
+    full anyway and the comparison is a fraction of that cost. A top-K page
+    is a slice of one order; a search walks the prefix index and keeps the
+    best ``limit`` matches on a heap.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.orders = {sort: [] for sort in SORTS}
+        self.prefixes = []
+        self.seconds = 0
+        self.opens = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def cursor(sort, row):
+        """Opaque position of ``row`` in ``sort``: ``<value>:<name>``, or the name when sorting by name."""
+        if sort == "name":
+            return row["app_name"]
+        return f"{row['usage_seconds' if sort == 'usage' else 'open_count']}:{row['app_name']}"
+
+    @staticmethod
+    def parse_cursor(sort, cursor):
+        """The sort key a cursor encodes; raises ValueError when it does not fit ``sort``."""
+        if sort == "name":
+            return (cursor.lower(), cursor)
+        value, sep, name = cursor.partition(":")
+        if not sep or not name:
+            raise ValueError("cursor must be <value>:<name>")
+        return (int(value), name.lower(), name)
+
+    @staticmethod
+    def key(sort, row):
+        name = row["app_name"]
+        if sort == "usage":
+            return (row["usage_seconds"], name.lower(), name)
+        if sort == "opens":
+            return (row["open_count"], name.lower(), name)
+        return (name.lower(), name)
+
+    def sync(self, rows):
+        """Make the index match ``rows``; returns how many apps changed."""
+        latest = {row["app_name"]: row for row in rows}
+        changed = 0
+        with self.lock:
+            for name in [n for n in self.rows if n not in latest]:
+                self._unrank(self.rows.pop(name))
+                for token in tokens(name):
+                    self._discard(self.prefixes, (token, name))
+                changed += 1
+
+            for name, row in latest.items():
+                current = self.rows.get(name)
+                if current == row:
+                    continue
+                if current is None:
+                    for token in tokens(name):
+                        bisect.insort(self.prefixes, (token, name))
+                else:
+                    self._unrank(current)
+                self._rank(row)
+                self.rows[name] = row
+                changed += 1
+        return changed
+
+    def _rank(self, row):
+        for sort, order in self.orders.items():
+            bisect.insort(order, self.key(sort, row))
+        self.seconds += row["usage_seconds"]
+        self.opens += row["open_count"]
+
+    def _unrank(self, row):
+        for sort, order in self.orders.items():
+            self._discard(order, self.key(sort, row))
+        self.seconds -= row["usage_seconds"]
+        self.opens -= row["open_count"]
+
+    @staticmethod
+    def _discard(order, key):
+        i = bisect.bisect_left(order, key)
+        if i < len(order) and order[i] == key:
+            del order[i]
+
+    def matches(self, q):
+        """Names with a word starting with ``q``, case-insensitively."""
+        q = q.lower()
+        names = set()
+        for token, name in self.prefixes[bisect.bisect_left(self.prefixes, (q,)):]:
+            if not token.startswith(q):
+                break
+            names.add(name)
+        return names
+
+    def totals(self):
+        with self.lock:
+            return {"apps": len(self.rows), "usage_seconds": self.seconds, "open_count": self.opens}
+
+    def page(self, sort="usage", order="desc", q=None, cursor=None, limit=50):
+        """One page in ``sort``/``order``, resuming after ``cursor``.
+
+        The cursor carries the sort key the last row had when it was served,
+        so pages never repeat or skip rows because that app's totals moved
+        (or it vanished) in between. Returns (rows, next_cursor, total) where
+        ``total`` counts every app matching ``q`` and ``next_cursor`` is None
+        on the last page. Raises ValueError for a malformed cursor.
+        """
+        bound = self.parse_cursor(sort, cursor) if cursor is not None else None
+        with self.lock:
+            keys = self.orders[sort]
+
+            if q:
+                names = self.matches(q)
+                total = len(names)
+                candidates = (self.key(sort, self.rows[name]) for name in names)
+                if order == "asc":
+                    if bound is not None:
+                        candidates = (k for k in candidates if k > bound)
+                    picked = heapq.nsmallest(limit + 1, candidates)
+                else:
+                    if bound is not None:
+                        candidates = (k for k in candidates if k < bound)
+                    picked = heapq.nlargest(limit + 1, candidates)
+                more = len(picked) > limit
+                picked = picked[:limit]
+            else:
+                total = len(keys)
+                if order == "asc":
+                    lo = 0 if bound is None else bisect.bisect_right(keys, bound)
+                    picked = keys[lo:lo + limit]
+                    more = lo + limit < len(keys)
+                else:
+                    hi = len(keys) if bound is None else bisect.bisect_left(keys, bound)
+                    picked = keys[max(0, hi - limit):hi][::-1]
+                    more = hi - limit > 0
+
+            rows = [self.rows[k[-1]] for k in picked]
+
+        next_cursor = self.cursor(sort, rows[-1]) if rows and more else None
+        return rows, next_cursor, total
@@ -0,0 +1,240 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from journal import atomic_write
+
+JOB_FILE_TTL = 24 * 3600
+
+PROMPT = """
+            You are a productivity analysis assistant.
+
+            Given this user activity data:
+            {summary_text}
+
+            Generate:
+            1. A concise daily summary
+            2. Productivity insights
+            3. Time-wasting patterns (if any)
+            4. Suggestions to improve focus
+            """
+
+
+class GeminiClient:
+    def __init__(self, api_key, model_name="gemini-2.5-flash"):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        try:
+            from google.api_core.exceptions import DeadlineExceeded
+        except ImportError:
+            DeadlineExceeded = ()
+        self.deadline_errors = DeadlineExceeded
+
+    def generate(self, prompt, timeout):
+        try:
+            return self.model.generate_content(prompt, request_options={"timeout": timeout}).text
+        except self.deadline_errors as e:
+            raise TimeoutError(str(e)) from e
+
+
+class StubClient:
+    def __init__(self, text="Stub summary", delay=0.0):
+        self.text = text
+        self.delay = delay
+        self.calls = 0
+
+    def generate(self, prompt, timeout):
+        self.calls += 1
+        if self.delay:
+            time.sleep(min(self.delay, timeout))
+            if self.delay > timeout:
+                raise TimeoutError("stub timed out")
+        return f"{self.text} ({len(prompt)} chars)"
+
+
+class ReportJobs:
+    """Background AI summaries, cached by a hash of the aggregated input.
+
+    A cache hit is returned straight away. Otherwise one job per distinct
+    input is queued on a bounded worker pool and can be polled by id.
+    Finished summaries are persisted so restarts keep the cache. Every job
+    also leaves a small status file in ``jobs_dir``, so a worker process
+    that did not run the job can answer a poll for it, and an id no worker
+    issued is reported as unknown.
+    """
+
+    def __init__(self, client, cache_path, max_workers=1, timeout=60, max_cached=200, max_jobs=500, jobs_dir=None):
+        self.client = client
+        self.cache_path = cache_path
+        self.jobs_dir = jobs_dir or os.path.join(os.path.dirname(os.path.abspath(cache_path)), "ai_jobs")
+        self.timeout = timeout
+        self.max_cached = max_cached
+        self.max_jobs = max_jobs
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.jobs = {}
+        self.inflight = {}
+        self.cache_version = None
+        self.cache = self._load()
+
+    def _load(self):
+        self.cache_version = self._cache_version()
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _cache_version(self):
+        try:
+            st = os.stat(self.cache_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _reload(self):
+        if self._cache_version() == self.cache_version:
+            return
+        cache = self._load()
+        with self.lock:
+            self.cache.update(cache)
+
+    def _save(self):
+        self._reload()
+        with self.lock:
+            entries = sorted(self.cache.items(), key=lambda kv: kv[1]["created"])[-self.max_cached:]
+            self.cache = dict(entries)
+            snapshot = dict(self.cache)
+        atomic_write(self.cache_path, lambda f: json.dump(snapshot, f))
+        self.cache_version = self._cache_version()
+
+    @staticmethod
+    def key(summary_text):
+        return hashlib.sha256(summary_text.encode("utf-8")).hexdigest()
+
+    def cached(self, summary_text):
+        self._reload()
+        entry = self.cache.get(self.key(summary_text))
+        return entry["summary"] if entry else None
+
+    def submit(self, summary_text):
+        key = self.key(summary_text)
+        with self.lock:
+            if key in self.inflight:
+                return self.jobs[self.inflight[key]]
+
+            created = time.time()
+            job = {
+                "id": f"{key[:16]}-{int(created)}-{next(self.ids)}",
+                "key": key,
+                "status": "queued",
+                "created": created,
+                "started": None,
+                "summary": None,
+                "error": None,
+            }
+            self.jobs[job["id"]] = job
+            self.inflight[key] = job["id"]
+            self._prune()
+        self._expire_job_files()
+        self._publish(job)
+
+        self.executor.submit(self._run, job, PROMPT.format(summary_text=summary_text))
+        return job
+
+    def _prune(self):
+        if len(self.jobs) <= self.max_jobs:
+            return
+        finished = [j for j in self.jobs.values() if j["status"] in ("done", "failed", "timeout")]
+        for job in sorted(finished, key=lambda j: j["created"])[: len(self.jobs) - self.max_jobs]:
+            del self.jobs[job["id"]]
+            try:
+                os.remove(self._job_path(job["id"]))
+            except OSError:
+                pass
+
+    def _job_path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _expire_job_files(self):
+        cutoff = time.time() - JOB_FILE_TTL
+        try:
+            names = os.listdir(self.jobs_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.jobs_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _publish(self, job):
+        state = {k: job[k] for k in ("id", "key", "status", "created", "started", "error")}
+        try:
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            atomic_write(self._job_path(job["id"]), lambda f: json.dump(state, f))
+        except OSError:
+            pass
+
+    def _run(self, job, prompt):
+        job["status"] = "running"
+        job["started"] = time.time()
+        self._publish(job)
+        try:
+            summary = self.client.generate(prompt, self.timeout)
+        except TimeoutError as e:
+            job["status"] = "timeout"
+            job["error"] = str(e)
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        else:
+            with self.lock:
+                self.cache[job["key"]] = {"summary": summary, "created": time.time()}
+            job["summary"] = summary
+            job["status"] = "done"
+            self._save()
+        finally:
+            with self.lock:
+                self.inflight.pop(job["key"], None)
+            self._publish(job)
+
+    def status(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return self._foreign_status(job_id)
+        if job["status"] == "running" and time.time() - job["started"] > self.timeout * 2:
+            return dict(job, status="timeout", error="generation exceeded its timeout")
+        return job
+
+    def _foreign_status(self, job_id):
+        """Status of a job submitted to another worker; None when no worker issued ``job_id``."""
+        if os.path.basename(job_id) != job_id:
+            return None
+        try:
+            with open(self._job_path(job_id), "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        job["summary"] = None
+        if job["status"] == "done":
+            self._reload()
+            entry = self.cache.get(job["key"])
+            if entry is None:
+                return None
+            job["summary"] = entry["summary"]
+        elif job["status"] in ("queued", "running") and time.time() - job["created"] > self.timeout * 2:
+            job.update(status="timeout", error="generation exceeded its timeout")
+        return job
@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import time
+
+DAY = 86400
+
+RETENTION_DAYS = {
+    "raw": 14,
+    "hourly": 180,
+    "daily": 3 * 365,
+    "weekly": None,
+}
+
+LOOKBACK = {
+    "hourly": DAY,
+    "daily": 3 * DAY,
+    "weekly": 15 * DAY,
+}
+
+# Start of the bucket containing ts, as epoch seconds. Hours, days and weeks
+# follow local time: a UTC hour straddles local midnight in zones with 30 or
+# 45 minute offsets, which would put part of it on the wrong day.
+BUCKET_SQL = {
+    "minute": "(ts / 60) * 60",
+    "hourly": "CAST(strftime('%s', strftime('%Y-%m-%d %H:00:00', ts, 'unixepoch', 'localtime'), 'utc') AS INTEGER)",
+    "daily": "CAST(strftime('%s', ts, 'unixepoch', 'localtime', 'start of day', 'utc') AS INTEGER)",
+    "weekly": "CAST(strftime('%s', ts, 'unixepoch', 'localtime', 'weekday 0', '-6 days', 'start of day', 'utc') AS INTEGER)",
+}
+
+SOURCE_TIER = {"hourly": "raw", "daily": "hourly", "weekly": "daily"}
+
+# Coarsest tier first; minute queries can only be answered from raw data.
+QUERY_TIERS = {
+    "minute": ["raw"],
+    "hour": ["hourly", "raw"],
+    "day": ["daily", "hourly", "raw"],
+    "week": ["weekly", "daily", "hourly", "raw"],
+}
+
+BASE_TABLES = {"apps": ("app_usage", "app"), "sites": ("site_usage", "site")}
+
+
+def tier_table(kind, tier):
+    table = BASE_TABLES[kind][0]
+    return table if tier == "raw" else f"{table}_{tier}"
+
+
+def tier_schema():
+    statements = []
+    for kind, (table, column) in BASE_TABLES.items():
+        for tier in ("hourly", "daily", "weekly"):
+            statements.append(
+                f"CREATE TABLE IF NOT EXISTS {table}_{tier} ("
+                f"ts INTEGER NOT NULL, {column} TEXT NOT NULL, "
+                f"seconds REAL NOT NULL DEFAULT 0, opens INTEGER NOT NULL DEFAULT 0, "
+                f"PRIMARY KEY (ts, {column}))"
+            )
+    return ";\n".join(statements) + ";"
+
+
+def bucket_start(conn, ts, tier):
+    return conn.execute(f"SELECT {BUCKET_SQL[tier]} FROM (SELECT ? AS ts)", (int(ts),)).fetchone()[0]
+
+
+def watermarks(conn):
+    rows = conn.execute("SELECT key, value FROM meta WHERE key LIKE 'watermark_%'").fetchall()
+    return {key[len("watermark_"):]: int(value) for key, value in rows}
+
+
+class Retention:
+    """Rolls raw minute buckets into hourly, daily and weekly tiers and prunes each tier.
+
+    Every tier is complete up to its watermark (kept in the meta table), so
+    a query can read the coarse tier before the watermark and the finer
+    tiers after it. Recent periods are recomputed on every run so late
+    writes are picked up. The meta table also guards the run itself, so
+    several processes can share one database and compaction still happens
+    at most once per ``period``.
+    """
+
+    def __init__(self, path, retention=None, period=3600):
+        self.path = path
+        self.retention = dict(RETENTION_DAYS, **(retention or {}))
+        self.period = period
+        self._thread = None
+        self.last_run = None
+
+        conn = self._connect()
+        try:
+            conn.executescript(tier_schema())
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def due(self, conn, now):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'last_compaction'").fetchone()
+        return row is None or now - float(row[0]) >= self.period
+
+    def run(self, now=None, force=False):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if not force and not self.due(conn, now):
+                conn.rollback()
+                return False
+
+            marks = watermarks(conn)
+            for tier in ("hourly", "daily", "weekly"):
+                marks[tier] = self._rollup(conn, tier, marks, now)
+
+            for kind in BASE_TABLES:
+                for tier, days in self.retention.items():
+                    if days is not None:
+                        conn.execute(f"DELETE FROM {tier_table(kind, tier)} WHERE ts < ?", (now - days * DAY,))
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(f"watermark_{tier}", str(mark)) for tier, mark in marks.items()]
+                + [("last_compaction", str(now))],
+            )
+            conn.commit()
+            self.last_run = now
+            return True
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _rollup(self, conn, tier, marks, now):
+        source = SOURCE_TIER[tier]
+        mark = marks.get(tier)
+        upper = bucket_start(conn, now, tier)
+        if source != "raw":
+            upper = min(upper, marks.get(source, upper))
+
+        lower = 0 if mark is None else bucket_start(conn, mark - LOOKBACK[tier], tier)
+        if lower >= upper:
+            return upper if mark is None else max(mark, upper)
+
+        for kind, (_, column) in BASE_TABLES.items():
+            target = tier_table(kind, tier)
+            opens = "opens" if kind == "apps" or source != "raw" else "0"
+            conn.execute(f"DELETE FROM {target} WHERE ts >= ? AND ts < ?", (lower, upper))
+            conn.execute(
+                f"INSERT INTO {target} (ts, {column}, seconds, opens) "
+                f"SELECT {BUCKET_SQL[tier]} AS bucket, {column}, SUM(seconds), SUM({opens}) "
+                f"FROM {tier_table(kind, source)} WHERE ts >= ? AND ts < ? GROUP BY bucket, {column}",
+                (lower, upper),
+            )
+        return upper
+
+    def start(self, check_interval=300):
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.run()
+                except sqlite3.Error:
+                    pass
+                time.sleep(check_interval)
+
+        self._thread = threading.Thread(target=loop, name="retention", daemon=True)
+        self._thread.start()
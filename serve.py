@@ -0,0 +1,89 @@
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+HOST = "127.0.0.1"
+PORT = 6001
+WORKERS = min(4, os.cpu_count() or 1)
+THREADS = 8
+RESTART_DELAY = 1.0
+
+
+def run_worker(sock, threads):
+    """Serve ``app`` on an already listening socket shared with the other workers."""
+    from app import create_app
+
+    app = create_app()
+
+    try:
+        from waitress import serve
+    except ImportError:
+        from werkzeug.serving import make_server
+
+        host, port = sock.getsockname()[:2]
+        make_server(host, port, app, threaded=True, fd=sock.fileno()).serve_forever()
+    else:
+        serve(app, sockets=[sock], threads=threads)
+
+
+def spawn(ctx, sock, threads):
+    process = ctx.Process(target=run_worker, args=(sock, threads), daemon=True)
+    process.start()
+    return process
+
+
+def serve(host=HOST, port=PORT, workers=WORKERS, threads=THREADS):
+    """Bind once and run ``workers`` processes accepting on the same socket.
+
+    Shared state lives in SQLite (sessions.db, trackit.db), so any worker
+    can take any request. A worker that exits is restarted.
+    """
+    sock = socket.create_server((host, port), backlog=1024)
+
+    if workers <= 1:
+        run_worker(sock, threads)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [spawn(ctx, sock, threads) for _ in range(workers)]
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Serving on http://{host}:{port} with {workers} workers")
+    print("Note: /stream only carries site events handled by the worker it is connected to")
+
+    try:
+        while True:
+            time.sleep(RESTART_DELAY)
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"Worker {process.pid} exited with {process.exitcode}, restarting")
+                    processes[i] = spawn(ctx, sock, threads)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--threads", type=int, default=THREADS)
+    parser.add_argument("--aggregator", action="store_true", help="accept pushes from other hosts under /fleet")
+    args = parser.parse_args()
+    if args.aggregator:
+        # Spawned workers inherit the environment and read it in create_app.
+        os.environ["TRACKIT_MODE"] = "aggregator"
+    serve(args.host, args.port, args.workers, args.threads)
+
+
+if __name__ == "__main__":
+    main()
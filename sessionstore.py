@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+EVENTS = ("started", "heartbeat", "resumed", "paused", "session terminated")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS browser_session (
+    site TEXT PRIMARY KEY,
+    start TEXT NOT NULL,
+    date TEXT NOT NULL,
+    last_seen REAL
+);
+CREATE INDEX IF NOT EXISTS browser_session_date ON browser_session(date);
+
+CREATE TABLE IF NOT EXISTS daily_total (
+    date TEXT NOT NULL,
+    site TEXT NOT NULL,
+    seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, site)
+);
+"""
+
+
+# Sessions from before last_seen existed count as seen when they started.
+MIGRATIONS = [
+    "ALTER TABLE browser_session ADD COLUMN last_seen REAL",
+    "UPDATE browser_session SET last_seen = CAST(strftime('%s', start) AS REAL) WHERE last_seen IS NULL",
+]
+
+
+def to_session(start, day):
+    return {"start": datetime.fromisoformat(start), "date": date.fromisoformat(day)}
+
+
+class SessionStore:
+    """Open browser sessions and per-day site totals shared between workers.
+
+    Every batch of events is applied inside one ``BEGIN IMMEDIATE``
+    transaction, so concurrent processes see each session start and close
+    exactly once and the state survives a restart. Each event touches only
+    its own site's row. Heartbeats move ``last_seen``, and ``sweep`` closes
+    sessions whose extension went quiet, charging them up to the last time
+    they were seen.
+    """
+
+    def __init__(self, path, timeout=10, lock_wait=None):
+        self.path = path
+        self.timeout = timeout
+        self.lock_wait = lock_wait
+        self.local = threading.local()
+
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+        conn.execute("CREATE INDEX IF NOT EXISTS browser_session_last_seen ON browser_session(last_seen)")
+
+    def _migrate(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(browser_session)")}
+            if "last_seen" not in columns:
+                for sql in MIGRATIONS:
+                    conn.execute(sql)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def apply(self, events):
+        """Apply parsed (event, url, timestamp, date) tuples.
+
+        Returns the sessions they closed as (site, session, end) tuples.
+        """
+        conn = self.connection()
+        ended = []
+        started = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        if self.lock_wait is not None:
+            self.lock_wait.observe(time.perf_counter() - started)
+        try:
+            for event, url, timestamp, event_date in events:
+                self._apply(conn, event, url, timestamp, event_date.isoformat(), ended)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return ended
+
+    def _apply(self, conn, event, url, timestamp, day, ended):
+        seen = timestamp.timestamp()
+        row = conn.execute("SELECT start, date, last_seen FROM browser_session WHERE site = ?", (url,)).fetchone()
+        if row and row[1] != day:
+            conn.execute("DELETE FROM browser_session WHERE site = ?", (url,))
+            self._close(conn, url, to_session(row[0], row[1]), self._seen_at(row), ended)
+            row = None
+
+        if event == "started" or (event in ("heartbeat", "resumed") and row is None):
+            conn.execute(
+                "INSERT OR REPLACE INTO browser_session (site, start, date, last_seen) VALUES (?, ?, ?, ?)",
+                (url, timestamp.isoformat(), day, seen),
+            )
+
+        elif event in ("heartbeat", "resumed"):
+            conn.execute("UPDATE browser_session SET last_seen = MAX(last_seen, ?) WHERE site = ?", (seen, url))
+
+        elif event in ("session terminated", "paused") and row:
+            conn.execute("DELETE FROM browser_session WHERE site = ?", (url,))
+            self._close(conn, url, to_session(row[0], row[1]), timestamp, ended)
+
+    def _seen_at(self, row):
+        start = datetime.fromisoformat(row[0])
+        return datetime.fromtimestamp(row[2], start.tzinfo) if row[2] is not None else start
+
+    def sweep(self, cutoff, keep_from=None):
+        """Close sessions last seen before ``cutoff`` (epoch seconds) at their last-seen time.
+
+        The last_seen index hands back only the expired sessions, so a sweep
+        costs the number it closes. With ``keep_from`` (a date) it also drops
+        daily_total rows for older days, whose sessions were already
+        persisted when they closed. Returns the closed sessions like ``apply``.
+        """
+        conn = self.connection()
+        ended = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT site, start, date, last_seen FROM browser_session WHERE last_seen < ?", (cutoff,)
+            ).fetchall()
+            for site, start, day, last_seen in rows:
+                self._close(conn, site, to_session(start, day), self._seen_at((start, day, last_seen)), ended)
+            conn.executemany("DELETE FROM browser_session WHERE site = ?", [(row[0],) for row in rows])
+            if keep_from is not None:
+                conn.execute("DELETE FROM daily_total WHERE date < ?", (keep_from.isoformat(),))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return ended
+
+    def _close(self, conn, site, session, end, ended):
+        seconds = (end - session["start"]).total_seconds()
+        conn.execute(
+            "INSERT INTO daily_total (date, site, seconds) VALUES (?, ?, ?) "
+            "ON CONFLICT(date, site) DO UPDATE SET seconds = seconds + excluded.seconds",
+            (session["date"].isoformat(), site, seconds),
+        )
+        ended.append((site, session, end))
+
+    def count(self):
+        return self.connection().execute("SELECT COUNT(*) FROM browser_session").fetchone()[0]
+
+    def active(self):
+        """Open sessions as {site: {"start", "date", "last_seen"}}."""
+        rows = self.connection().execute("SELECT site, start, date, last_seen FROM browser_session").fetchall()
+        return {
+            site: dict(to_session(start, day), last_seen=self._seen_at((start, day, last_seen)))
+            for site, start, day, last_seen in rows
+        }
+
+    def totals(self, day):
+        """Seconds of closed sessions per site on ``day``; days older than the sweep's ``keep_from`` are gone."""
+        rows = self.connection().execute("SELECT site, seconds FROM daily_total WHERE date = ?", (day.isoformat(),))
+        return dict(rows.fetchall())
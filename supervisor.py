@@ -0,0 +1,286 @@
+import hashlib
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from journal import atomic_write
+
+# Import name -> pip distribution, where they differ.
+PIP_NAMES = {
+    "cv2": "opencv-python",
+    "win32gui": "pywin32",
+    "win32process": "pywin32",
+    "win32con": "pywin32",
+    "win32com": "pywin32",
+    "flask_cors": "flask-cors",
+    "google.generativeai": "google-generativeai",
+    "PIL": "pillow",
+}
+
+
+def is_stdlib(module):
+    return module.split(".")[0] in sys.stdlib_module_names
+
+
+def module_available(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class DependencyManifest:
+    """Remembers which import names were verified for this interpreter.
+
+    The manifest is keyed on the interpreter and the requested modules, so a
+    warm start with nothing new to check performs no imports and no pip calls.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def key(self, modules):
+        data = json.dumps([sys.executable, sys.version, sorted(modules)])
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def verified(self, modules):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("key") == self.key(modules)
+        except (OSError, ValueError):
+            return False
+
+    def ensure(self, modules, force=False):
+        """Install whatever is missing; returns the pip packages installed."""
+        modules = sorted({m for m in modules if not is_stdlib(m)})
+        if not force and self.verified(modules):
+            return []
+
+        missing = sorted({PIP_NAMES.get(m, m) for m in modules if not module_available(m)})
+        if missing:
+            subprocess.check_call([sys.executable, "-m", "pip", "install", *missing])
+            importlib.invalidate_caches()
+
+        state = {"key": self.key(modules), "modules": modules, "verified": time.time()}
+        atomic_write(self.path, lambda f: json.dump(state, f, indent=2))
+        return missing
+
+    def invalidate(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def http_probe(url, timeout=1.0):
+    def probe(service):
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return response.status < 500
+        except OSError:
+            return False
+    return probe
+
+
+def tcp_probe(host, port, timeout=0.5):
+    def probe(service):
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+    return probe
+
+
+def file_probe(path):
+    """Ready once ``path`` has been written since the service was launched."""
+    def probe(service):
+        try:
+            return os.path.getmtime(path) >= service.launched - 1
+        except OSError:
+            return False
+    return probe
+
+
+class Service:
+    """A child process and its restart policy.
+
+    ``restart`` is "always", "on-failure" (exit code != 0) or "never".
+    ``ready`` is a callable taking the Service; without one a service is
+    ready as soon as it has stayed up for ``grace`` seconds.
+    """
+
+    def __init__(self, name, command, modules=(), ready=None, restart="always", cwd=None, env=None,
+                 creationflags=0, grace=0.5):
+        self.name = name
+        self.command = command
+        self.modules = tuple(modules)
+        self.ready = ready
+        self.restart = restart
+        self.cwd = cwd
+        self.env = env
+        self.creationflags = creationflags
+        self.grace = grace
+
+        self.process = None
+        self.launched = None
+        self.startup_time = None
+        self.restarts = 0
+        self.backoff = None
+        self.restart_at = None
+        self.last_exit = None
+
+    def launch(self):
+        self.launched = time.time()
+        self.startup_time = None
+        self.process = subprocess.Popen(self.command, cwd=self.cwd, env=self.env, creationflags=self.creationflags)
+        return self.process
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def is_ready(self):
+        if self.ready is None:
+            return time.time() - self.launched >= self.grace and (self.alive() or self.process.returncode == 0)
+        return self.ready(self)
+
+    def should_restart(self, code):
+        return self.restart == "always" or (self.restart == "on-failure" and code != 0)
+
+    def status(self):
+        return {
+            "name": self.name,
+            "pid": self.process.pid if self.process else None,
+            "alive": self.alive(),
+            "startup_seconds": self.startup_time,
+            "restarts": self.restarts,
+            "last_exit": self.last_exit,
+        }
+
+
+class Supervisor:
+    """Starts services in parallel, waits for readiness and restarts crashes.
+
+    A crashed service is restarted after ``backoff_initial`` seconds, doubling
+    up to ``backoff_max`` on consecutive crashes; a run longer than
+    ``stable_after`` seconds resets the backoff.
+    """
+
+    def __init__(self, services, ready_timeout=60, backoff_initial=1.0, backoff_max=60.0, stable_after=30.0,
+                 poll_interval=0.25, log=print):
+        self.services = list(services)
+        self.ready_timeout = ready_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.poll_interval = poll_interval
+        self.log = log
+        self.stop_event = threading.Event()
+
+    def wait_ready(self, service):
+        deadline = service.launched + self.ready_timeout
+        while not self.stop_event.is_set():
+            if service.is_ready():
+                service.startup_time = round(time.time() - service.launched, 3)
+                return True
+            if not service.alive() and service.process.returncode != 0:
+                return False
+            if time.time() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+        return False
+
+    def start(self):
+        """Launch every service at once and return {name: startup seconds or None}."""
+        for service in self.services:
+            service.launch()
+
+        with ThreadPoolExecutor(max_workers=len(self.services) or 1) as pool:
+            ready = list(pool.map(self.wait_ready, self.services))
+
+        report = {}
+        for service, ok in zip(self.services, ready):
+            report[service.name] = service.startup_time
+            if ok:
+                self.log(f"{service.name}: ready in {service.startup_time:.3f}s (pid {service.process.pid})")
+            else:
+                self.log(f"{service.name}: not ready after {self.ready_timeout}s")
+        return report
+
+    def check(self, now=None):
+        """One supervision pass: notice exits and perform due restarts."""
+        now = now or time.time()
+        for service in self.services:
+            if service.restart_at is not None:
+                if now >= service.restart_at:
+                    service.restart_at = None
+                    service.restarts += 1
+                    service.launch()
+                    self.log(f"{service.name}: restarted (#{service.restarts})")
+                continue
+
+            if service.process is None or service.alive():
+                continue
+
+            code = service.process.returncode
+            if service.last_exit is not None and service.last_exit[1] == service.launched:
+                continue
+            service.last_exit = (code, service.launched)
+            if not service.should_restart(code):
+                continue
+
+            if now - service.launched >= self.stable_after or service.backoff is None:
+                service.backoff = self.backoff_initial
+            else:
+                service.backoff = min(service.backoff * 2, self.backoff_max)
+            service.restart_at = now + service.backoff
+            self.log(f"{service.name}: exited with {code}, restarting in {service.backoff:.1f}s")
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                self.check()
+                self.stop_event.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        for service in self.services:
+            if service.alive():
+                service.process.terminate()
+        for service in self.services:
+            if service.process is not None:
+                try:
+                    service.process.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    service.process.kill()
+
+    def status(self):
+        return [service.status() for service in self.services]
+
+
+STUB = """
+import os, sys, time
+ready, lifetime, code = sys.argv[1], float(sys.argv[2]), int(sys.argv[3])
+time.sleep(float(sys.argv[4]))
+open(ready, "w").close()
+time.sleep(lifetime)
+sys.exit(code)
+"""
+
+
+def stub_service(name, directory, startup=0.2, lifetime=3600, code=1, restart="always"):
+    """A Python child that becomes ready after ``startup`` seconds and exits with ``code`` after ``lifetime``."""
+    ready = os.path.join(directory, f"{name}.ready")
+    command = [sys.executable, "-c", STUB, ready, str(lifetime), str(code), str(startup)]
+    return Service(name, command, ready=file_probe(ready), restart=restart)
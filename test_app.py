@@ -0,0 +1,190 @@
+import csv
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("TRACKIT_DATA", tempfile.mkdtemp(prefix="trackit-test-"))
+
+import pytest
+
+import app as backend
+import fleet
+from fleet import FleetStore
+from journal import write_usage_csv
+from reportjobs import ReportJobs, StubClient
+from sessionstore import SessionStore
+from usagedb import UsageDB
+from writer import ProcessLock
+
+
+@pytest.fixture
+def aggregator(tmp_path, monkeypatch):
+    monkeypatch.setattr(fleet, "FLEET_TOKEN", "s3cret")
+    monkeypatch.setattr(backend, "FLEET_TOKEN", "s3cret")
+    monkeypatch.setattr(backend, "fleet_store", backend.Lazy(lambda: FleetStore(str(tmp_path / "fleet"))))
+    return backend.create_app(warm=False, aggregator=True).test_client()
+
+
+def test_fleet_ingest_requires_the_token(aggregator):
+    body = {"host": "laptop", "stream": "tracker.a", "records": [
+        {"seq": 1, "kind": "app", "date": "2026-01-05", "name": "Chrome", "seconds": 5},
+    ]}
+    assert aggregator.post("/fleet/ingest", json=body).status_code == 401
+    assert aggregator.post("/fleet/ingest", json=body, headers={"Authorization": "Bearer nope"}).status_code == 401
+
+    response = aggregator.post("/fleet/ingest", json=body, headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert response.get_json()["acked"] == [1]
+
+
+def test_aggregator_without_token_logs_an_error(monkeypatch, caplog):
+    monkeypatch.setattr(backend, "FLEET_TOKEN", None)
+    backend.create_app(warm=False, aggregator=True)
+    assert any("TRACKIT_FLEET_TOKEN" in r.getMessage() for r in caplog.records if r.levelname == "ERROR")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    usage = tmp_path / "usage"
+    usage.mkdir()
+    monkeypatch.setattr(backend, "USAGE_DIR", str(usage))
+    monkeypatch.setattr(backend, "GLOBAL_CSV", str(usage / "global.csv"))
+    return backend.create_app(warm=False).test_client()
+
+
+def write_global(totals):
+    write_usage_csv(backend.GLOBAL_CSV, "app_name", {
+        app: {"usage_seconds": seconds, "open_count": 1} for app, seconds in totals.items()
+    }, "global")
+
+
+def test_summary_search_is_not_cached_stale_across_a_rewrite(client, monkeypatch):
+    write_global({"Chrome": 10, "Code": 5})
+    read = backend.read_csv_safe
+
+    def read_then_rewrite(path):
+        rows = read(path)
+        monkeypatch.setattr(backend, "read_csv_safe", read)
+        write_global({"Chrome": 10, "Code": 50, "Slack": 1})
+        return rows
+
+    monkeypatch.setattr(backend, "read_csv_safe", read_then_rewrite)
+    first = client.get("/summary?sort=usage").get_json()
+    assert [r["app_name"] for r in first["apps"]] == ["Chrome", "Code"]
+
+    second = client.get("/summary?sort=usage").get_json()
+    assert [r["app_name"] for r in second["apps"]] == ["Code", "Chrome", "Slack"]
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "ALLTIME_CSV", str(tmp_path / "alltime.csv"))
+    monkeypatch.setattr(backend, "REPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(backend, "alltime_lock", ProcessLock(str(tmp_path / "alltime_lock.db")))
+    monkeypatch.setattr(backend, "last_compaction", time.time())
+    db = UsageDB(str(tmp_path / "trackit.db"))
+    monkeypatch.setattr(backend, "usage_db", db)
+    yield db
+    db.close()
+
+
+def alltime_rows():
+    with open(backend.ALLTIME_CSV, newline="", encoding="utf-8") as f:
+        return [(row["date"], row["site"], int(row["total_seconds"])) for row in csv.DictReader(f)]
+
+
+def test_sessions_sum_into_the_daily_site_rollup(reports):
+    start = datetime(2026, 1, 5, 10, 0).timestamp()
+    for offset, seconds in [(0, 90), (600, 30)]:
+        reports.add_site(start + offset, start + offset + seconds, "example.com", "2026-01-05")
+        backend.export_day_to_csv(date(2026, 1, 5), "example.com", timedelta(seconds=seconds))
+    assert alltime_rows() == [("2026-01-05", "example.com", 90), ("2026-01-05", "example.com", 30)]
+
+    backend.compact_alltime(reports)
+    assert alltime_rows() == [("2026-01-05", "example.com", 120)]
+    assert reports.site_rollup() == [("2026-01-05", "example.com", 120)]
+
+
+def test_migration_keeps_the_last_cumulative_total(reports):
+    with open(backend.ALLTIME_CSV, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(backend.REPORT_HEADER)
+        # The legacy format re-appended the running daily total per session.
+        for day, site, seconds in [("2026-01-05", "a.com", 60), ("2026-01-05", "a.com", 150),
+                                   ("2026-01-05", "b.com", 40), ("2026-01-06", "a.com", 10)]:
+            writer.writerow([day, site, seconds, seconds // 60, 0])
+
+    backend.migrate_alltime(reports)
+    assert reports.site_rollup() == [("2026-01-05", "a.com", 150), ("2026-01-05", "b.com", 40),
+                                     ("2026-01-06", "a.com", 10)]
+    assert alltime_rows() == [("2026-01-05", "a.com", 150), ("2026-01-05", "b.com", 40),
+                              ("2026-01-06", "a.com", 10)]
+
+    # Already migrated: a rerun leaves the rollup alone.
+    reports.import_site_totals({("2026-01-06", "a.com"): 25})
+    backend.migrate_alltime(reports)
+    assert reports.site_rollup()[-1] == ("2026-01-06", "a.com", 25)
+
+
+def test_compaction_by_another_worker_keeps_appended_rows(reports, tmp_path):
+    start = datetime(2026, 1, 5, 10, 0)
+    reports.add_site(start.timestamp(), start.timestamp() + 90, "example.com", "2026-01-05")
+    backend.export_day_to_csv(date(2026, 1, 5), "example.com", timedelta(seconds=90))
+    assert alltime_rows() == [("2026-01-05", "example.com", 90)]
+
+    # A second worker process: its own UsageDB connection and compaction.
+    other = UsageDB(str(tmp_path / "trackit.db"))
+    assert backend.compact_alltime(other)
+    assert alltime_rows() == [("2026-01-05", "example.com", 90)]
+    other.close()
+
+
+def test_compaction_runs_once_per_interval_across_workers(reports, monkeypatch):
+    assert backend.compact_alltime(reports)
+    # Another worker whose own timer has expired still sees the shared stamp.
+    monkeypatch.setattr(backend, "last_compaction", 0)
+    assert not backend.compact_alltime(reports)
+    assert backend.last_compaction > 0
+
+
+def test_process_lock_excludes_other_holders(tmp_path):
+    held = ProcessLock(str(tmp_path / "lock.db"))
+    waiting = ProcessLock(str(tmp_path / "lock.db"), timeout=0.05)
+    with held:
+        with pytest.raises(sqlite3.OperationalError):
+            with waiting:
+                pass
+    with waiting as conn:
+        conn.execute("INSERT INTO meta (key, value) VALUES ('k', 'v')")
+    with held as conn:
+        assert conn.execute("SELECT value FROM meta WHERE key = 'k'").fetchone() == ("v",)
+
+
+def test_unknown_report_job_is_404(client, tmp_path, monkeypatch):
+    jobs = ReportJobs(StubClient(), str(tmp_path / "ai_cache.json"))
+    monkeypatch.setattr(backend, "report_jobs", jobs)
+    response = client.get("/report/jobs/0123456789abcdef-1700000000-1")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "unknown job"}
+    jobs.executor.shutdown()
+
+
+def test_sweeper_closes_quiet_sessions_and_persists_them(tmp_path, monkeypatch):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(backend, "session_store", store)
+    persisted = []
+    monkeypatch.setattr(backend, "persist", lambda events, ended: persisted.extend(ended))
+
+    now = time.time()
+    seen = datetime.fromtimestamp(now - backend.SESSION_GRACE - 60).astimezone()
+    store.apply([
+        ("started", "quiet.com", seen, seen.date()),
+        ("started", "live.com", datetime.fromtimestamp(now).astimezone(), seen.date()),
+    ])
+
+    ended = backend.sweep_sessions(now)
+    assert [site for site, _, _ in ended] == ["quiet.com"]
+    assert persisted == ended
+    assert set(store.active()) == {"live.com"}
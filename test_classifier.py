@@ -0,0 +1,42 @@
+from classifier import Classification, Classifier
+
+CONFIG = {
+    "names": {"code.exe": "VS Code", "chrome.exe": "Google Chrome"},
+    "categories": {"development": ["VS Code"], "browser": ["Google Chrome"]},
+    "ignore": ["LockApp.exe"],
+    "rules": [
+        {"match": "glob", "pattern": "python*.exe", "app": "Python"},
+        {"match": "regex", "field": "title", "pattern": r"YouTube", "app": "YouTube", "category": "entertainment"},
+    ],
+}
+
+
+def test_names_rules_and_categories():
+    classifier = Classifier(CONFIG)
+    assert classifier.classify("CODE.EXE") == Classification("VS Code", "development")
+    assert classifier.classify("python3.11.exe") == Classification("Python", "other")
+    assert classifier.classify("chrome.exe", "Music - YouTube") == Classification("YouTube", "entertainment")
+    assert classifier.classify("chrome.exe", "Docs") == Classification("Google Chrome", "browser")
+    assert classifier.classify("LockApp.exe") is None
+
+
+def test_memoizes_per_process_instance():
+    classifier = Classifier({"names": {"code.exe": "VS Code"}})
+    assert classifier.classify("code.exe", pid=42, create_time=1.0).app == "VS Code"
+    assert classifier.classify("slack.exe", pid=42, create_time=1.0).app == "VS Code"
+    assert classifier.classify("slack.exe", pid=42, create_time=2.0).app == "slack.exe"
+    assert (classifier.cache.hits, classifier.cache.misses) == (1, 2)
+
+
+def test_no_memo_without_process_identity():
+    classifier = Classifier({"names": {"code.exe": "VS Code", "slack.exe": "Slack"}})
+    for pid in (None, 0):
+        assert classifier.classify("code.exe", pid=pid).app == "VS Code"
+        assert classifier.classify("slack.exe", pid=pid).app == "Slack"
+    assert classifier.cache.items == {}
+
+
+def test_title_rules_key_the_memo_on_title():
+    classifier = Classifier(CONFIG)
+    assert classifier.classify("chrome.exe", "Docs", pid=7, create_time=1.0).app == "Google Chrome"
+    assert classifier.classify("chrome.exe", "YouTube", pid=7, create_time=1.0).app == "YouTube"
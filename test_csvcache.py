@@ -0,0 +1,95 @@
+import os
+
+from csvcache import CsvCache
+from journal import atomic_write
+
+
+def parse(row):
+    return row["app_name"], int(row["usage_seconds"])
+
+
+def add(acc, fieldnames, row):
+    return acc + row[1]
+
+
+def write(path, rows):
+    atomic_write(str(path), lambda f: f.write("app_name,usage_seconds\n" + "".join(f"{a},{s}\n" for a, s in rows)))
+
+
+def rewrite_in_place(path, rows):
+    # Same inode, different content: what tmp + rename looks like when the
+    # filesystem hands the freed inode straight back.
+    with open(path, "r+", encoding="utf-8", newline="") as f:
+        f.write("app_name,usage_seconds\n" + "".join(f"{a},{s}\n" for a, s in rows))
+        f.truncate()
+
+
+def test_unchanged_file_is_a_hit(tmp_path):
+    path = tmp_path / "global.csv"
+    write(path, [("Chrome", 10)])
+    cache = CsvCache()
+    assert cache.rows(str(path), parse)[1] == [("Chrome", 10)]
+    assert cache.rows(str(path), parse)[1] == [("Chrome", 10)]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_atomic_rewrite_is_reread(tmp_path):
+    path = tmp_path / "global.csv"
+    write(path, [("Chrome", 10)])
+    cache = CsvCache()
+    assert cache.aggregate(str(path), parse, add, int) == 10
+
+    write(path, [("Chrome", 20), ("Code", 5)])
+    assert cache.rows(str(path), parse)[1] == [("Chrome", 20), ("Code", 5)]
+    assert cache.aggregate(str(path), parse, add, int) == 25
+
+
+def test_rewrite_on_reused_inode_is_not_taken_for_append(tmp_path):
+    path = tmp_path / "global.csv"
+    write(path, [("Chrome", 10)])
+    cache = CsvCache(append_only=True)
+    assert cache.aggregate(str(path), parse, add, int) == 10
+    ino = os.stat(path).st_ino
+
+    rewrite_in_place(path, [("Chrome", 11), ("Code", 5)])
+    assert os.stat(path).st_ino == ino
+    assert cache.rows(str(path), parse)[1] == [("Chrome", 11), ("Code", 5)]
+    assert cache.aggregate(str(path), parse, add, int) == 16
+
+
+def test_append_only_folds_in_new_lines(tmp_path):
+    path = tmp_path / "history.csv"
+    write(path, [("Chrome", 10)])
+    cache = CsvCache(append_only=True)
+    assert cache.aggregate(str(path), parse, add, int) == 10
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("Code,5\nSlack,")
+    assert cache.rows(str(path), parse)[1] == [("Chrome", 10), ("Code", 5)]
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("2\n")
+    assert cache.rows(str(path), parse)[1] == [("Chrome", 10), ("Code", 5), ("Slack", 2)]
+    assert cache.aggregate(str(path), parse, add, int) == 17
+
+
+def test_deleted_file_drops_entry(tmp_path):
+    path = tmp_path / "global.csv"
+    write(path, [("Chrome", 10)])
+    cache = CsvCache()
+    cache.rows(str(path), parse)
+    os.remove(path)
+    assert cache.rows(str(path), parse) == (None, [])
+    assert cache.entries == {}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = CsvCache(max_entries=2)
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f"{i}.csv")
+        write(paths[-1], [("App", i)])
+    cache.rows(str(paths[0]), parse)
+    cache.rows(str(paths[1]), parse)
+    cache.rows(str(paths[0]), parse)
+    cache.rows(str(paths[2]), parse)
+    assert [key[0] for key in cache.entries] == [str(paths[0]), str(paths[2])]
@@ -0,0 +1,138 @@
+import json
+import urllib.error
+
+import pytest
+
+from fleet import FleetPusher, FleetStore, Shard, authorized
+
+
+def rec(seq, name="Chrome", seconds=10.0, opens=0, day="2026-01-05", kind="app", category=None):
+    return seq, kind, day, name, seconds, opens, category
+
+
+def watermark(shard, stream="tracker.a"):
+    return {s["stream"]: s["watermark"] for s in shard.streams()}.get(stream, 0)
+
+
+def seconds(shard, name="Chrome"):
+    return shard.partial("apps", "", "9999-12-31")[name][0]
+
+
+@pytest.fixture
+def shard(tmp_path):
+    return Shard(str(tmp_path / "host.db"))
+
+
+def test_in_order_batches_advance_watermark(shard):
+    assert shard.ingest("tracker.a", [rec(1), rec(2)]) == (2, 0)
+    assert shard.ingest("tracker.a", [rec(3)]) == (1, 0)
+    assert watermark(shard) == 3
+    assert seconds(shard) == 30.0
+    assert shard.connection().execute("SELECT COUNT(*) FROM applied").fetchone()[0] == 0
+
+
+def test_redelivered_batch_counts_once(shard):
+    shard.ingest("tracker.a", [rec(1), rec(2)])
+    assert shard.ingest("tracker.a", [rec(1), rec(2), rec(3)]) == (1, 2)
+    assert seconds(shard) == 30.0
+    assert watermark(shard) == 3
+
+
+def test_out_of_order_delivery_fills_the_gap(shard):
+    assert shard.ingest("tracker.a", [rec(3), rec(4)]) == (2, 0)
+    assert watermark(shard) == 0
+    assert shard.ingest("tracker.a", [rec(4)]) == (0, 1)
+
+    assert shard.ingest("tracker.a", [rec(1), rec(2)]) == (2, 0)
+    assert watermark(shard) == 4
+    assert seconds(shard) == 40.0
+    assert shard.connection().execute("SELECT COUNT(*) FROM applied").fetchone()[0] == 0
+
+
+def test_skipped_seqs_do_not_hold_the_watermark(shard):
+    assert shard.ingest("tracker.a", [rec(1), rec(3)], skipped=[2]) == (2, 0)
+    assert watermark(shard) == 3
+    assert seconds(shard) == 20.0
+
+
+def test_streams_are_independent(shard):
+    shard.ingest("tracker.a", [rec(1), rec(2)])
+    assert shard.ingest("tracker.b", [rec(1, kind="site", name="example.com")]) == (1, 0)
+    assert watermark(shard, "tracker.a") == 2
+    assert watermark(shard, "tracker.b") == 1
+    assert shard.partial("sites", "", "9999-12-31") == {"example.com": [10.0, 0, None]}
+
+
+def test_store_acks_rejected_records(tmp_path):
+    store = FleetStore(str(tmp_path / "fleet"))
+    records = [
+        {"seq": 1, "kind": "app", "date": "2026-01-05", "name": "Chrome", "seconds": 5, "opens": 1},
+        {"seq": 2, "kind": "app", "date": "not-a-date", "name": "Chrome"},
+        {"seq": 3, "kind": "app", "date": "2026-01-05", "name": "Chrome", "seconds": 5, "category": "browser"},
+    ]
+    acked, applied, duplicates, rejected = store.ingest("laptop", "tracker.a", records)
+    assert (sorted(acked), applied, duplicates, rejected) == ([1, 2, 3], 2, 0, 1)
+    assert store.status() == [{"host": "laptop", "streams": [
+        {"stream": "tracker.a", "watermark": 3, "last_seen": store.shard("laptop").streams()[0]["last_seen"]},
+    ]}]
+    hosts, rows = store.query("apps")
+    assert hosts == ["laptop"]
+    assert rows == [{"app_name": "Chrome", "usage_seconds": 10.0, "hosts": 1, "open_count": 1, "category": "browser"}]
+
+    with pytest.raises(ValueError):
+        store.shard("../etc")
+
+
+def test_recreated_outbox_starts_a_new_stream(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    first = FleetPusher("http://aggregator", "laptop", "tracker", path).stream_key
+    assert FleetPusher("http://aggregator", "laptop", "tracker", path).stream_key == first
+
+    (tmp_path / "outbox.db").unlink()
+    for suffix in ("-wal", "-shm"):
+        (tmp_path / f"outbox.db{suffix}").unlink(missing_ok=True)
+    assert FleetPusher("http://aggregator", "laptop", "tracker", path).stream_key != first
+
+
+def test_push_deletes_only_acked_records(tmp_path):
+    store = FleetStore(str(tmp_path / "fleet"))
+    pusher = FleetPusher("http://aggregator", "laptop", "tracker", str(tmp_path / "outbox.db"), batch_size=2)
+    sent = []
+
+    def send(rows):
+        records = [dict(json.loads(record), seq=seq) for seq, record in rows]
+        sent.append([r["seq"] for r in records])
+        return store.ingest(pusher.host, pusher.stream_key, records)[0]
+
+    pusher._send = send
+    pusher.add_apps("2026-01-05", {"Chrome": 5.0, "Code": 3.0}, {"Chrome": 1})
+    pusher.add_site("2026-01-05", "example.com", 2.0)
+    assert pusher.push() == 3
+    assert sent == [[1, 2], [3]]
+    assert pusher.backlog() == 0
+    assert store.query("sites")[1] == [{"site": "example.com", "usage_seconds": 2.0, "hosts": 1}]
+
+
+def test_authorized_requires_matching_bearer_token():
+    assert authorized("Bearer s3cret", token="s3cret")
+    assert not authorized("Bearer wrong", token="s3cret")
+    assert not authorized("s3cret", token="s3cret")
+    assert not authorized(None, token="s3cret")
+    assert not authorized("Bearer ", token="")
+
+
+def test_push_rejected_for_token_logs_once_and_keeps_backlog(tmp_path, caplog):
+    pusher = FleetPusher("http://aggregator", "laptop", "tracker", str(tmp_path / "outbox.db"))
+
+    def send(rows):
+        raise urllib.error.HTTPError(pusher.url, 401, "Unauthorized", {}, None)
+
+    pusher._send = send
+    pusher.add_site("2026-01-05", "example.com", 2.0)
+    for _ in range(2):
+        with pytest.raises(urllib.error.HTTPError):
+            pusher.push()
+    errors = [r for r in caplog.records if r.levelname == "ERROR"]
+    assert len(errors) == 1
+    assert "TRACKIT_FLEET_TOKEN" in errors[0].getMessage()
+    assert pusher.backlog() == 1
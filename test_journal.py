@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+import journal
+from journal import UsageJournal, journal_generations
+
+
+def crash(j):
+    # Drop the process without close(): no final snapshot or materialize.
+    j._file.close()
+
+
+def test_replays_journal_after_crash(tmp_path):
+    j = UsageJournal(str(tmp_path))
+    j.record("2026-01-05", {"Chrome": 10.0, "Code": 4.0}, {"Chrome": 1})
+    j.record("2026-01-05", {"Chrome": 5.0}, {}, {"Chrome": "browser"})
+    crash(j)
+
+    j = UsageJournal(str(tmp_path))
+    assert not j.is_new
+    assert j.date == "2026-01-05"
+    assert j.today["Chrome"] == {"usage_seconds": 15.0, "open_count": 1, "category": "browser"}
+    assert j.all_time["Code"] == {"usage_seconds": 4.0, "open_count": 0}
+    crash(j)
+
+
+def test_snapshot_plus_newer_generations(tmp_path):
+    j = UsageJournal(str(tmp_path))
+    j.record("2026-01-05", {"Chrome": 10.0}, {"Chrome": 1})
+    j.snapshot()
+    j.record("2026-01-06", {"Chrome": 3.0}, {})
+    crash(j)
+
+    assert journal_generations(str(tmp_path)) == [j.generation]
+    j = UsageJournal(str(tmp_path))
+    assert j.date == "2026-01-06"
+    assert j.today == {"Chrome": {"usage_seconds": 3.0, "open_count": 0}}
+    assert j.all_time == {"Chrome": {"usage_seconds": 13.0, "open_count": 1}}
+    crash(j)
+
+
+def test_skips_torn_last_line(tmp_path):
+    j = UsageJournal(str(tmp_path))
+    j.record("2026-01-05", {"Chrome": 10.0}, {})
+    path = j._journal_path(j.generation)
+    crash(j)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('[1700000000.0,"2026-01-05","Chr')
+
+    j = UsageJournal(str(tmp_path))
+    assert j.all_time == {"Chrome": {"usage_seconds": 10.0, "open_count": 0}}
+    crash(j)
+
+
+def test_locked_csv_keeps_journal_dirty(tmp_path, monkeypatch):
+    j = UsageJournal(str(tmp_path))
+    j.record("2026-01-05", {"Chrome": 10.0}, {})
+    day_csv, global_csv = str(tmp_path / "monday.csv"), str(tmp_path / "global.csv")
+
+    def locked(src, dst):
+        raise PermissionError(13, "in use", dst)
+
+    monkeypatch.setattr(journal.os, "replace", locked)
+    monkeypatch.setattr(journal, "REPLACE_BACKOFF", 0)
+    assert j.materialize(day_csv, "monday", global_csv) is False
+    assert j.dirty
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+    monkeypatch.undo()
+    assert j.materialize(day_csv, "monday", global_csv) is True
+    assert not j.dirty
+    with open(global_csv, encoding="utf-8") as f:
+        assert f.read().splitlines()[1].startswith("Chrome,10,0,global")
+    crash(j)
+
+
+@pytest.mark.parametrize("fails", [1, 2])
+def test_replace_retries_transient_lock(tmp_path, monkeypatch, fails):
+    calls = []
+    real = os.replace
+
+    def flaky(src, dst):
+        calls.append(dst)
+        if len(calls) <= fails:
+            raise PermissionError(13, "in use", dst)
+        real(src, dst)
+
+    monkeypatch.setattr(journal.os, "replace", flaky)
+    monkeypatch.setattr(journal, "REPLACE_BACKOFF", 0)
+    target = tmp_path / "out.txt"
+    journal.atomic_write(str(target), lambda f: f.write("ok"))
+    assert target.read_text() == "ok"
+    assert len(calls) == fails + 1
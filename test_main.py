@@ -0,0 +1,102 @@
+import csv
+import json
+import os
+import tempfile
+
+os.environ.setdefault("TRACKIT_DATA", tempfile.mkdtemp(prefix="trackit-test-"))
+
+import pytest
+
+import main
+from idlesource import ScriptedIdleSource
+from usagedb import UsageDB
+from windowsource import ReplayWindowSource
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    usage = tmp_path / "usage"
+    usage.mkdir()
+    monkeypatch.setattr(main, "USAGE_DIR", str(usage))
+    monkeypatch.setattr(main, "GLOBAL_CSV", str(usage / "global.csv"))
+    monkeypatch.setattr(main, "DB_FILE", str(tmp_path / "trackit.db"))
+    monkeypatch.setattr(main, "TRACKER_METRICS", str(usage / "tracker.prom"))
+    main.classifier.cache.clear()
+    return tmp_path
+
+
+def replay(tmp_path, events, start=1_700_000_000.0):
+    path = tmp_path / "switches.jsonl"
+    path.write_text("".join(json.dumps(e) + "\n" for e in events), encoding="utf-8")
+    return ReplayWindowSource.from_file(str(path), start=start)
+
+
+def usage(path):
+    with open(path, encoding="utf-8") as f:
+        return {row["app_name"]: int(row["usage_seconds"]) for row in csv.DictReader(f)}
+
+
+def test_replay_without_pids_charges_each_app(data_dir):
+    source = replay(data_dir, [
+        {"t": 0, "process": "code.exe", "title": "main.py"},
+        {"t": 100, "process": "chrome.exe", "title": "Docs"},
+        {"t": 160, "process": "slack.exe", "title": "general"},
+        {"t": 200, "process": "code.exe", "title": "main.py"},
+    ])
+    main.run(source, stop=source.exhausted)
+
+    totals = usage(main.GLOBAL_CSV)
+    assert totals["VS Code"] == 100
+    assert totals["Google Chrome"] == 60
+    assert totals["Slack"] == 40
+
+
+def test_stretch_across_midnight_is_split_between_days(data_dir):
+    midnight = main.next_midnight("2026-01-05")  # Monday -> Tuesday, local time
+    source = replay(data_dir, [
+        {"t": 0, "process": "code.exe"},
+        {"t": 200, "process": "chrome.exe"},
+        {"t": 260, "process": "code.exe"},
+    ], start=midnight - 100)
+    main.run(source, stop=source.exhausted)
+
+    assert usage(os.path.join(main.USAGE_DIR, "monday.csv")) == {"VS Code": 100}
+    assert usage(os.path.join(main.USAGE_DIR, "tuesday.csv")) == {"VS Code": 100, "Google Chrome": 60}
+    assert usage(main.GLOBAL_CSV) == {"VS Code": 200, "Google Chrome": 60}
+
+    journal = main.UsageJournal(main.USAGE_DIR)
+    assert journal.date == "2026-01-06"
+    journal._file.close()
+
+
+def test_journal_restored_on_a_later_day_starts_empty(data_dir):
+    day_csv = os.path.join(main.USAGE_DIR, "tuesday.csv")
+    journal = main.open_journal(os.path.join(main.USAGE_DIR, "monday.csv"), "2026-01-05")
+    journal.record("2026-01-05", {"Slack": 30.0}, {"Slack": 1})
+    journal.close(os.path.join(main.USAGE_DIR, "monday.csv"), "monday", main.GLOBAL_CSV)
+
+    journal = main.open_journal(day_csv, "2026-01-06")
+    assert journal.today == {}
+    journal.tick(day_csv, "tuesday", main.GLOBAL_CSV)
+    assert usage(day_csv) == {}
+    assert usage(main.GLOBAL_CSV) == {"Slack": 30}
+    journal._file.close()
+
+
+def test_idle_periods_stop_charging(data_dir):
+    start = 1_700_000_000.0
+    source = replay(data_dir, [
+        {"t": 0, "process": "code.exe"},
+        {"t": 4000, "process": "chrome.exe"},
+    ], start=start)
+    idle = ScriptedIdleSource([(700, 2000, True), (3000, 500, False)], start)
+    main.run(source, stop=source.exhausted, idle=idle, idle_threshold=300)
+
+    # Charged until each threshold crossing and again from the input that ended it.
+    assert usage(main.GLOBAL_CSV) == {"VS Code": 1000 + 600 + 500, "Google Chrome": 0}
+    db = UsageDB(main.DB_FILE)
+    assert db.idle_intervals(start, start + 5000) == [
+        (start + 1000, start + 2700, True),
+        (start + 3300, start + 3500, False),
+    ]
+    db.close()
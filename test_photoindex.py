@@ -0,0 +1,86 @@
+import os
+import struct
+import time
+from datetime import datetime
+
+import pytest
+
+import photoindex
+from photoindex import PhotoIndex, image_size
+
+
+def write_png(path, width=640, height=480, age=60):
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", width, height) + b"\x08\x02\x00\x00\x00")
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+
+def write_jpeg(path, width=800, height=600):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    with open(path, "wb") as f:
+        f.write(b"\xff\xd8" + app0 + sof + b"\xff\xd9")
+
+
+def name(hour):
+    return datetime(2026, 1, 5, hour).strftime(photoindex.NAME_FORMAT) + ".png"
+
+
+@pytest.fixture
+def photos(tmp_path):
+    for hour in range(8, 13):
+        write_png(tmp_path / name(hour))
+    return tmp_path
+
+
+def test_image_size_reads_headers(tmp_path):
+    write_png(tmp_path / "a.png", 640, 480)
+    write_jpeg(tmp_path / "a.jpg", 800, 600)
+    (tmp_path / "a.webp").write_bytes(b"RIFF")
+    assert image_size(tmp_path / "a.png") == (640, 480)
+    assert image_size(tmp_path / "a.jpg") == (800, 600)
+    assert image_size(tmp_path / "a.webp") is None
+
+
+def test_pages_newest_first_within_a_range(photos):
+    index = PhotoIndex(str(photos))
+    index.refresh()
+
+    pages, cursor = [], None
+    while True:
+        batch, cursor, total = index.page(cursor=cursor, limit=2)
+        pages.append([p["file"] for p in batch])
+        if cursor is None:
+            break
+    assert pages == [[name(12), name(11)], [name(10), name(9)], [name(8)]]
+    assert total == 5
+
+    start, end = datetime(2026, 1, 5, 9).timestamp(), datetime(2026, 1, 5, 11).timestamp()
+    batch, cursor, total = index.page(start, end)
+    assert [p["file"] for p in batch] == [name(10), name(9)]
+    assert (cursor, total) == (None, 2)
+    assert batch[0]["width"] == 640
+
+
+def test_files_still_being_written_are_picked_up_later(photos):
+    index = PhotoIndex(str(photos))
+    index.refresh()
+    write_png(photos / name(13), age=0)
+    version = index.refresh()
+    assert name(13) not in index.entries
+
+    os.utime(photos / name(13), (time.time() - 60, time.time() - 60))
+    assert index.refresh() == version + 1
+    assert index.entries[name(13)]["height"] == 480
+
+
+def test_catalog_survives_a_restart_and_tracks_removals(photos):
+    PhotoIndex(str(photos)).refresh()
+    os.remove(photos / name(8))
+
+    index = PhotoIndex(str(photos))
+    assert name(8) in index.entries
+    index.refresh()
+    assert name(8) not in index.entries
+    assert [p["file"] for p in index.page()[0]] == [name(h) for h in range(12, 8, -1)]
@@ -0,0 +1,81 @@
+import pytest
+
+from rankindex import RankIndex
+
+
+def row(name, seconds, opens=0):
+    return {"app_name": name, "usage_seconds": seconds, "open_count": opens}
+
+
+def names(rows):
+    return [r["app_name"] for r in rows]
+
+
+@pytest.fixture
+def index():
+    index = RankIndex()
+    index.sync([row(f"App{i}", i * 10, 10 - i) for i in range(1, 10)])
+    return index
+
+
+def walk(index, **kwargs):
+    pages, cursor = [], None
+    while True:
+        rows, cursor, total = index.page(cursor=cursor, **kwargs)
+        pages.append(names(rows))
+        if cursor is None:
+            return pages, total
+
+
+@pytest.mark.parametrize("sort", ["usage", "opens", "name"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_cover_every_app_once(index, sort, order):
+    pages, total = walk(index, sort=sort, order=order, limit=4)
+    flat = [name for page in pages for name in page]
+    assert total == 9
+    assert [len(p) for p in pages] == [4, 4, 1]
+    assert sorted(flat) == sorted(index.rows)
+    keys = [RankIndex.key(sort, index.rows[n]) for n in flat]
+    assert keys == sorted(keys, reverse=order == "desc")
+
+
+def test_cursor_survives_changes_between_pages(index):
+    rows, cursor, _ = index.page(limit=3)
+    assert names(rows) == ["App9", "App8", "App7"]
+
+    updated = [row(f"App{i}", i * 10, 10 - i) for i in range(1, 10) if i != 7]
+    updated[-2] = row("App8", 1000)
+    index.sync(updated)
+
+    rows, cursor, total = index.page(cursor=cursor, limit=3)
+    assert names(rows) == ["App6", "App5", "App4"]
+    assert total == 8
+
+
+def test_search_pages_with_cursor(index):
+    index.sync(list(index.rows.values()) + [row("Google Chrome", 55), row("Chromium", 5)])
+    assert index.matches("chr") == {"Google Chrome", "Chromium"}
+
+    rows, cursor, total = index.page(q="app", limit=5)
+    assert (names(rows), total) == (["App9", "App8", "App7", "App6", "App5"], 9)
+    rows, cursor, _ = index.page(q="app", cursor=cursor, limit=5)
+    assert names(rows) == ["App4", "App3", "App2", "App1"]
+    assert cursor is None
+
+    rows, cursor, _ = index.page(q="CHR", sort="name", order="asc", limit=1)
+    assert names(rows) == ["Chromium"]
+    rows, cursor, _ = index.page(q="CHR", sort="name", order="asc", cursor=cursor, limit=1)
+    assert (names(rows), cursor) == (["Google Chrome"], None)
+
+
+def test_sync_tracks_totals_and_removals(index):
+    assert index.totals() == {"apps": 9, "usage_seconds": 450, "open_count": 45}
+    assert index.sync([row("App1", 10, 9), row("App2", 25, 8)]) == 8
+    assert index.totals() == {"apps": 2, "usage_seconds": 35, "open_count": 17}
+    assert index.matches("app3") == set()
+
+
+@pytest.mark.parametrize("sort,cursor", [("usage", "App1"), ("usage", "x:App1"), ("opens", "5:")])
+def test_malformed_cursor_raises(index, sort, cursor):
+    with pytest.raises(ValueError):
+        index.page(sort=sort, cursor=cursor)
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from reportjobs import GeminiClient, ReportJobs, StubClient
+
+
+@pytest.fixture
+def jobs_factory(tmp_path):
+    made = []
+
+    def make(client, **kwargs):
+        jobs = ReportJobs(client, str(tmp_path / "ai_cache.json"), **kwargs)
+        made.append(jobs)
+        return jobs
+
+    yield make
+    for jobs in made:
+        jobs.executor.shutdown(wait=True)
+
+
+def finish(jobs):
+    jobs.executor.shutdown(wait=True)
+
+
+def test_one_job_per_input_and_cached_result(jobs_factory):
+    client = StubClient(delay=0.05)
+    jobs = jobs_factory(client)
+    first = jobs.submit("sites")
+    assert jobs.submit("sites") is first
+    finish(jobs)
+
+    assert jobs.status(first["id"])["status"] == "done"
+    assert jobs.cached("sites") == first["summary"]
+    assert client.calls == 1
+
+    # A restart keeps the cache.
+    assert jobs_factory(client).cached("sites") == first["summary"]
+
+
+def test_unknown_job_id_is_none(jobs_factory):
+    jobs = jobs_factory(StubClient())
+    assert jobs.status("0123456789abcdef-1700000000-1") is None
+    assert jobs.status("../ai_cache") is None
+
+
+def test_job_from_another_worker(jobs_factory):
+    worker_a = jobs_factory(StubClient())
+    worker_b = jobs_factory(StubClient())
+    job = worker_a.submit("sites")
+    finish(worker_a)
+
+    status = worker_b.status(job["id"])
+    assert status["status"] == "done"
+    assert status["summary"] == job["summary"]
+
+
+def test_timeout_is_reported(jobs_factory):
+    jobs = jobs_factory(StubClient(delay=0.2), timeout=0.05)
+    job = jobs.submit("sites")
+    finish(jobs)
+    assert jobs.status(job["id"])["status"] == "timeout"
+    assert jobs.cached("sites") is None
+
+
+def test_stalled_running_job_reports_timeout(jobs_factory):
+    jobs = jobs_factory(StubClient(), timeout=1)
+    job = jobs.submit("sites")
+    finish(jobs)
+    job.update(status="running", started=time.time() - 5)
+    assert jobs.status(job["id"])["status"] == "timeout"
+
+
+def test_gemini_deadline_maps_to_timeout():
+    class DeadlineExceeded(Exception):
+        pass
+
+    class Model:
+        def generate_content(self, prompt, request_options):
+            raise DeadlineExceeded("504 Deadline Exceeded")
+
+    client = GeminiClient.__new__(GeminiClient)
+    client.model = Model()
+    client.deadline_errors = DeadlineExceeded
+    with pytest.raises(TimeoutError):
+        client.generate("prompt", timeout=1)
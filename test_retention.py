@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from retention import DAY, Retention
+from usagedb import UsageDB
+
+NOW = 1_760_000_000.0
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = UsageDB(str(tmp_path / "trackit.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def kolkata(monkeypatch):
+    monkeypatch.setenv("TZ", "Asia/Kolkata")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def fill(db, days=10):
+    # Ten minutes of "Code" every two hours, plus a site visit every day.
+    ts = NOW - days * DAY
+    while ts < NOW - 600:
+        db.add_app(ts, ts + 600, "Code", opens=1)
+        if int(ts) % DAY < 7200:
+            db.add_site(ts, ts + 300, "example.com")
+        ts += 7200
+    db.flush()
+
+
+def totals(rows, key="app"):
+    return {(r["bucket"], r[key]): (r["usage_seconds"], r.get("open_count")) for r in rows}
+
+
+@pytest.mark.parametrize("granularity", ["hour", "day", "week"])
+def test_query_is_unchanged_by_compaction(db, granularity):
+    fill(db)
+    before = {kind: db.query(NOW - 10 * DAY, NOW, granularity, kind) for kind in ("apps", "sites")}
+    assert before["apps"] and before["sites"]
+
+    Retention(db.path, {"raw": 2}).run(now=NOW, force=True)
+    oldest = db.reader().execute("SELECT MIN(ts) FROM app_usage").fetchone()[0]
+    assert oldest >= NOW - 2 * DAY
+
+    for kind, key in (("apps", "app"), ("sites", "site")):
+        assert totals(db.query(NOW - 10 * DAY, NOW, granularity, kind), key) == totals(before[kind], key)
+
+
+def test_compaction_is_idempotent(db):
+    fill(db)
+    retention = Retention(db.path)
+    retention.run(now=NOW, force=True)
+    once = db.query(NOW - 10 * DAY, NOW, "day")
+    assert not retention.run(now=NOW + 60)
+    assert retention.run(now=NOW + 3600, force=True)
+    assert db.query(NOW - 10 * DAY, NOW, "day") == once
+
+
+@pytest.mark.parametrize("granularity", ["hour", "day", "week"])
+def test_late_raw_row_is_visible_after_compaction(db, granularity):
+    fill(db)
+    retention = Retention(db.path)
+    retention.run(now=NOW, force=True)
+
+    start = NOW - 3 * DAY + 1234
+    db.add_site(start, start + 900, "late.example")
+    db.add_app(start, start + 60, "Late App", opens=1)
+    db.flush()
+
+    sites = [r for r in db.query(NOW - 10 * DAY, NOW, granularity, "sites") if r["site"] == "late.example"]
+    assert sum(r["usage_seconds"] for r in sites) == 900
+    apps = [r for r in db.query(NOW - 10 * DAY, NOW, granularity) if r["app"] == "Late App"]
+    assert [(r["usage_seconds"], r["open_count"]) for r in apps] == [(60, 1)]
+
+    # The next compaction re-rolls from raw without counting the row twice.
+    retention.run(now=NOW + 3600, force=True)
+    sites = [r for r in db.query(NOW - 10 * DAY, NOW, granularity, "sites") if r["site"] == "late.example"]
+    assert sum(r["usage_seconds"] for r in sites) == 900
+
+
+def test_hour_buckets_follow_local_time(kolkata, tmp_path):
+    # 18:40 UTC is 00:10 the next day in Kolkata (UTC+5:30).
+    db = UsageDB(str(tmp_path / "trackit.db"))
+    midnight_utc = 1_760_054_400  # 2025-10-10T00:00:00Z
+    db.add_app(midnight_utc - 5 * 3600 - 1200, midnight_utc - 5 * 3600 - 600, "Code")
+    db.flush()
+    Retention(db.path).run(now=midnight_utc + 2 * DAY, force=True)
+
+    assert [r["bucket"] for r in db.query(midnight_utc - DAY, midnight_utc + DAY, "hour")] == ["2025-10-10T00:00"]
+    assert [r["bucket"] for r in db.query(midnight_utc - DAY, midnight_utc + DAY, "day")] == ["2025-10-10"]
+    db.close()
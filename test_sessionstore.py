@@ -0,0 +1,72 @@
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from sessionstore import SessionStore
+
+T0 = datetime(2026, 1, 5, 10, 0, tzinfo=timezone.utc)
+DAY = date(2026, 1, 5)
+
+
+def at(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "sessions.db"))
+
+
+def test_started_then_terminated_is_charged(store):
+    assert store.apply([("started", "a.com", at(0), DAY)]) == []
+    ended = store.apply([("session terminated", "a.com", at(90), DAY)])
+    assert [(site, end) for site, _, end in ended] == [("a.com", at(90))]
+    assert store.totals(DAY) == {"a.com": 90.0}
+    assert store.count() == 0
+
+
+def test_heartbeats_move_last_seen_and_sweep_charges_up_to_it(store):
+    store.apply([("started", "a.com", at(0), DAY), ("heartbeat", "a.com", at(30), DAY),
+                 ("heartbeat", "a.com", at(20), DAY), ("started", "b.com", at(50), DAY)])
+    assert store.active()["a.com"]["last_seen"] == at(30)
+
+    ended = store.sweep(cutoff=at(40).timestamp())
+    assert [(site, end) for site, _, end in ended] == [("a.com", at(30))]
+    assert store.totals(DAY) == {"a.com": 30.0}
+    assert set(store.active()) == {"b.com"}
+
+
+def test_heartbeat_after_sweep_reopens_session(store):
+    store.apply([("started", "a.com", at(0), DAY)])
+    store.sweep(cutoff=at(200).timestamp())
+    store.apply([("heartbeat", "a.com", at(300), DAY)])
+    assert store.active()["a.com"]["start"] == at(300)
+
+
+def test_date_change_closes_yesterdays_session_at_last_seen(store):
+    store.apply([("started", "a.com", at(0), DAY), ("heartbeat", "a.com", at(60), DAY)])
+    store.apply([("heartbeat", "a.com", at(86400), DAY + timedelta(days=1))])
+    assert store.totals(DAY) == {"a.com": 60.0}
+    assert store.active()["a.com"]["date"] == DAY + timedelta(days=1)
+
+
+def test_sweep_drops_old_daily_totals(store):
+    store.apply([("started", "a.com", at(0), DAY), ("paused", "a.com", at(10), DAY)])
+    store.sweep(cutoff=at(0).timestamp(), keep_from=DAY + timedelta(days=1))
+    assert store.totals(DAY) == {}
+
+
+def test_migrates_sessions_without_last_seen(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        "CREATE TABLE browser_session (site TEXT PRIMARY KEY, start TEXT NOT NULL, date TEXT NOT NULL);"
+        f"INSERT INTO browser_session VALUES ('a.com', '{T0.isoformat()}', '{DAY.isoformat()}');"
+    )
+    conn.close()
+
+    store = SessionStore(path)
+    assert store.active()["a.com"]["last_seen"] == T0
+    ended = store.sweep(cutoff=at(1).timestamp())
+    assert [(site, end) for site, _, end in ended] == [("a.com", T0)]
@@ -0,0 +1,58 @@
+from timeline import rollup, subdivide
+
+BROWSERS = {"Chrome"}
+
+
+def test_non_browser_interval_passes_through():
+    assert list(subdivide([(0, 60, "Code")], [(0, 60, "github.com")], BROWSERS)) == [
+        (0, 60, "Code", None)
+    ]
+
+
+def test_browser_time_is_split_by_sessions():
+    apps = [(0, 100, "Chrome")]
+    sites = [(10, 40, "github.com"), (60, 200, "docs.python.org")]
+    assert list(subdivide(apps, sites, BROWSERS)) == [
+        (0, 10, "Chrome", None),
+        (10, 40, "Chrome", "github.com"),
+        (40, 60, "Chrome", None),
+        (60, 100, "Chrome", "docs.python.org"),
+    ]
+
+
+def test_latest_started_session_wins_overlap():
+    apps = [(0, 100, "Chrome")]
+    sites = [(0, 100, "github.com"), (30, 50, "news.ycombinator.com")]
+    assert list(subdivide(apps, sites, BROWSERS)) == [
+        (0, 30, "Chrome", "github.com"),
+        (30, 50, "Chrome", "news.ycombinator.com"),
+        (50, 100, "Chrome", "github.com"),
+    ]
+
+
+def test_session_spanning_several_browser_intervals():
+    apps = [(0, 50, "Chrome"), (50, 80, "Code"), (80, 120, "Chrome")]
+    sites = [(20, 100, "github.com")]
+    assert list(subdivide(apps, sites, BROWSERS)) == [
+        (0, 20, "Chrome", None),
+        (20, 50, "Chrome", "github.com"),
+        (50, 80, "Code", None),
+        (80, 100, "Chrome", "github.com"),
+        (100, 120, "Chrome", None),
+    ]
+
+
+def test_rollup_by_app_sorts_by_seconds():
+    segments = [(0, 10, "Code", None), (10, 40, "Chrome", "github.com"), (40, 45, "Code", None)]
+    assert rollup(segments, [], by="app") == [
+        {"app": "Chrome", "seconds": 30},
+        {"app": "Code", "seconds": 15},
+    ]
+
+
+def test_rollup_by_site_reports_background_session_time():
+    sites = [(10, 100, "github.com")]
+    segments = list(subdivide([(0, 40, "Chrome"), (40, 100, "Code")], sites, BROWSERS))
+    assert rollup(segments, sites, by="site") == [
+        {"site": "github.com", "foreground_seconds": 30, "session_seconds": 90}
+    ]
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from usagedb import UsageDB
+
+# 2026-01-05 10:00 UTC, a Monday.
+START = 1_767_607_200
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    db = UsageDB(str(tmp_path / "trackit.db"))
+    yield db
+    db.close()
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_interval_is_spread_across_minute_buckets(db):
+    db.add_app(START + 30, START + 150, "Code", opens=1)
+    db.flush()
+    rows = db.query(START, START + 3600, granularity="minute")
+    assert [(r["bucket"], r["usage_seconds"], r["open_count"]) for r in rows] == [
+        ("2026-01-05T10:00", 30, 1),
+        ("2026-01-05T10:01", 60, 0),
+        ("2026-01-05T10:02", 30, 0),
+    ]
+
+
+def test_hourly_query_sums_buckets_and_filters_by_name(db):
+    db.add_app(START, START + 600, "Code", opens=1)
+    db.add_app(START + 3000, START + 4200, "Code", opens=1)
+    db.add_app(START + 600, START + 900, "Chrome", opens=1)
+    db.flush()
+
+    rows = db.query(START, START + 7200, granularity="hour")
+    assert [(r["bucket"], r["app"], r["usage_seconds"], r["open_count"]) for r in rows] == [
+        ("2026-01-05T10:00", "Chrome", 300, 1),
+        ("2026-01-05T10:00", "Code", 1200, 2),
+        ("2026-01-05T11:00", "Code", 600, 0),
+    ]
+    assert {r["app"] for r in db.query(START, START + 7200, name="Chrome")} == {"Chrome"}
+
+
+def test_query_start_is_aligned_to_its_bucket(db):
+    db.add_app(START, START + 60, "Code")
+    db.flush()
+    assert db.query(START + 1800, START + 3600, granularity="hour")[0]["usage_seconds"] == 60
+
+
+def test_group_and_filter_by_category(db):
+    db.record_apps(START + 600, {"Code": 600, "Chrome": 300, "Notes": 60}, {},
+                   {"Code": "development", "Chrome": "browser"})
+    db.flush()
+
+    rows = db.query(START, START + 3600, by="category")
+    assert {r["category"]: r["usage_seconds"] for r in rows} == {
+        "development": 600, "browser": 300, "other": 60,
+    }
+    assert [r["app"] for r in db.query(START, START + 3600, category="other")] == ["Notes"]
+
+
+def test_site_query(db):
+    db.add_site(START, START + 120, "example.com", "2026-01-05")
+    db.flush()
+    rows = db.query(START, START + 86400, granularity="day", kind="sites")
+    assert rows == [{"bucket": "2026-01-05", "site": "example.com", "usage_seconds": 120, "open_count": 0}]
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+BROWSER_CATEGORY = "browser"
+
+
+def clip(start, end, lower, upper):
+    return max(start, lower), min(end, upper)
+
+
+def subdivide(apps, sites, browsers):
+    """Merge foreground app intervals with site sessions into timeline segments.
+
+    ``apps`` and ``sites`` are (start, end, name) tuples sorted by start; app
+    intervals never overlap each other. Time in a browser is split by the
+    site sessions overlapping it, the most recently started session winning
+    where several overlap, and time no session covers stays with the browser
+    alone. Yields (start, end, app, site) with ``site`` None outside browsers.
+    """
+    active = []
+    j = 0
+    for start, end, app in apps:
+        if app not in browsers:
+            yield start, end, app, None
+            continue
+
+        while j < len(sites) and sites[j][0] < end:
+            active.append(sites[j])
+            j += 1
+        active = [s for s in active if s[1] > start]
+
+        covering = [s for s in active if s[0] < end]
+        points = sorted({start, end} | {p for s in covering for p in clip(s[0], s[1], start, end)})
+        current = None
+        for lower, upper in zip(points, points[1:]):
+            owners = [s for s in covering if s[0] <= lower and s[1] >= upper]
+            site = max(owners, key=lambda s: s[0])[2] if owners else None
+            if current is not None and current[3] == site:
+                current[1] = upper
+                continue
+            if current is not None:
+                yield tuple(current)
+            current = [lower, upper, app, site]
+        if current is not None:
+            yield tuple(current)
+
+
+def segment_payload(segment):
+    start, end, app, site = segment
+    return {
+        "start": datetime.fromtimestamp(start).isoformat(),
+        "end": datetime.fromtimestamp(end).isoformat(),
+        "app": app,
+        "site": site,
+        "seconds": round(end - start, 3),
+    }
+
+
+def rollup(segments, sites, by="app"):
+    """Per-app seconds, or per-site foreground seconds next to the raw session seconds.
+
+    ``session_seconds`` is what the extension reported for the site; the
+    difference to ``foreground_seconds`` is time the browser was not in the
+    foreground, which is what made the two sources disagree.
+    """
+    totals = {}
+    if by == "app":
+        for start, end, app, _ in segments:
+            totals[app] = totals.get(app, 0.0) + (end - start)
+        rows = [{"app": app, "seconds": round(seconds, 3)} for app, seconds in totals.items()]
+    else:
+        for start, end, _, site in segments:
+            if site is not None:
+                entry = totals.setdefault(site, [0.0, 0.0])
+                entry[0] += end - start
+        for start, end, site in sites:
+            entry = totals.setdefault(site, [0.0, 0.0])
+            entry[1] += end - start
+        rows = [
+            {"site": site, "foreground_seconds": round(fg, 3), "session_seconds": round(session, 3)}
+            for site, (fg, session) in totals.items()
+        ]
+    rows.sort(key=lambda r: -r["seconds" if by == "app" else "foreground_seconds"])
+    return rows
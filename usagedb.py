@@ -0,0 +1,464 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from retention import BASE_TABLES, BUCKET_SQL, DAY, QUERY_TIERS, bucket_start, tier_schema, tier_table, watermarks
+
+BUCKET_SECONDS = 60
+
+GRANULARITY = {
+    "minute": ("%Y-%m-%dT%H:%M", "minute"),
+    "hour": ("%Y-%m-%dT%H:00", "hourly"),
+    "day": ("%Y-%m-%d", "daily"),
+    "week": ("%Y-%m-%d", "weekly"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS app_usage (
+    ts INTEGER NOT NULL,
+    app TEXT NOT NULL,
+    seconds REAL NOT NULL DEFAULT 0,
+    opens INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS app_usage_ts_app ON app_usage(ts, app);
+CREATE INDEX IF NOT EXISTS app_usage_app_ts ON app_usage(app, ts);
+
+CREATE TABLE IF NOT EXISTS site_usage (
+    ts INTEGER NOT NULL,
+    site TEXT NOT NULL,
+    seconds REAL NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS site_usage_ts_site ON site_usage(ts, site);
+CREATE INDEX IF NOT EXISTS site_usage_site_ts ON site_usage(site, ts);
+
+CREATE TABLE IF NOT EXISTS site_daily (
+    date TEXT NOT NULL,
+    site TEXT NOT NULL,
+    seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, site)
+);
+
+CREATE TABLE IF NOT EXISTS app_category (
+    app TEXT PRIMARY KEY,
+    category TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS app_interval (
+    id INTEGER PRIMARY KEY,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    app TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS app_interval_index USING rtree(id, start, end);
+
+CREATE TABLE IF NOT EXISTS site_interval (
+    id INTEGER PRIMARY KEY,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    site TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS site_interval_index USING rtree(id, start, end);
+
+CREATE TABLE IF NOT EXISTS idle_interval (
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    locked INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idle_interval_start ON idle_interval(start);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+KINDS = BASE_TABLES
+INTERVAL_TABLES = {"apps": ("app_interval", "app"), "sites": ("site_interval", "site")}
+
+# Finest tier last; the span is the length of one bucket of each coarse tier.
+TIER_SPANS = [("weekly", 7 * DAY), ("daily", DAY), ("hourly", 3600), ("raw", None)]
+
+
+def parse_time(value, default=None):
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def spread(pending, start, end, key, opens=0):
+    """Split [start, end) across minute buckets, charging opens to the first."""
+    bucket = int(start // BUCKET_SECONDS) * BUCKET_SECONDS
+    while True:
+        upper = min(end, bucket + BUCKET_SECONDS)
+        entry = pending.setdefault((bucket, key), [0.0, 0])
+        entry[0] += max(0.0, upper - max(start, bucket))
+        entry[1] += opens
+        opens = 0
+        bucket += BUCKET_SECONDS
+        if bucket >= end:
+            break
+
+
+class UsageDB:
+    """Minute-bucketed usage time series in SQLite.
+
+    Writes are buffered in memory and upserted in one transaction per flush.
+    The database runs in WAL mode so dashboard reads never wait on the
+    tracker's writes. Each thread gets its own read connection. Buckets that
+    land below a rollup tier's watermark (a site session is written when it
+    ends, stamped with its start) are added to that tier in the same
+    transaction, since queries read the tier there and not the raw rows.
+    """
+
+    def __init__(self, path, flush_interval=10, max_pending=5000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending_apps = {}
+        self.pending_sites = {}
+        self.pending_daily = {}
+        self.categories = {}
+        self.pending_categories = {}
+        self.pending_idle = []
+        self.pending_intervals = []
+        self.last_interval = {}
+        self.write_lock = threading.Lock()
+        self.local = threading.local()
+        self.last_flush = time.time()
+        self._flusher = None
+
+        self.conn = self._connect()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA + tier_schema())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def reader(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self.local.conn = conn
+        return conn
+
+    def add_app(self, start, end, app, opens=0):
+        with self.write_lock:
+            spread(self.pending_apps, start, end, app, opens)
+
+    def add_site(self, start, end, site, date=None):
+        with self.write_lock:
+            spread(self.pending_sites, start, end, site)
+            if date is not None:
+                entry = self.pending_daily.setdefault((date, site), [0.0, 0])
+                entry[0] += max(0.0, end - start)
+
+    def record_apps(self, ts, usage, opens, categories=None):
+        with self.write_lock:
+            for app, category in (categories or {}).items():
+                if self.categories.get(app) != category:
+                    self.categories[app] = category
+                    self.pending_categories[app] = category
+            for app in set(usage) | set(opens):
+                seconds = usage.get(app, 0)
+                spread(self.pending_apps, ts - seconds, ts, app, opens.get(app, 0))
+
+    def add_interval(self, kind, start, end, name):
+        """Buffer a timestamped interval; one that continues the previous one for the same name extends it."""
+        if end <= start:
+            return
+        with self.write_lock:
+            for interval in reversed(self.pending_intervals):
+                if interval[0] == kind:
+                    if interval[3] == name and interval[2] == start:
+                        interval[2] = end
+                        return
+                    break
+            self.pending_intervals.append([kind, start, end, name])
+
+    def record_idle(self, start, end, locked=False):
+        if end > start:
+            with self.write_lock:
+                self.pending_idle.append((start, end, int(locked)))
+
+    def pending(self):
+        return (len(self.pending_apps) + len(self.pending_sites) + len(self.pending_daily) + len(self.pending_idle)
+                + len(self.pending_intervals))
+
+    def maybe_flush(self):
+        if self.pending() >= self.max_pending or time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.write_lock:
+            apps, self.pending_apps = self.pending_apps, {}
+            sites, self.pending_sites = self.pending_sites, {}
+            daily, self.pending_daily = self.pending_daily, {}
+            categories, self.pending_categories = self.pending_categories, {}
+            idle, self.pending_idle = self.pending_idle, []
+            intervals, self.pending_intervals = self.pending_intervals, []
+            self.last_flush = time.time()
+
+            if not apps and not sites and not daily and not categories and not idle and not intervals:
+                return
+
+            last_interval = dict(self.last_interval)
+            try:
+                self._write(apps, sites, daily, categories, idle, intervals)
+            except sqlite3.OperationalError:
+                self.last_interval = last_interval
+                self.pending_categories.update(categories)
+                self.pending_idle[:0] = idle
+                self.pending_intervals[:0] = intervals
+                for pending, batch in (
+                    (self.pending_apps, apps),
+                    (self.pending_sites, sites),
+                    (self.pending_daily, daily),
+                ):
+                    for key, v in batch.items():
+                        entry = pending.setdefault(key, [0.0, 0])
+                        entry[0] += v[0]
+                        entry[1] += v[1]
+
+    def _write(self, apps, sites, daily, categories, idle, intervals):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO app_usage (ts, app, seconds, opens) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(ts, app) DO UPDATE SET seconds = seconds + excluded.seconds, "
+                "opens = opens + excluded.opens",
+                [(ts, app, v[0], v[1]) for (ts, app), v in apps.items()],
+            )
+            self.conn.executemany(
+                "INSERT INTO site_usage (ts, site, seconds) VALUES (?, ?, ?) "
+                "ON CONFLICT(ts, site) DO UPDATE SET seconds = seconds + excluded.seconds",
+                [(ts, site, v[0]) for (ts, site), v in sites.items()],
+            )
+            self._roll_late(apps, sites)
+            self.conn.executemany(
+                "INSERT INTO site_daily (date, site, seconds) VALUES (?, ?, ?) "
+                "ON CONFLICT(date, site) DO UPDATE SET seconds = seconds + excluded.seconds",
+                [(date, site, v[0]) for (date, site), v in daily.items()],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO app_category (app, category) VALUES (?, ?)",
+                categories.items(),
+            )
+            self.conn.executemany("INSERT INTO idle_interval (start, end, locked) VALUES (?, ?, ?)", idle)
+            for kind, start, end, name in intervals:
+                self._write_interval(kind, start, end, name)
+
+    def _roll_late(self, apps, sites):
+        marks = watermarks(self.conn)
+        for kind, batch in (("apps", apps), ("sites", sites)):
+            column = KINDS[kind][1]
+            for tier in ("hourly", "daily", "weekly"):
+                late = [(ts, name, v[0], v[1]) for (ts, name), v in batch.items() if ts < marks.get(tier, 0)]
+                if not late:
+                    continue
+                self.conn.executemany(
+                    f"INSERT INTO {tier_table(kind, tier)} (ts, {column}, seconds, opens) "
+                    f"SELECT {BUCKET_SQL[tier]}, ?, ?, ? FROM (SELECT ? AS ts) WHERE 1 "
+                    f"ON CONFLICT(ts, {column}) DO UPDATE SET seconds = seconds + excluded.seconds, "
+                    f"opens = opens + excluded.opens",
+                    [(name, seconds, opens, ts) for ts, name, seconds, opens in late],
+                )
+
+    def _write_interval(self, kind, start, end, name):
+        table, column = INTERVAL_TABLES[kind]
+        last = self.last_interval.get(kind)
+        if last is not None and last[1] == name and last[2] == start:
+            row_id = last[0]
+            self.conn.execute(f"UPDATE {table} SET end = ? WHERE id = ?", (end, row_id))
+            self.conn.execute(f"UPDATE {table}_index SET end = ? WHERE id = ?", (end, row_id))
+        else:
+            row_id = self.conn.execute(
+                f"INSERT INTO {table} (start, end, {column}) VALUES (?, ?, ?)", (start, end, name)
+            ).lastrowid
+            self.conn.execute(f"INSERT INTO {table}_index (id, start, end) VALUES (?, ?, ?)", (row_id, start, end))
+        self.last_interval[kind] = (row_id, name, end)
+
+    def import_site_totals(self, totals):
+        with self.write_lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO site_daily (date, site, seconds) VALUES (?, ?, ?)",
+                [(date, site, seconds) for (date, site), seconds in totals.items()],
+            )
+
+    def site_rollup(self, start_date=None, end_date=None):
+        sql = "SELECT date, site, seconds FROM site_daily WHERE date >= ? AND date <= ? ORDER BY date, site"
+        return self.reader().execute(sql, (start_date or "", end_date or "9999-12-31")).fetchall()
+
+    def idle_intervals(self, start, end):
+        """Idle periods overlapping [start, end) as (start, end, locked), clipped to the range."""
+        rows = self.reader().execute(
+            "SELECT start, end, locked FROM idle_interval WHERE start < ? AND end > ? ORDER BY start",
+            (end, start),
+        )
+        return [(max(s, start), min(e, end), bool(locked)) for s, e, locked in rows]
+
+    def intervals(self, kind, start, end):
+        """Intervals overlapping [start, end) as (start, end, name), by start.
+
+        The R*Tree stores 32-bit float bounds rounded outwards, so it is only a
+        conservative filter; the stored REAL columns give the exact overlap.
+        Either way the lookup costs a tree descent, not a scan.
+        """
+        table, column = INTERVAL_TABLES[kind]
+        rows = self.reader().execute(
+            f"SELECT i.start, i.end, i.{column} FROM {table}_index r JOIN {table} i ON i.id = r.id "
+            f"WHERE r.start < ? AND r.end > ? AND i.start < ? AND i.end > ? ORDER BY i.start",
+            (end, start, end, start),
+        )
+        return rows.fetchall()
+
+    def app_categories(self):
+        return dict(self.reader().execute("SELECT app, category FROM app_category").fetchall())
+
+    def get_meta(self, key):
+        row = self.reader().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self.write_lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def start_flusher(self):
+        if self._flusher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                self.flush()
+
+        self._flusher = threading.Thread(target=run, name="usagedb-flush", daemon=True)
+        self._flusher.start()
+
+    def _tiers(self, conn, granularity, start, end):
+        """(tier, lower, upper) ranges that together cover [start, end) exactly once."""
+        marks = watermarks(conn)
+        ranges = []
+        lower = start
+        for tier in QUERY_TIERS[granularity]:
+            upper = end if tier == "raw" else min(end, marks.get(tier, lower))
+            if upper <= lower:
+                continue
+            ranges.append((tier, lower, upper))
+            lower = upper
+        return ranges
+
+    def _finest_tiers(self, conn, kind, start, end):
+        """Like ``_tiers`` but reading each period from the finest tier that still holds it.
+
+        A coarse tier hands over at its first whole bucket at or after the
+        oldest row the next finer tier kept, or at its watermark if earlier.
+        It is skipped when the finer tier reaches back to ``start`` itself.
+        """
+        marks = watermarks(conn)
+        ranges = []
+        lower = start
+        for (tier, span), (finer, _) in zip(TIER_SPANS, TIER_SPANS[1:]):
+            oldest = conn.execute(f"SELECT MIN(ts) FROM {tier_table(kind, finer)}").fetchone()[0]
+            upper = marks.get(tier, lower)
+            if oldest is not None:
+                if oldest <= lower:
+                    continue
+                upper = min(upper, bucket_start(conn, oldest + span - 1, tier))
+            upper = min(upper, end)
+            if upper > lower:
+                ranges.append((tier, lower, upper))
+                lower = upper
+        if end > lower:
+            ranges.append(("raw", lower, end))
+        return ranges
+
+    def _sources(self, conn, kind, granularity, start, end, name=None):
+        column = KINDS[kind][1]
+        parts, params = [], []
+
+        for tier, lower, upper in self._tiers(conn, granularity, start, end):
+            opens = "opens" if kind == "apps" or tier != "raw" else "0"
+            sql = (
+                f"SELECT ts, {column}, seconds, {opens} AS opens FROM {tier_table(kind, tier)} "
+                f"WHERE ts >= ? AND ts < ?"
+            )
+            params += [lower, upper]
+            if name:
+                sql += f" AND {column} = ?"
+                params.append(name)
+            parts.append(sql)
+
+        return " UNION ALL ".join(parts), params
+
+    def scan(self, kind, start, end, after=None, bucket=None, chunk=1000):
+        """Yield stored (ts, name, seconds, opens, bucket) rows in [start, end) ordered by (ts, name).
+
+        Each period is read from the finest tier retention kept, in keyset
+        pages of ``chunk`` rows over the tier's (ts, name) index, so memory
+        stays flat and no read transaction spans the scan. ``after`` resumes past a (ts, name)
+        already seen; ``bucket`` (hourly, daily, weekly) fills the last
+        column with the bucket start, otherwise it repeats ts.
+        """
+        column = KINDS[kind][1]
+        conn = self.reader()
+        bucket_sql = BUCKET_SQL[bucket] if bucket else "ts"
+
+        for tier, lower, upper in self._finest_tiers(conn, kind, start, end):
+            # A row is keyed by its bucket start, so include the bucket ``lower`` falls in.
+            lower = bucket_start(conn, lower, "minute" if tier == "raw" else tier)
+            opens = "opens" if kind == "apps" or tier != "raw" else "0"
+            sql = (
+                f"SELECT ts, {column}, seconds, {opens}, {bucket_sql} FROM {tier_table(kind, tier)} "
+                f"WHERE ts >= ? AND ts < ?"
+            )
+            while True:
+                params = [lower, upper]
+                page = sql
+                if after is not None:
+                    page += f" AND (ts, {column}) > (?, ?)"
+                    params += list(after)
+                rows = conn.execute(page + f" ORDER BY ts, {column} LIMIT ?", params + [chunk]).fetchall()
+                yield from rows
+                if len(rows) < chunk:
+                    break
+                after = rows[-1][:2]
+
+    def query(self, start, end, granularity="hour", kind="apps", name=None, by=None, category=None):
+        column = KINDS[kind][1]
+        fmt, bucket = GRANULARITY[granularity]
+        conn = self.reader()
+
+        start = bucket_start(conn, start, bucket)
+        source, params = self._sources(conn, kind, granularity, start, end, name)
+        if not source:
+            return []
+
+        key = f"u.{column}"
+        joins = ""
+        if kind == "apps" and (by == "category" or category):
+            joins = " LEFT JOIN app_category c ON c.app = u.app"
+            if by == "category":
+                key = "COALESCE(c.category, 'other')"
+                column = "category"
+
+        sql = (
+            f"SELECT strftime('{fmt}', {BUCKET_SQL[bucket]}, 'unixepoch', 'localtime') AS bucket, "
+            f"{key} AS name, SUM(u.seconds), SUM(u.opens) FROM ({source}) u{joins} WHERE 1"
+        )
+        if joins and category:
+            sql += " AND COALESCE(c.category, 'other') = ?"
+            params.append(category)
+        sql += " GROUP BY bucket, name ORDER BY bucket, name"
+
+        return [
+            {"bucket": bucket, column: key, "usage_seconds": round(seconds, 3), "open_count": count}
+            for bucket, key, seconds, count in conn.execute(sql, params)
+        ]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,250 @@
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+from classifier import LRU
+from metrics import Histogram
+
+WindowChange = namedtuple("WindowChange", "timestamp pid process title create_time", defaults=(None,))
+
+process_names = LRU(256)
+
+FOREGROUND_LOOKUP = Histogram(
+    "trackit_tracker_foreground_lookup_seconds",
+    "Latency of resolving the foreground window (window) and classifying it (classify)",
+    ["stage"],
+)
+WINDOW_LOOKUP = FOREGROUND_LOOKUP.labels("window")
+
+
+class WindowSource:
+    """Reports foreground window changes.
+
+    ``wait(timeout)`` blocks until the foreground changes and returns a
+    WindowChange stamped with the switch time, or None once ``timeout``
+    seconds pass without a change. ``now()`` is the clock the change
+    timestamps are measured on.
+    """
+
+    def wait(self, timeout):
+        raise NotImplementedError
+
+    def now(self):
+        return time.time()
+
+    def close(self):
+        pass
+
+
+def describe_window(hwnd, timestamp):
+    with WINDOW_LOOKUP.time():
+        return _describe_window(hwnd, timestamp)
+
+
+def _describe_window(hwnd, timestamp):
+    import psutil
+    import win32gui
+    import win32process
+
+    try:
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        process = psutil.Process(pid)
+        key = (pid, process.create_time())
+        name = process_names.get(key)
+        if name is None:
+            name = process.name()
+            process_names.put(key, name)
+        return WindowChange(timestamp, pid, name, win32gui.GetWindowText(hwnd), key[1])
+    except Exception:
+        return None
+
+
+class PollingWindowSource(WindowSource):
+    def __init__(self, interval=1.0):
+        import win32gui
+
+        self.interval = interval
+        self.get_foreground = win32gui.GetForegroundWindow
+        self.hwnd = None
+
+    def wait(self, timeout):
+        deadline = time.time() + timeout
+        while True:
+            hwnd = self.get_foreground()
+            if hwnd != self.hwnd:
+                self.hwnd = hwnd
+                change = describe_window(hwnd, time.time())
+                if change:
+                    return change
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.interval, remaining))
+
+
+class WinEventWindowSource(WindowSource):
+    """Foreground changes pushed by a SetWinEventHook(EVENT_SYSTEM_FOREGROUND) hook."""
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    WM_QUIT = 0x0012
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        self.ctypes = ctypes
+        self.wintypes = wintypes
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.events = queue.Queue()
+        self.ready = threading.Event()
+        self.thread_id = None
+        self.error = None
+
+        self.thread = threading.Thread(target=self._pump, name="winevent-hook", daemon=True)
+        self.thread.start()
+        self.ready.wait(5)
+        if self.error or self.thread_id is None:
+            raise OSError(self.error or "foreground hook did not start")
+
+        self.events.put((time.time(), self.user32.GetForegroundWindow()))
+
+    def _pump(self):
+        ctypes, wintypes = self.ctypes, self.wintypes
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD,
+        )
+
+        def callback(hook, event, hwnd, id_object, id_child, thread, event_ms):
+            lag = (self.kernel32.GetTickCount() - event_ms) & 0xFFFFFFFF
+            self.events.put((time.time() - lag / 1000.0, hwnd))
+
+        proc = WinEventProc(callback)
+        hook = self.user32.SetWinEventHook(
+            self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND, 0, proc, 0, 0,
+            self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS,
+        )
+        if not hook:
+            self.error = "SetWinEventHook failed"
+            self.ready.set()
+            return
+
+        self.thread_id = self.kernel32.GetCurrentThreadId()
+        self.ready.set()
+
+        msg = wintypes.MSG()
+        while self.user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            self.user32.TranslateMessage(ctypes.byref(msg))
+            self.user32.DispatchMessageW(ctypes.byref(msg))
+        self.user32.UnhookWinEvent(hook)
+
+    def wait(self, timeout):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                timestamp, hwnd = self.events.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                return None
+            change = describe_window(hwnd, timestamp)
+            if change:
+                return change
+
+    def close(self):
+        if self.thread_id:
+            self.user32.PostThreadMessageW(self.thread_id, self.WM_QUIT, 0, 0)
+
+
+class ReplayWindowSource(WindowSource):
+    """Replays (offset_seconds, process, title, pid) events.
+
+    With ``realtime`` the events are paced on the wall clock (scaled by
+    ``speed``). Otherwise time is virtual: ``wait`` jumps straight to the
+    next event, so a day of switching replays in milliseconds.
+    """
+
+    def __init__(self, events, realtime=False, speed=1.0, start=None):
+        self.events = iter(sorted(events, key=lambda e: e[0]))
+        self.realtime = realtime
+        self.speed = speed
+        self.start = time.time() if start is None else start
+        self.wall_start = time.time()
+        self.clock = self.start
+        self.pending = next(self.events, None)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        events = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                e = json.loads(line)
+                events.append((float(e["t"]), e["process"], e.get("title", ""), e.get("pid")))
+        return cls(events, **kwargs)
+
+    def exhausted(self):
+        return self.pending is None
+
+    def now(self):
+        if self.realtime:
+            return self.start + (time.time() - self.wall_start) * self.speed
+        return self.clock
+
+    def wait(self, timeout):
+        if self.pending is None:
+            if self.realtime:
+                time.sleep(timeout)
+            else:
+                self.clock += timeout
+            return None
+
+        offset, process, title, pid = self.pending
+        due = self.start + offset
+
+        if due > self.now() + timeout:
+            if self.realtime:
+                time.sleep(timeout / self.speed)
+            else:
+                self.clock += timeout
+            return None
+
+        if self.realtime:
+            time.sleep(max(0.0, (due - self.now()) / self.speed))
+        else:
+            self.clock = max(self.clock, due)
+
+        self.pending = next(self.events, None)
+        return WindowChange(due, pid, process, title)
+
+
+def synthetic_events(processes, switches, mean_dwell=30.0, seed=0):
+    rng = random.Random(seed)
+    offset = 0.0
+    events = []
+    for i in range(switches):
+        process = rng.choice(processes)
+        events.append((offset, process, f"{process} window {i}", 1000 + processes.index(process)))
+        offset += rng.expovariate(1.0 / mean_dwell)
+    return events
+
+
+def make_window_source(kind="auto", replay=None, realtime=False):
+    if replay:
+        return ReplayWindowSource.from_file(replay, realtime=realtime)
+
+    if kind in ("auto", "event") and sys.platform == "win32":
+        try:
+            return WinEventWindowSource()
+        except OSError:
+            if kind == "event":
+                raise
+
+    return PollingWindowSource()
@@ -0,0 +1,118 @@
+import queue
+import sqlite3
+import threading
+
+
+class BackgroundWriter:
+    """Single thread that owns the slow file writes for the request path.
+
+    Callers enqueue log lines and callables without blocking; the worker
+    drains whatever is queued and appends all pending log lines with one
+    file open. When the queue passes its high-water mark ``saturated()``
+    reports backpressure so the caller can ask clients to retry.
+    """
+
+    def __init__(self, log_path, maxsize=10000, high_water=0.9, drain=500):
+        self.log_path = log_path
+        self.queue = queue.Queue(maxsize)
+        self.high_water = int(maxsize * high_water)
+        self.drain = drain
+        self.dropped = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name="background-writer", daemon=True)
+        self.thread.start()
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def capacity(self):
+        return self.queue.maxsize
+
+    def saturated(self, incoming=0):
+        return self.queue.qsize() + incoming >= self.high_water
+
+    def status(self):
+        return {"depth": self.depth(), "capacity": self.capacity(), "dropped": self.dropped}
+
+    def _put(self, item):
+        try:
+            self.queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def log(self, message):
+        return self._put((None, message))
+
+    def call(self, fn, *args):
+        return self._put((fn, args))
+
+    def flush(self, timeout=None):
+        done = threading.Event()
+        self._put((done.set, ()))
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.drain:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            lines = []
+            for fn, payload in batch:
+                if fn is None:
+                    lines.append(payload)
+                    continue
+                if lines:
+                    self._write_lines(lines)
+                    lines = []
+                try:
+                    fn(*payload)
+                except Exception:
+                    self.failed += 1
+
+            if lines:
+                self._write_lines(lines)
+
+    def _write_lines(self, lines):
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError:
+            self.failed += 1
+
+
+class ProcessLock:
+    """Lock shared by every worker process, held as a write transaction on a SQLite file.
+
+    ``with lock as conn`` blocks until no other process or thread holds it,
+    and ``conn`` can read and write the file's ``meta`` table while the lock
+    is held. SQLite already coordinates the workers' databases, so this
+    needs no platform-specific file locking.
+    """
+
+    def __init__(self, path, timeout=60):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.local.conn = conn
+        return conn
+
+    def __enter__(self):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.local.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False